@@ -11,6 +11,7 @@ import re
 import hashlib
 import logging
 import math
+import sqlite3
 from pathlib import Path
 from datetime import datetime
 from colorama import init, Fore, Style
@@ -53,6 +54,13 @@ logger = setup_logger()
 # Get the project root directory
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
+# Imported after the logger is configured, so lib.logger reuses its handler
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from lib.results_index import ResultsIndex
+from lib.bench_frame import BenchmarkFrame
+from lib.data_loader import load_benchmark_frame, load_instruction_mix
+import numpy as np
+
 def load_config():
     """Load benchmark configuration from JSON file."""
     config_path = PROJECT_ROOT / "scripts" / "config" / "benchmark_config.json"
@@ -72,12 +80,13 @@ def validate_path(path):
         return None
     return path_obj
 
-def load_benchmark_results(result_path, experiment_name):
+def load_benchmark_results(result_path, experiment_name, results_index=None):
     """Load benchmark results for a specific experiment.
     
     Args:
         result_path: Path to the baseline or contender result directory
         experiment_name: Name of the experiment to load
+        results_index: Optional ResultsIndex to read the run from instead of its JSON files
         
     Returns:
         Tuple of (benchmark_data, metadata) or (None, None) if not found
@@ -87,6 +96,12 @@ def load_benchmark_results(result_path, experiment_name):
         logger.warning(f"Experiment directory not found: {experiment_dir}")
         return None, None
     
+    if results_index is not None:
+        benchmark_data, metadata = results_index.load_run(experiment_dir)
+        if benchmark_data is not None:
+            return benchmark_data, metadata or {}
+        # Not a complete indexed run: read the files directly for the detailed warnings below
+    
     # Load benchmark data
     benchmark_file = experiment_dir / "benchmark_output.json"
     if not benchmark_file.exists():
@@ -155,26 +170,28 @@ def identify_common_metrics(baseline_data, contender_data):
     # Return intersection of metrics
     return baseline_metrics.intersection(contender_metrics)
 
-def calculate_improvement(baseline_value, contender_value, metric_name):
-    """Calculate improvement percentage between baseline and contender.
+def calculate_improvements(baseline_values, contender_values, metric_name):
+    """Calculate improvement percentages between baseline and contender values.
+    
+    Time metrics (real_time, cpu_time, time) are lower-is-better, all others higher-is-better.
+    A zero baseline gives +inf if the contender is negative, else -inf.
     
     Args:
-        baseline_value: Value from baseline
-        contender_value: Value from contender
+        baseline_values: Array of baseline values
+        contender_values: Array of contender values (same benchmarks, same order)
         metric_name: Name of the metric
         
     Returns:
-        Improvement percentage (positive = improvement, negative = regression)
+        Array of improvement percentages (positive = improvement, negative = regression)
     """
-    if baseline_value == 0:
-        return float('inf') if contender_value < baseline_value else float('-inf')
-    
-    # For time-based metrics, lower is better
-    if metric_name in ['real_time', 'cpu_time', 'time']:
-        return ((baseline_value - contender_value) / baseline_value) * 100
-    
-    # For throughput metrics, higher is better
-    return ((contender_value - baseline_value) / baseline_value) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric_name in ['real_time', 'cpu_time', 'time']:
+            improvements = (baseline_values - contender_values) / baseline_values * 100
+        else:
+            improvements = (contender_values - baseline_values) / baseline_values * 100
+    zero_baseline = baseline_values == 0
+    improvements[zero_baseline] = np.where(contender_values[zero_baseline] < 0, float('inf'), float('-inf'))
+    return improvements
 
 def get_winner(improvement):
     """Determine which configuration is better based on improvement percentage.
@@ -189,7 +206,8 @@ def get_winner(improvement):
         return 'tie'
     return 'contender' if improvement > 0 else 'baseline'
 
-def create_comparison_table(baseline_data, contender_data, baseline_label, contender_label, common_metrics):
+def create_comparison_table(baseline_data, contender_data, baseline_label, contender_label, common_metrics,
+                            baseline_frame=None, contender_frame=None):
     """Create a Markdown comparison table for baseline and contender.
     
     Args:
@@ -198,6 +216,8 @@ def create_comparison_table(baseline_data, contender_data, baseline_label, conte
         baseline_label: Label for baseline
         contender_label: Label for contender
         common_metrics: Set of common metric names
+        baseline_frame: Optional BenchmarkFrame of baseline_data (built from it if omitted)
+        contender_frame: Optional BenchmarkFrame of contender_data (built from it if omitted)
         
     Returns:
         Markdown table as string
@@ -250,77 +270,68 @@ def create_comparison_table(baseline_data, contender_data, baseline_label, conte
     table = "| " + " | ".join(headers) + " |\n"
     table += "| " + " | ".join(["-" * len(header) for header in headers]) + " |\n"
     
-    # Create a map of benchmark name to data for easier lookup
-    baseline_benchmarks = {b['name']: b for b in baseline_data.get('benchmarks', [])}
-    contender_benchmarks = {b['name']: b for b in contender_data.get('benchmarks', [])}
-    
-    # Get common benchmark names
-    common_benchmarks = set(baseline_benchmarks.keys()).intersection(set(contender_benchmarks.keys()))
+    # Match benchmarks by name on columnar frames (missing values count as 0)
+    if baseline_frame is None:
+        baseline_frame = BenchmarkFrame.from_gbench(baseline_data)
+    if contender_frame is None:
+        contender_frame = BenchmarkFrame.from_gbench(contender_data)
+    common_benchmarks, baseline_rows, contender_rows = baseline_frame.align(contender_frame)
+    
+    # Improvements of all common benchmarks, one array per metric
+    baseline_values = {}
+    contender_values = {}
+    improvements = {}
+    for metric in ordered_metrics:
+        baseline_values[metric] = np.nan_to_num(baseline_frame.column(metric)[baseline_rows], nan=0.0)
+        contender_values[metric] = np.nan_to_num(contender_frame.column(metric)[contender_rows], nan=0.0)
+        improvements[metric] = calculate_improvements(baseline_values[metric], contender_values[metric], metric)
+    
+    if ordered_metrics:
+        all_improvements = np.array([improvements[metric] for metric in ordered_metrics])
+        # Best improvement / worst regression over all metrics of a benchmark
+        best_improvements = np.where(all_improvements > 0, all_improvements, -float('inf')).max(axis=0)
+        worst_regressions = np.where(all_improvements < 0, all_improvements, float('inf')).min(axis=0)
+    else:
+        best_improvements = np.full(len(common_benchmarks), -float('inf'))
+        worst_regressions = np.full(len(common_benchmarks), float('inf'))
     
     # Add rows for each common benchmark
-    for bench_name in sorted(common_benchmarks):
-        baseline_bench = baseline_benchmarks[bench_name]
-        contender_bench = contender_benchmarks[bench_name]
-        
+    for i, bench_name in enumerate(common_benchmarks.tolist()):
         row = [bench_name]
-        best_improvement = -float('inf')  # Track best improvement for winner
-        worst_regression = float('inf')   # Track worst regression
         
         # Process metrics in order
         for metric in ordered_metrics:
-            baseline_value = baseline_bench.get(metric, 0)
-            contender_value = contender_bench.get(metric, 0)
+            improvement = float(improvements[metric][i])
             
-            # Convert to float for calculation if possible
-            try:
-                baseline_float = float(baseline_value)
-                contender_float = float(contender_value)
-                
-                # Calculate improvement
-                improvement = calculate_improvement(baseline_float, contender_float, metric)
-                
-                # Track best improvement / worst regression
-                if improvement > 0 and improvement > best_improvement:
-                    best_improvement = improvement
-                elif improvement < 0 and improvement < worst_regression:
-                    worst_regression = improvement
-                
-                # Format values for table
-                if isinstance(baseline_value, (int, float)) and metric not in ["iterations", "threads", "repetitions"]:
-                    row.append(f"{baseline_float:.2f}")
+            # Format values for table (counts are printed as integers)
+            for frame, rows, values in ((baseline_frame, baseline_rows, baseline_values),
+                                        (contender_frame, contender_rows, contender_values)):
+                value = frame.value(metric, rows[i])
+                if metric not in ["iterations", "threads", "repetitions"]:
+                    row.append(f"{values[metric][i]:.2f}")
                 else:
-                    row.append(f"{baseline_value}")
-                    
-                if isinstance(contender_value, (int, float)) and metric not in ["iterations", "threads", "repetitions"]:
-                    row.append(f"{contender_float:.2f}")
-                else:
-                    row.append(f"{contender_value}")
+                    row.append(f"{value if value is not None else 0}")
+            
+            # Format improvement
+            if math.isfinite(improvement):
+                color = ""
+                if improvement > 0:
+                    color = "green"
+                elif improvement < 0:
+                    color = "red"
                 
-                # Format improvement
-                if math.isfinite(improvement):
-                    color = ""
-                    if improvement > 0:
-                        color = "green"
-                    elif improvement < 0:
-                        color = "red"
-                    
-                    row.append(f"<span style='color:{color}'>{improvement:.2f}%</span>")
+                row.append(f"<span style='color:{color}'>{improvement:.2f}%</span>")
+            else:
+                if improvement > 0:
+                    row.append("<span style='color:green'>∞</span>")
                 else:
-                    if improvement > 0:
-                        row.append("<span style='color:green'>∞</span>")
-                    else:
-                        row.append("<span style='color:red'>∞</span>")
-            except (ValueError, TypeError):
-                # Handle non-numeric values
-                row.append(f"{baseline_value}")
-                row.append(f"{contender_value}")
-                row.append("N/A")
+                    row.append("<span style='color:red'>∞</span>")
         
         # Determine overall winner based on best improvement or worst regression
         winner = "tie"
-        if best_improvement > 1.0:  # Significant improvement
+        if best_improvements[i] > 1.0:  # Significant improvement
             winner = contender_label
-        elif worst_regression < -1.0:  # Significant regression
+        elif worst_regressions[i] < -1.0:  # Significant regression
             winner = baseline_label
             
         row.append(winner)
@@ -333,16 +344,16 @@ def create_comparison_table(baseline_data, contender_data, baseline_label, conte
     
     # Check iterations differ
     if 'iterations' in common_metrics:
-        baseline_iterations = set(int(b.get('iterations', 0)) for b in baseline_data.get('benchmarks', []))
-        contender_iterations = set(int(b.get('iterations', 0)) for b in contender_data.get('benchmarks', []))
+        baseline_iterations = set(np.nan_to_num(baseline_frame.column('iterations'), nan=0).astype(np.int64).tolist())
+        contender_iterations = set(np.nan_to_num(contender_frame.column('iterations'), nan=0).astype(np.int64).tolist())
         
         if baseline_iterations != contender_iterations:
             warnings.append(f"**Iterations differ:** Baseline: {sorted(baseline_iterations)}, Contender: {sorted(contender_iterations)}")
     
     # Check if repetitions differ
     if 'repetitions' in common_metrics:
-        baseline_repetitions = set(int(b.get('repetitions', 1)) for b in baseline_data.get('benchmarks', []))
-        contender_repetitions = set(int(b.get('repetitions', 1)) for b in contender_data.get('benchmarks', []))
+        baseline_repetitions = set(np.nan_to_num(baseline_frame.column('repetitions'), nan=1).astype(np.int64).tolist())
+        contender_repetitions = set(np.nan_to_num(contender_frame.column('repetitions'), nan=1).astype(np.int64).tolist())
         
         if baseline_repetitions != contender_repetitions:
             warnings.append(f"**Repetitions differ:** Baseline: {sorted(baseline_repetitions)}, Contender: {sorted(contender_repetitions)}")
@@ -502,6 +513,44 @@ def create_metadata_comparison_table(baseline_metadata, contender_metadata):
     
     return table
 
+def create_instruction_mix_comparison_table(baseline_mix, contender_mix):
+    """Create a table comparing the static instruction mix of functions present in both runs.
+    
+    Vector and scalar FP counts are taken from the innermost loops when the function has
+    loops, so that a vectorized hot loop shows up even if the rest of the function is scalar.
+    
+    Args:
+        baseline_mix: Instruction mix from baseline (function name -> metrics)
+        contender_mix: Instruction mix from contender (function name -> metrics)
+    
+    Returns:
+        Markdown table as string
+    """
+    common_functions = sorted(set(baseline_mix.keys()) & set(contender_mix.keys()))
+    if not common_functions:
+        return "[No instruction mix comparison available]"
+    
+    def summarize(metrics):
+        loops = [loop["mix"] for loop in metrics.get("loops", []) if loop.get("innermost")]
+        source = loops if loops else [metrics]
+        vector_ops = sum(mix.get("vector_fp", 0) + mix.get("vector_int", 0) for mix in source)
+        scalar_fp = sum(mix.get("scalar_fp", 0) for mix in source)
+        return metrics.get("instructions", 0), vector_ops, scalar_fp, metrics.get("vectorized_loops", 0) > 0
+    
+    table = "| Function | Instructions (B / C) | Vector Ops (B / C) | Scalar FP (B / C) | Vectorized (B / C) |\n"
+    table += "|----------|----------------------|--------------------|-------------------|--------------------|\n"
+    
+    for func_name in common_functions:
+        b_insns, b_vector, b_scalar_fp, b_vectorized = summarize(baseline_mix[func_name])
+        c_insns, c_vector, c_scalar_fp, c_vectorized = summarize(contender_mix[func_name])
+        vectorized = f"{'yes' if b_vectorized else 'no'} / {'yes' if c_vectorized else 'no'}"
+        # Highlight functions vectorized by only one of the two configurations
+        if b_vectorized != c_vectorized:
+            vectorized = f"**{vectorized}**"
+        table += f"| `{func_name}` | {b_insns} / {c_insns} | {b_vector} / {c_vector} | {b_scalar_fp} / {c_scalar_fp} | {vectorized} |\n"
+    
+    return table
+
 def get_path_for_report(path, report_dir=None):
     """Convert a path to a format suitable for inclusion in a report.
     
@@ -673,11 +722,18 @@ def create_multi_comparison_report(baseline_dir, contender_dirs, experiment_name
     # Collect summary data for all experiments
     summary_data = []
     
+    # Runs are read through the SQLite results index (only new or changed runs are parsed)
+    try:
+        results_index = ResultsIndex(PROJECT_ROOT)
+    except sqlite3.Error as e:
+        logger.warning(f"Results index unavailable ({e}), reading result files directly")
+        results_index = None
+    
     for experiment_name in experiment_names:
         logger.info(f"Processing experiment: {experiment_name}")
         
         # Load baseline benchmark results
-        baseline_data, baseline_metadata = load_benchmark_results(baseline_dir, experiment_name)
+        baseline_data, baseline_metadata = load_benchmark_results(baseline_dir, experiment_name, results_index)
         
         # Skip if baseline data is missing
         if not baseline_data:
@@ -707,7 +763,7 @@ def create_multi_comparison_report(baseline_dir, contender_dirs, experiment_name
         
         for i, (contender_dir, contender_label) in enumerate(zip(valid_contenders, contender_labels)):
             # Load contender benchmark results
-            contender_data, contender_metadata = load_benchmark_results(contender_dir, experiment_name)
+            contender_data, contender_metadata = load_benchmark_results(contender_dir, experiment_name, results_index)
             
             # Skip this contender if data is missing
             if not contender_data:
@@ -743,28 +799,34 @@ def create_multi_comparison_report(baseline_dir, contender_dirs, experiment_name
             
             # Create comparison table
             report_content += f"### Benchmark Comparison: Baseline vs {contender_label}\n\n"
+            # Columnar frames: the exported benchmark_frame.npz if current, else built from the JSON
+            baseline_frame = load_benchmark_frame(baseline_dir / experiment_name) or BenchmarkFrame.from_gbench(baseline_data)
+            contender_frame = load_benchmark_frame(contender_dir / experiment_name) or BenchmarkFrame.from_gbench(contender_data)
             comparison_table = create_comparison_table(
-                baseline_data, contender_data, baseline_label, contender_label, common_metrics
+                baseline_data, contender_data, baseline_label, contender_label, common_metrics,
+                baseline_frame, contender_frame
             )
             report_content += comparison_table + "\n\n"
             
+            # Add instruction mix comparison (if both runs have assembly metrics)
+            baseline_mix = load_instruction_mix(baseline_dir / experiment_name / "assembly")
+            contender_mix = load_instruction_mix(contender_dir / experiment_name / "assembly")
+            if baseline_mix and contender_mix:
+                report_content += f"### Instruction Mix: Baseline vs {contender_label}\n\n"
+                report_content += create_instruction_mix_comparison_table(baseline_mix, contender_mix) + "\n\n"
+            
             # Add data to summary for this contender
             primary_metric = 'real_time' if 'real_time' in common_metrics else 'cpu_time'
             if primary_metric in common_metrics:
                 # Calculate average improvement for the experiment
-                improvements = []
-                baseline_benchmarks = {b['name']: b for b in baseline_data.get('benchmarks', [])}
-                contender_benchmarks = {b['name']: b for b in contender_data.get('benchmarks', [])}
-                common_benchmarks = set(baseline_benchmarks.keys()).intersection(set(contender_benchmarks.keys()))
-                
-                for bench_name in common_benchmarks:
-                    baseline_value = float(baseline_benchmarks[bench_name].get(primary_metric, 0))
-                    contender_value = float(contender_benchmarks[bench_name].get(primary_metric, 0))
-                    improvement = calculate_improvement(baseline_value, contender_value, primary_metric)
-                    if math.isfinite(improvement):
-                        improvements.append(improvement)
-                
-                avg_improvement = sum(improvements) / len(improvements) if improvements else 0
+                common_benchmarks, baseline_rows, contender_rows = baseline_frame.align(contender_frame)
+                improvements = calculate_improvements(
+                    np.nan_to_num(baseline_frame.column(primary_metric)[baseline_rows], nan=0.0),
+                    np.nan_to_num(contender_frame.column(primary_metric)[contender_rows], nan=0.0),
+                    primary_metric
+                )
+                improvements = improvements[np.isfinite(improvements)]
+                avg_improvement = float(improvements.mean()) if len(improvements) else 0
                 exp_summary_data[contender_label] = (avg_improvement, len(common_benchmarks))
                 valid_contender_count += 1
         
@@ -777,6 +839,9 @@ def create_multi_comparison_report(baseline_dir, contender_dirs, experiment_name
             if experiment_name not in [f[0] for f in failed_experiments]:
                 failed_experiments.append((experiment_name, "No valid contenders for comparison"))
     
+    if results_index is not None:
+        results_index.close()
+    
     # Add summary section after processing all experiments
     report_content = report_content.replace("## Summary of Results\n\n", "")  # Remove placeholder
     summary_section = "## Summary of Results\n\n"
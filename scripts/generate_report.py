@@ -10,7 +10,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from lib.logger import setup_logger, get_logger
 from lib.config import BenchEverythingConfig
-from lib.data_loader import find_all_result_dirs, load_benchmark_run
+from lib.data_loader import RunContext, find_all_result_dirs, load_benchmark_run, load_benchmark_runs
 from lib.template import TemplateRenderer
 
 # Setup logger first
@@ -53,11 +53,12 @@ def run_pre_report_script(experiment_name: str, results_dir: Path, assets_dir: P
         return True # Not a failure if script doesn't exist
 
 
-def generate_single_report(results_dir: Path, config: BenchEverythingConfig) -> bool:
-    """Generate a report for a single result directory."""
+def generate_single_report(results_dir: Path, config: BenchEverythingConfig, run_data=None) -> bool:
+    """Generate a report for a single result directory (run_data: already loaded BenchmarkRunData, if any)."""
     logger.info(f"--- Generating Report for: {results_dir} ---")
 
-    run_data = load_benchmark_run(results_dir)
+    if run_data is None:
+        run_data = load_benchmark_run(results_dir)
     if not run_data or run_data.load_error or not run_data.metadata:
         logger.error(f"Failed to load necessary data from {results_dir}. Skipping report generation.")
         return False
@@ -100,15 +101,14 @@ def generate_single_report(results_dir: Path, config: BenchEverythingConfig) ->
          logger.warning(f"Pre-report script failed for {experiment_name}. Report may be incomplete.")
          # Continue generating report anyway? Yes.
 
-    # Prepare context for template rendering
-    context = {
-        "experiment_name": experiment_name,
-        "results_dir": results_dir, # Pass results dir for related links
-        "gbench_data": run_data.gbench_data,
-        "metadata": run_data.metadata,
-        "perf_log": run_data.perf_log,
-        "assembly_files": run_data.assembly_files, # Dict: name -> Path
-    }
+    # Prepare context for template rendering. Run data (gbench_data, metadata, perf_log,
+    # assembly_files, annotated_assembly_files, instruction_mix, mca_analysis) is only
+    # loaded if the template has a placeholder that uses it.
+    context = RunContext(
+        run_data,
+        experiment_name=experiment_name,
+        results_dir=results_dir, # Pass results dir for related links
+    )
 
     # Render the template
     renderer = TemplateRenderer(template_path)
@@ -138,6 +138,16 @@ def main():
                              'If not specified, reports will be generated for all available results.')
     parser.add_argument('--config',
                         help='Path to a custom configuration file (used for resolving paths).')
+    parser.add_argument('--rescan', action='store_true',
+                        help='Walk all of results/ to update the results index instead of reading only the run journals.')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Number of threads loading result directories in parallel (default: CPUs + 4, at most 32).')
+    parser.add_argument('--experiments',
+                        help='Comma-separated list of experiments to generate reports for (default: all).')
+    parser.add_argument('--compiler',
+                        help='Only generate reports for this compiler (e.g., gcc or gcc-12.2.0).')
+    parser.add_argument('--build-flags',
+                        help='Comma-separated list of build flags identifiers to include (default: all).')
     args = parser.parse_args()
 
     try:
@@ -159,21 +169,34 @@ def main():
         else:
             # Generate reports for all found result directories
             logger.info("Searching for result directories to generate reports...")
-            results_dirs = find_all_result_dirs(project_root)
+            results_dirs = find_all_result_dirs(
+                project_root,
+                rescan=args.rescan,
+                experiment=args.experiments.split(',') if args.experiments else None,
+                compiler=args.compiler,
+                build_flags=args.build_flags.split(',') if args.build_flags else None
+            )
 
             if not results_dirs:
                 logger.info("No valid result directories found.")
                 sys.exit(0)
 
-            logger.info(f"Found {len(results_dirs)} result directories. Generating reports...")
+            logger.info(f"Found {len(results_dirs)} result directories. Loading results...")
+            runs, load_errors = load_benchmark_runs(results_dirs, max_workers=args.jobs)
+            logger.info(f"Loaded {len(results_dirs) - len(load_errors)} result directories. Generating reports...")
             all_success = True
             successful_reports = 0
             failed_reports = 0
 
-            for i, result_dir in enumerate(results_dirs):
+            for i, (result_dir, run_data) in enumerate(zip(results_dirs, runs)):
                  logger.info(f"\n--- Processing Result Directory {i+1}/{len(results_dirs)}: {result_dir.relative_to(project_root)} ---")
+                 if run_data is None:
+                     logger.error(f"Failed to load {result_dir}: {load_errors.get(result_dir)}. Skipping report generation.")
+                     failed_reports += 1
+                     all_success = False
+                     continue
                  try:
-                     success = generate_single_report(result_dir, config)
+                     success = generate_single_report(result_dir, config, run_data)
                      if success:
                          successful_reports += 1
                      else:
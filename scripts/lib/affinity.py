@@ -0,0 +1,100 @@
+# scripts/lib/affinity.py
+
+import os
+import shutil
+from typing import Dict, List, Optional, Set
+
+from .logger import get_logger
+
+logger = get_logger()
+
+
+def parse_cpu_list(spec: str) -> Set[int]:
+    """Parse a CPU list such as '2,3' or '0,4-7' (the taskset -c syntax)."""
+    cpus = set()
+    for part in [p.strip() for p in spec.split(',') if p.strip()]:
+        if '-' in part:
+            first, last = part.split('-', 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def format_cpu_list(cpus: Set[int]) -> str:
+    """Format CPUs as a compact list, e.g. {0, 4, 5, 6} -> '0,4-6'."""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+class CpuPinning:
+    """
+    Pins benchmark processes to a core set and keeps the orchestrator off it.
+
+    The orchestrator (this Python process, and therefore every build and tool it
+    spawns) is restricted to the remaining allowed CPUs; benchmark commands are started
+    through 'taskset -c <cpus>'. A preexec_fn is avoided, since it is unsafe while the
+    build and post-processing threads are running. Linux only (os.sched_setaffinity, taskset).
+    """
+
+    def __init__(self, spec: str):
+        self.benchmark_cpus: Set[int] = set()
+        self.orchestrator_cpus: Set[int] = set()
+        self.taskset_path = shutil.which("taskset")
+
+        if not hasattr(os, "sched_setaffinity"):
+            logger.warning("CPU pinning is not supported on this platform. Running unpinned.")
+            return
+        if not self.taskset_path:
+            logger.warning("taskset not found in PATH (util-linux). Running unpinned.")
+            return
+        try:
+            requested = parse_cpu_list(spec)
+        except ValueError:
+            logger.warning(f"Invalid CPU list '{spec}'. Running unpinned.")
+            return
+
+        allowed = os.sched_getaffinity(0)
+        unavailable = requested - allowed
+        if unavailable:
+            logger.warning(f"Ignoring CPUs not available to this process: {format_cpu_list(unavailable)}")
+        self.benchmark_cpus = requested & allowed
+        if not self.benchmark_cpus:
+            logger.warning(f"None of the requested CPUs ({spec}) are available. Running unpinned.")
+            return
+
+        self.orchestrator_cpus = allowed - self.benchmark_cpus
+        if not self.orchestrator_cpus:
+            logger.warning("All allowed CPUs are pinned for benchmarks; the orchestrator will share them.")
+            self.orchestrator_cpus = set(allowed)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.benchmark_cpus)
+
+    def isolate_orchestrator(self):
+        """Restrict the current process to the non-benchmark CPUs (inherited by threads started later)."""
+        if not self.enabled:
+            return
+        os.sched_setaffinity(0, self.orchestrator_cpus)
+        logger.info(f"Benchmarks pinned to CPUs {format_cpu_list(self.benchmark_cpus)}; "
+                    f"orchestrator and builds on CPUs {format_cpu_list(self.orchestrator_cpus)}")
+
+    def pin_command(self, cmd: List[str]) -> List[str]:
+        """Prefix cmd with taskset so it runs on the benchmark CPUs (unchanged if pinning is off)."""
+        if not self.enabled:
+            return list(cmd)
+        return [self.taskset_path, "-c", format_cpu_list(self.benchmark_cpus)] + list(cmd)
+
+    def to_metadata(self) -> Optional[Dict[str, List[int]]]:
+        if not self.enabled:
+            return None
+        return {
+            "benchmark_cpus": sorted(self.benchmark_cpus),
+            "orchestrator_cpus": sorted(self.orchestrator_cpus),
+        }
@@ -0,0 +1,119 @@
+# scripts/lib/annotate.py
+
+import os
+import re
+import shutil
+import subprocess
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .elf import read_elf_symbols
+from .logger import get_logger
+
+logger = get_logger()
+
+PERF_DATA_FILE = "perf.data"
+ANNOTATED_DIR = "annotated"
+
+# objdump instruction line, e.g. "    1314:\tadd    %eax,%ebx"
+INSTRUCTION_LINE_RE = re.compile(r'^\s*([0-9a-f]+):\t')
+# perf script -F ip,sym,symoff,dso, e.g. "    55d0c5a7a314 _Z14BM_IntAdditionRN9benchmark5StateE+0x14 (/path/exe)"
+PERF_SCRIPT_LINE_RE = re.compile(r'^\s*[0-9a-f]+\s+(\S+)\+0x([0-9a-f]+)\s+\((.+)\)\s*$')
+
+
+def load_perf_samples(perf_data: Path, benchmark_exe: Path) -> Optional[Tuple[Counter, int]]:
+    """
+    Count the perf record samples that fall into the benchmark executable.
+
+    Samples are resolved as symbol + offset (mangled names) and translated to the
+    link-time addresses that objdump prints, using the executable's ELF symbol table.
+    Runtime addresses cannot be used directly because the executable is usually PIE.
+
+    Returns:
+        (Counter of instruction address -> samples, total samples in all DSOs),
+        or None if perf script fails or the symbols cannot be read.
+    """
+    perf_path = shutil.which("perf")
+    if not perf_path:
+        logger.warning("perf command not found, cannot read profile samples.")
+        return None
+    symbols = read_elf_symbols(benchmark_exe)
+    if not symbols:
+        logger.warning(f"Could not read ELF symbols of {benchmark_exe}, cannot map profile samples.")
+        return None
+    symbol_addresses = {symbol.name: symbol.address for symbol in symbols}
+
+    script_cmd = [perf_path, "script", "-i", str(perf_data), "-F", "ip,sym,symoff,dso", "--no-demangle"]
+    try:
+        result = subprocess.run(script_cmd, capture_output=True, text=True, check=True, timeout=300, errors='ignore')
+    except subprocess.CalledProcessError as e:
+        logger.warning(f"perf script failed (return code {e.returncode}): {e.stderr[:1000] if e.stderr else ''}")
+        return None
+    except (subprocess.TimeoutExpired, OSError) as e:
+        logger.warning(f"Error running perf script: {e}")
+        return None
+
+    exe_name = benchmark_exe.name
+    samples: Counter = Counter()
+    total = 0
+    for line in result.stdout.splitlines():
+        if not line.strip():
+            continue
+        total += 1
+        match = PERF_SCRIPT_LINE_RE.match(line)
+        if not match or os.path.basename(match.group(3)) != exe_name:
+            continue
+        address = symbol_addresses.get(match.group(1))
+        if address is not None:
+            samples[address + int(match.group(2), 16)] += 1
+    return samples, total
+
+
+def annotate_assembly(lines: List[str], samples: Counter) -> Tuple[List[str], int]:
+    """
+    Prefix every line of an objdump snippet with the sample share of its instruction.
+
+    Percentages are relative to the samples of the snippet itself (as in perf annotate);
+    source lines and instructions without samples get an empty column.
+
+    Returns:
+        (annotated lines, number of samples in the snippet)
+    """
+    counts = []
+    for line in lines:
+        match = INSTRUCTION_LINE_RE.match(line)
+        counts.append(samples.get(int(match.group(1), 16), 0) if match else 0)
+    function_samples = sum(counts)
+
+    annotated = []
+    for line, count in zip(lines, counts):
+        column = f"{100.0 * count / function_samples:6.2f}%" if count else " " * 7
+        annotated.append(f"{column} | {line}")
+    return annotated, function_samples
+
+
+def write_annotated_assembly(assembly_dir: Path, samples: Counter, total_samples: int) -> Dict[str, int]:
+    """
+    Write assembly/annotated/<function>.s for every extracted snippet in assembly_dir.
+
+    Returns:
+        Mapping of function name to the number of samples attributed to it.
+    """
+    annotated_dir = assembly_dir / ANNOTATED_DIR
+    os.makedirs(annotated_dir, exist_ok=True)
+    function_samples = {}
+    for asm_file in sorted(assembly_dir.glob("*.s")):
+        try:
+            with open(asm_file, 'r', encoding='utf-8', errors='ignore') as f:
+                lines = f.read().splitlines()
+            annotated, count = annotate_assembly(lines, samples)
+            share = 100.0 * count / total_samples if total_samples else 0.0
+            header = [f"// Samples: {count} of {total_samples} ({share:.2f}% of the profile)",
+                      "// Percent: share of this function's samples per instruction"]
+            with open(annotated_dir / asm_file.name, 'w', encoding='utf-8') as f:
+                f.write("\n".join(header + annotated) + "\n")
+            function_samples[asm_file.stem] = count
+        except Exception as e:
+            logger.warning(f"Failed to annotate {asm_file}: {e}")
+    return function_samples
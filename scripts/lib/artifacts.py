@@ -0,0 +1,129 @@
+# scripts/lib/artifacts.py
+
+import gzip
+import io
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Optional
+
+from .logger import get_logger
+
+try:
+    import zstandard
+except ImportError: # Optional: only needed for --compress-artifacts zstd and reading .zst files
+    zstandard = None
+
+logger = get_logger()
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+INDEX_FILE = "index.json"
+# Large, rarely read text artifacts of an assembly/ directory
+COMPRESSIBLE_PATTERNS = ("*.s", "full_*.txt", "annotated/*.s")
+
+
+def strip_compression_suffix(name: str) -> str:
+    """'BM_X.s.zst' -> 'BM_X.s'; names without a compression suffix are returned unchanged."""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def resolve_compression(method: str) -> str:
+    """Return the usable compression method, falling back to gzip if zstandard is not installed."""
+    if method == "zstd" and zstandard is None:
+        logger.warning("The 'zstandard' package is not installed. Compressing artifacts with gzip instead.")
+        return "gzip"
+    return method
+
+
+def compress_file(path: Path, method: str) -> Path:
+    """Compress path to path<suffix> (streamed, reproducible output) and remove the original."""
+    target = path.with_name(path.name + COMPRESSION_SUFFIXES[method])
+    tmp_path = target.with_name(target.name + ".tmp")
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        if method == "zstd":
+            with zstandard.ZstdCompressor(level=10).stream_writer(dst, closefd=False) as writer:
+                shutil.copyfileobj(src, writer)
+        else:
+            # No file name or timestamp in the header, so identical inputs give identical files
+            with gzip.GzipFile(filename="", mode='wb', fileobj=dst, compresslevel=9, mtime=0) as writer:
+                shutil.copyfileobj(src, writer)
+    os.replace(tmp_path, target)
+    path.unlink()
+    return target
+
+
+def read_artifact_text(path: Path) -> str:
+    """Read a (possibly gzip/zstd compressed) text artifact, decompressing on demand."""
+    if path.name.endswith(COMPRESSION_SUFFIXES["gzip"]):
+        with gzip.open(path, 'rt', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    if path.name.endswith(COMPRESSION_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path.name} requires the 'zstandard' package")
+        with open(path, 'rb') as fh, zstandard.ZstdDecompressor().stream_reader(fh) as reader:
+            return io.TextIOWrapper(reader, encoding='utf-8', errors='replace').read()
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def remove_compressed_artifacts(assembly_dir: Path):
+    """Delete compressed artifacts and the index left by an earlier run."""
+    (assembly_dir / INDEX_FILE).unlink(missing_ok=True)
+    for pattern in COMPRESSIBLE_PATTERNS:
+        for suffix in COMPRESSION_SUFFIXES.values():
+            for stale_file in assembly_dir.glob(pattern + suffix):
+                stale_file.unlink()
+
+
+def compress_assembly_dir(assembly_dir: Path, method: str) -> Optional[Dict]:
+    """
+    Compress the assembly snippets, full dumps and annotated snippets of assembly_dir and
+    write assembly/index.json, mapping each original file name to its compressed file.
+
+    Small JSON outputs (instruction mix, llvm-mca) are left uncompressed.
+
+    Returns:
+        Summary with the method and the original/compressed byte counts, or None on failure.
+    """
+    method = resolve_compression(method)
+    files = {}
+    try:
+        for pattern in COMPRESSIBLE_PATTERNS:
+            for path in sorted(assembly_dir.glob(pattern)):
+                original_size = path.stat().st_size
+                target = compress_file(path, method)
+                files[path.relative_to(assembly_dir).as_posix()] = {
+                    "file": target.relative_to(assembly_dir).as_posix(),
+                    "size": original_size,
+                    "compressed_size": target.stat().st_size,
+                }
+    except Exception as e:
+        logger.error(f"Failed to compress artifacts in {assembly_dir}: {e}")
+        return None
+
+    index = {
+        "compression": method,
+        "original_bytes": sum(entry["size"] for entry in files.values()),
+        "compressed_bytes": sum(entry["compressed_size"] for entry in files.values()),
+        "files": files,
+    }
+    with open(assembly_dir / INDEX_FILE, 'w') as f:
+        json.dump(index, f, indent=2)
+    return {key: index[key] for key in ("compression", "original_bytes", "compressed_bytes")}
+
+
+def load_artifact_index(assembly_dir: Path) -> Optional[Dict]:
+    """Load assembly/index.json, or None if the directory holds uncompressed artifacts only."""
+    index_path = assembly_dir / INDEX_FILE
+    if not index_path.exists():
+        return None
+    try:
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not read artifact index {index_path}: {e}")
+        return None
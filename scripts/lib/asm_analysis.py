@@ -0,0 +1,199 @@
+# scripts/lib/asm_analysis.py
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .logger import get_logger
+
+logger = get_logger()
+
+METRICS_SUFFIX = ".metrics.json"
+
+# objdump/llvm-objdump instruction line: "    1314:\tadd    %eax,%ebx" or "100002a24:     \tbl\t0x1000045d0 <...>"
+INSTRUCTION_LINE_RE = re.compile(r'^\s*([0-9a-f]+):[ ]*\t\s*(\S+)(?:\s+(.*?))?\s*$')
+# Symbol label starting a disassembled range: "0000000000001310 <BM_Foo(benchmark::State&) [clone .cold]>:"
+SYMBOL_LINE_RE = re.compile(r'^[0-9a-f]+ <.*>:\s*$')
+# Direct branch target: the last (hex) operand, e.g. "1328", "0x100002a28" or "x0, 0x100002a28"
+BRANCH_TARGET_RE = re.compile(r'(?:^|[\s,])(?:0x)?([0-9a-f]+)$')
+SYMBOLIC_TARGET_RE = re.compile(r'\s*<.*$')  # Trailing "<symbol+0x10>" (may contain nested '<>')
+
+X86_PREFIXES = {"rep", "repz", "repe", "repnz", "repne", "lock", "notrack", "bnd", "data16", "cs", "ds", "addr32"}
+X86_NOT_VECTOR_INT = ("push", "pop", "pause", "prefetch", "popcnt", "pdep", "pext")
+AARCH64_BRANCHES = {"b", "br", "cbz", "cbnz", "tbz", "tbnz"}
+AARCH64_VECTOR_OPERAND_RE = re.compile(r'\b(?:v\d+\.\d*[bhsdq]|z\d+\.[bhsdq]|q\d+)\b')
+
+MIX_CATEGORIES = ("vector_fp", "scalar_fp", "vector_int", "scalar_int", "memory", "calls", "branches")
+
+
+class Instruction(NamedTuple):
+    address: int
+    mnemonic: str
+    operands: str
+    fragment: int = 0  # Index of the symbol range (e.g. hot part or [clone .cold]) in the snippet
+
+
+def parse_instructions(lines: List[str]) -> List[Instruction]:
+    """Parse the instruction lines of an objdump snippet (source lines are skipped, label lines start a new fragment)."""
+    instructions = []
+    fragment = 0
+    for line in lines:
+        if SYMBOL_LINE_RE.match(line):
+            fragment += 1
+            continue
+        match = INSTRUCTION_LINE_RE.match(line)
+        if match:
+            instructions.append(Instruction(int(match.group(1), 16), match.group(2).lower(), match.group(3) or "", fragment))
+    return instructions
+
+
+def detect_isa(instructions: List[Instruction]) -> str:
+    """AT&T syntax (GNU objdump on x86) marks registers with '%'; everything else is treated as AArch64."""
+    return "x86" if any('%' in insn.operands for insn in instructions) else "aarch64"
+
+
+def strip_operands(operands: str, isa: str) -> str:
+    """Remove the symbolic "<symbol+0x10>" annotation and trailing comments from objdump operands."""
+    operands = SYMBOLIC_TARGET_RE.sub('', operands)
+    comment = re.search(r'\s#' if isa == "x86" else r'\s(?://|;)', operands)
+    return operands[:comment.start()].strip() if comment else operands.strip()
+
+
+def _classify_x86(mnemonic: str, operands: str) -> Dict[str, bool]:
+    # objdump prints prefixes as separate words: "rep stos %al,(%rdi)", "data16 cs nopw 0x0(...)"
+    while mnemonic in X86_PREFIXES and operands:
+        mnemonic, _, operands = operands.partition(' ')
+        operands = operands.strip()
+    is_call = mnemonic.startswith("call")
+    is_branch = mnemonic.startswith(("j", "loop"))
+    is_nop = mnemonic.startswith(("nop", "endbr")) or mnemonic in ("ret", "retq", "leave", "leaveq", "hlt", "ud2", "int3")
+    # Mnemonics without the AVX 'v' prefix: vaddps -> addps, vpaddd -> paddd
+    base = mnemonic[1:] if mnemonic.startswith("v") and mnemonic not in ("verr", "verw") else mnemonic
+    vector_fp = base.endswith(("ps", "pd")) or base.startswith(("broadcastf", "broadcasts", "insertf", "extractf", "perm2f"))
+    vector_int = not vector_fp and (
+        (base.startswith("p") and not base.startswith(X86_NOT_VECTOR_INT))
+        or base.startswith(("movdq", "broadcasti", "inserti", "extracti", "perm2i"))
+    )
+    scalar_fp = not (vector_fp or vector_int) and (
+        bool(re.search(r'(ss|sd)(?:[lq]|2si[lq]?)?$', base)) or (mnemonic.startswith("f") and not is_nop)
+    )
+    memory = '(' in operands and not mnemonic.startswith(("lea", "nop"))
+    return {
+        "vector_fp": vector_fp, "scalar_fp": scalar_fp, "vector_int": vector_int,
+        "scalar_int": not (vector_fp or vector_int or scalar_fp or is_call or is_branch or is_nop),
+        "memory": memory, "calls": is_call, "branches": is_branch,
+    }
+
+
+def _classify_aarch64(mnemonic: str, operands: str) -> Dict[str, bool]:
+    is_call = mnemonic in ("bl", "blr")
+    is_branch = mnemonic in AARCH64_BRANCHES or mnemonic.startswith("b.")
+    is_nop = mnemonic in ("nop", "ret", "hint", "brk") or mnemonic.startswith(("pac", "aut", "bti"))
+    memory = '[' in operands
+    is_fp_op = mnemonic.startswith("f") or mnemonic in ("scvtf", "ucvtf")
+    vector = bool(AARCH64_VECTOR_OPERAND_RE.search(operands)) and not memory
+    vector_fp = vector and is_fp_op
+    vector_int = vector and not is_fp_op
+    scalar_fp = is_fp_op and not vector
+    return {
+        "vector_fp": vector_fp, "scalar_fp": scalar_fp, "vector_int": vector_int,
+        "scalar_int": not (vector or scalar_fp or is_call or is_branch or is_nop),
+        "memory": memory, "calls": is_call, "branches": is_branch,
+    }
+
+
+def classify_instruction(insn: Instruction, isa: str) -> Dict[str, bool]:
+    """Return the MIX_CATEGORIES flags of a single instruction."""
+    classify = _classify_x86 if isa == "x86" else _classify_aarch64
+    return classify(insn.mnemonic, strip_operands(insn.operands, isa))
+
+
+def get_branch_target(insn: Instruction, isa: str) -> Optional[int]:
+    """Return the target address of a direct branch, or None (not a branch, or indirect)."""
+    if not classify_instruction(insn, isa)["branches"]:
+        return None
+    match = BRANCH_TARGET_RE.search(strip_operands(insn.operands, isa))
+    return int(match.group(1), 16) if match else None
+
+
+def _count_mix(instructions: List[Instruction], isa: str) -> Dict[str, int]:
+    counts = {"instructions": len(instructions)}
+    counts.update({category: 0 for category in MIX_CATEGORIES})
+    for insn in instructions:
+        for category, flag in classify_instruction(insn, isa).items():
+            counts[category] += flag
+    return counts
+
+
+def find_loops(instructions: List[Instruction], isa: str) -> List[Dict]:
+    """
+    Find loop bodies as backward branches within the snippet.
+
+    A loop spans from the branch target to the branch itself. Only branches within one
+    symbol fragment count: a jump from the hot part back into a lower-address
+    [clone .cold] fragment is not a loop. Loops that contain no other loop are marked innermost.
+    """
+    fragments = {insn.address: insn.fragment for insn in instructions}
+    loops = []
+    for insn in instructions:
+        target = get_branch_target(insn, isa)
+        if target is None or target > insn.address or fragments.get(target) != insn.fragment:
+            continue
+        body = [i for i in instructions if target <= i.address <= insn.address and i.fragment == insn.fragment]
+        loops.append({"start": f"{target:#x}", "end": f"{insn.address:#x}", "mix": _count_mix(body, isa)})
+
+    # Deduplicate (several back edges to the same header) and mark innermost loops
+    unique = {(loop["start"], loop["end"]): loop for loop in loops}
+    loops = sorted(unique.values(), key=lambda loop: int(loop["start"], 16))
+    for loop in loops:
+        start, end = int(loop["start"], 16), int(loop["end"], 16)
+        loop["innermost"] = not any(
+            other is not loop and start <= int(other["start"], 16) and int(other["end"], 16) <= end
+            for other in loops
+        )
+    return loops
+
+
+def analyze_assembly(lines: List[str]) -> Optional[Dict]:
+    """
+    Compute the static instruction mix of an extracted assembly snippet.
+
+    Categories are counted per instruction: vector_fp/scalar_fp/vector_int/scalar_int by
+    operation type; memory (any memory operand), calls and branches independently.
+
+    Returns:
+        The metrics dictionary, or None if the snippet contains no instructions.
+    """
+    instructions = parse_instructions(lines)
+    if not instructions:
+        return None
+    isa = detect_isa(instructions)
+    loops = find_loops(instructions, isa)
+    metrics = {"isa": isa}
+    metrics.update(_count_mix(instructions, isa))
+    metrics["loops"] = loops
+    metrics["vectorized_loops"] = sum(1 for loop in loops if loop["mix"]["vector_fp"] or loop["mix"]["vector_int"])
+    return metrics
+
+
+def write_instruction_mix(assembly_dir: Path) -> int:
+    """
+    Write <function>.metrics.json next to every extracted <function>.s in assembly_dir.
+
+    Returns:
+        The number of metrics files written.
+    """
+    written = 0
+    for asm_file in sorted(assembly_dir.glob("*.s")):
+        try:
+            with open(asm_file, 'r', encoding='utf-8', errors='ignore') as f:
+                metrics = analyze_assembly(f.read().splitlines())
+            if metrics is None:
+                continue
+            with open(assembly_dir / f"{asm_file.stem}{METRICS_SUFFIX}", 'w', encoding='utf-8') as f:
+                json.dump({"function": asm_file.stem, **metrics}, f, indent=2)
+            written += 1
+        except Exception as e:
+            logger.warning(f"Failed to analyze instruction mix of {asm_file}: {e}")
+    return written
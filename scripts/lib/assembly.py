@@ -1,19 +1,169 @@
+import bisect
 import subprocess
 import re
 import os
 from pathlib import Path
 import platform
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Iterable, Iterator, Callable
 import shutil
+import tempfile
+import threading
 
 from .logger import get_logger
+from .assembly_cache import AssemblyCache
+from .asm_analysis import write_instruction_mix
+from .elf import read_elf_symbols, demangle_symbols
+from .metadata import generate_content_hash
 
 logger = get_logger()
 
+# Bump whenever the extraction output changes, so cached assembly is not reused
+EXTRACTOR_VERSION = 4
+# Instruction line of objdump output, e.g. '    2a0e:\txchg   %ax,%ax'
+INSTRUCTION_ADDRESS = re.compile(r'^\s*([0-9a-f]+):\t')
+
+
+def _symbol_key(symbol: str) -> str:
+    """
+    Reduce a demangled symbol to its qualified name for lookups, e.g.
+    'void BM_Foo<std::vector<int> >(benchmark::State&) [clone .cold]' -> 'BM_Foo<std::vector<int> >'.
+    """
+    symbol = re.sub(r"(\s*\[clone [^\]]*\])+$", "", symbol)
+    depth, name_start, name_end = 0, 0, len(symbol)
+    for i, ch in enumerate(symbol):
+        if ch == '<':
+            depth += 1
+        elif ch == '>':
+            depth = max(0, depth - 1)
+        elif depth == 0 and ch == ' ':
+            name_start = i + 1 # Skip the return type of template functions
+        elif depth == 0 and ch == '(':
+            name_end = i
+            break
+    return symbol[name_start:name_end]
+
+
+def _stream_command(cmd: List[str], timeout: int) -> Iterator[str]:
+    """
+    Run cmd and yield its stdout line by line without buffering the whole output.
+
+    Raises subprocess.CalledProcessError / subprocess.TimeoutExpired like subprocess.run(check=True).
+    stderr goes to a temporary file so a chatty tool cannot block on a full pipe.
+    """
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, text=True, errors='ignore')
+        timed_out = threading.Event()
+
+        def _kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, _kill)
+        timer.start()
+        try:
+            for line in proc.stdout:
+                yield line.rstrip('\n')
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+            if proc.poll() is None: # Consumer stopped early
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        if returncode != 0:
+            stderr_file.seek(0)
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr_file.read().decode('utf-8', errors='ignore'))
+
+
+class DisassemblyIndex:
+    """
+    Symbol index over objdump output, built in a single pass.
+
+    Every '<address> <symbol>:' label owns the lines up to the next label. Symbols are
+    indexed both verbatim and by their qualified name without return type, parameter
+    list and clone suffix, so looking up a function is a dictionary access plus a slice.
+
+    The lines can be streamed; with a keep predicate only the spans of matching
+    symbols are retained, so memory does not grow with the size of the binary.
+    """
+
+    LABEL_RE = re.compile(r"^([0-9a-f]+)\s+<(.*)>:\s*$")
+
+    def __init__(self, lines: Iterable[str], keep: Optional[Callable[[str], bool]] = None):
+        self.lines: List[str] = []
+        self.labels: List[Tuple[str, int, int]] = [] # (symbol, first line, end line) in file order
+        self._ordinals: List[int] = [] # Position of each kept label among all labels of the output
+        self._by_key: Dict[str, List[int]] = {}
+
+        capturing = False
+        ordinal = -1
+        for line in lines:
+            if line.rstrip().endswith(">:"): # Cheap pre-filter before the regex
+                match = self.LABEL_RE.match(line)
+                if match:
+                    self._close_span()
+                    ordinal += 1
+                    symbol = match.group(2)
+                    capturing = keep is None or keep(symbol)
+                    if capturing:
+                        n = len(self.labels)
+                        self.labels.append((symbol, len(self.lines), -1))
+                        self._ordinals.append(ordinal)
+                        for key in {symbol, _symbol_key(symbol)}:
+                            self._by_key.setdefault(key, []).append(n)
+                    else:
+                        continue
+            if capturing:
+                self.lines.append(line)
+        self._close_span()
+
+    def _close_span(self):
+        """End the span of the last label at the current line."""
+        if self.labels and self.labels[-1][2] < 0:
+            symbol, start, _ = self.labels[-1]
+            self.labels[-1] = (symbol, start, len(self.lines))
+
+    def find(self, name: str) -> List[int]:
+        """
+        Return the labels for a function name: exact (qualified) name matches, or else
+        every label containing the name, as the original line scan did.
+        """
+        if name in self._by_key:
+            return self._by_key[name]
+        return [n for n, (symbol, _, _) in enumerate(self.labels) if name in symbol]
+
+    def find_first(self, pattern: re.Pattern) -> Optional[int]:
+        """Return the first label whose label line matches pattern (re.search)."""
+        for n, (_, start, _) in enumerate(self.labels):
+            if pattern.search(self.lines[start]):
+                return n
+        return None
+
+    def get_lines(self, n: int) -> List[str]:
+        _, start, end = self.labels[n]
+        return self.lines[start:end]
+
+    def get_run_lines(self, first: int, continue_pattern: re.Pattern) -> List[str]:
+        """Lines of label 'first' and of the directly following labels matching continue_pattern."""
+        func_asm = self.get_lines(first)
+        for n in range(first + 1, len(self.labels)):
+            if self._ordinals[n] != self._ordinals[n - 1] + 1: # A dropped label lies in between
+                break
+            if not continue_pattern.search(self.lines[self.labels[n][1]]):
+                break
+            func_asm.extend(self.get_lines(n))
+        return func_asm
+
+
 class AssemblyExtractor:
     """Extracts assembly code for benchmark functions. (Identical logic to original run_benchmarks.py)"""
 
-    def __init__(self, build_dir: Path, experiment_name: str, benchmark_executable_name: str, project_root: Path):
+    def __init__(self, build_dir: Path, experiment_name: str, benchmark_executable_name: str, project_root: Path,
+                 full_dump: bool = False, cache: Optional[AssemblyCache] = None,
+                 content_components: Optional[Dict[str, str]] = None):
         self.build_dir = build_dir
         self.experiment_name = experiment_name
         self.benchmark_executable_name = benchmark_executable_name
@@ -22,6 +172,14 @@ class AssemblyExtractor:
         self.is_macos = platform.system() == 'Darwin'
         # Store experiment details needed by helper functions originally taking 'experiment' dict
         self.experiment_details = {"name": experiment_name, "benchmark_executable": benchmark_executable_name}
+        # Write full_mixed_assembly.txt/full_disassembly.txt (disassembles the whole executable)
+        self.full_dump = full_dump
+        # [start, stop) address ranges of the benchmark symbols, filled from nm -S; None if unknown
+        self.symbol_ranges: Optional[List[Tuple[int, int]]] = None
+        # Optional content-addressed cache of extracted assembly directories
+        self.cache = cache
+        # 'sources'/'executable' digests from generate_content_hash(), if already computed by the caller
+        self.content_components = content_components
 
     # ========================================================================
     # Main Public Method (Entry Point) - Mirrors original extract_assembly
@@ -30,8 +188,10 @@ class AssemblyExtractor:
         """Extract assembly for benchmark functions with source code mapping."""
         logger.info(f"Extracting assembly for {self.experiment_name}...") # Use self.experiment_name
 
-        # Create assembly directory within the output_dir
+        # Start from an empty assembly directory: files of an earlier extraction (error markers,
+        # full dumps, annotations) must not mix with a restored or re-extracted one
         assembly_dir = output_dir / "assembly"
+        shutil.rmtree(assembly_dir, ignore_errors=True)
         os.makedirs(assembly_dir, exist_ok=True)
 
         # Get the benchmark executable path (already calculated in __init__)
@@ -40,6 +200,39 @@ class AssemblyExtractor:
             logger.error(f"Benchmark executable not found: {benchmark_exe}")
             return # Match original behavior (return without error)
 
+        cache_key = self._get_cache_key(build_flags_id) if self.cache else None
+        if cache_key and self.cache.restore(cache_key, assembly_dir):
+            logger.info(f"Assembly for {self.experiment_name} restored from cache ({cache_key[:12]})")
+            return
+
+        self._extract_assembly_uncached(benchmark_exe, assembly_dir, build_flags_id)
+        # Static instruction mix (<function>.metrics.json), cached together with the snippets
+        write_instruction_mix(assembly_dir)
+
+        # Only cache successful extractions
+        if cache_key and any(assembly_dir.glob("*.s")) and not (assembly_dir / "_extraction_error.txt").exists():
+            self.cache.store(cache_key, assembly_dir)
+
+    def _get_cache_key(self, build_flags_id: str) -> Optional[str]:
+        """Cache key over the executable, the experiment sources and the extraction options."""
+        try:
+            components = self.content_components or generate_content_hash(
+                self.project_root / "experiments" / self.experiment_name, self.benchmark_exe_path, ""
+            )[1]
+            return AssemblyCache.get_key({
+                "extractor_version": EXTRACTOR_VERSION,
+                "executable": components["executable"],
+                "sources": components["sources"],
+                "has_debug_info": "Debug" in build_flags_id or "RelWithDebInfo" in build_flags_id,
+                "full_dump": self.full_dump,
+                "platform": platform.system(),
+            })
+        except Exception as e:
+            logger.warning(f"Could not compute assembly cache key: {e}")
+            return None
+
+    def _extract_assembly_uncached(self, benchmark_exe: Path, assembly_dir: Path, build_flags_id: str):
+        """Run nm/objdump (and dsymutil on macOS) and write the per-function snippets."""
         # --- Mirroring original extract_assembly function ---
         # 1. Find benchmark functions (using original helpers)
         # Try to get benchmark functions from nm first (more reliable)
@@ -103,50 +296,164 @@ class AssemblyExtractor:
     # ========================================================================
 
     def _get_benchmark_functions_nm_mapping(self, benchmark_exe): # Added self, takes benchmark_exe
-        """Get a mapping from benchmark function names to their mangled names using nm."""
-        # (Identical logic to original _get_benchmark_functions_nm_mapping)
+        """
+        Get a mapping from benchmark function names to their demangled signatures.
+
+        Symbols come from the ELF symbol table read in-process (see lib/elf.py) and demangled
+        with c++filt, with nm -C as the fallback (e.g. Mach-O on macOS, or no c++filt). Also records the address ranges of the
+        benchmark functions for targeted disassembly.
+        """
         try:
-            nm_path = shutil.which("nm") # Check if nm exists
-            if not nm_path:
-                 logger.warning("'nm' command not found.")
-                 return [], {}
-            # Run nm with demangling to get symbol information
-            nm_cmd = [nm_path, "-C", str(benchmark_exe)]
-            result = subprocess.run(nm_cmd, capture_output=True, text=True, check=True, timeout=30, errors='ignore') # Added timeout/ignore
+            symbols = self._read_benchmark_symbols_elf(benchmark_exe)
+            if symbols is None:
+                symbols = self._read_benchmark_symbols_nm(benchmark_exe)
+            if symbols is None:
+                return [], {}
 
-            # Parse the output to find benchmark functions
+            # Parse the symbols to find benchmark functions
             benchmark_functions = []
             name_mapping = {}  # Maps benchmark names to their fully mangled versions
-
-            for line in result.stdout.splitlines():
-                if "BM_" in line:  # Only look at benchmark functions
-                    parts = line.split(' ', 2)
-                    if len(parts) >= 3:
-                        demangled_name = parts[2]
-                        # Extract just the function name part for our benchmark functions
-                        if demangled_name.startswith("void BM_"):
-                            # Remove the "void " prefix and anything after the function signature
-                            func_sig = demangled_name.split("(")[0][5:]  # Remove "void " and anything after "("
-
-                            # Simplify the name for matching purposes (converts from mangled to clean name)
-                            clean_name = func_sig
-                            # Replace std::__1:: with std::
-                            clean_name = clean_name.replace("std::__1::", "std::")
-                            # Remove allocator references
-                            clean_name = re.sub(r', std::\w+<[^>]+>\s*>', '>', clean_name)
-                            clean_name = clean_name.strip() # Added strip
-
-                            # Add to the list of benchmark functions
-                            if clean_name not in name_mapping: # Avoid duplicates from nm output
-                                benchmark_functions.append(clean_name)
-                                # Save mapping between clean name and demangled name (signature part)
-                                name_mapping[clean_name] = func_sig
-
+            symbol_ranges = []
+
+            for demangled_name, address, size, is_function in symbols:
+                if is_function and address is not None and size > 0:
+                    symbol_ranges.append((address, address + size))
+                # Extract just the function name part for our benchmark functions
+                if demangled_name.startswith("void BM_"):
+                    # Remove the "void " prefix and anything after the function signature
+                    func_sig = demangled_name.split("(")[0][5:]  # Remove "void " and anything after "("
+                elif is_function and demangled_name.startswith("BM_") and "(" in demangled_name:
+                    # Non-template benchmark functions are demangled without a return type
+                    func_sig = demangled_name.split("(")[0]
+                else:
+                    continue
+
+                # Simplify the name for matching purposes (converts from mangled to clean name)
+                clean_name = func_sig
+                # Replace std::__1:: with std::
+                clean_name = clean_name.replace("std::__1::", "std::")
+                # Remove allocator references
+                clean_name = re.sub(r', std::\w+<[^>]+>\s*>', '>', clean_name)
+                clean_name = clean_name.strip() # Added strip
+
+                # Add to the list of benchmark functions
+                if clean_name not in name_mapping: # Avoid duplicates (clones, symtab + dynsym)
+                    benchmark_functions.append(clean_name)
+                    # Save mapping between clean name and demangled name (signature part)
+                    name_mapping[clean_name] = func_sig
+
+            self.symbol_ranges = self._merge_ranges(symbol_ranges) if symbol_ranges else None
             return sorted(list(set(benchmark_functions))), name_mapping # Ensure uniqueness and sort
         except Exception as e:
-            logger.warning(f"Error getting function names using nm: {e}")
+            logger.warning(f"Error getting function names from the symbol table: {e}")
             return [], {}
 
+    def _read_benchmark_symbols_elf(self, benchmark_exe) -> Optional[List[Tuple[str, Optional[int], int, bool]]]:
+        """
+        Return (demangled name, address, size, is_function) of the BM_ symbols, or None if
+        the file is not ELF or the names cannot be demangled (nm -C is used instead).
+        """
+        elf_symbols = read_elf_symbols(benchmark_exe, name_filter="BM_")
+        if elf_symbols is None:
+            return None
+        demangled = demangle_symbols(sorted({symbol.name for symbol in elf_symbols}))
+        if demangled is None:
+            logger.info("No C++ demangler available, reading the benchmark symbols with nm instead.")
+            return None
+        return [(demangled[symbol.name], symbol.address, symbol.size, symbol.is_function) for symbol in elf_symbols]
+
+    def _read_benchmark_symbols_nm(self, benchmark_exe) -> Optional[List[Tuple[str, Optional[int], int, bool]]]:
+        """Return (demangled name, address, size, is_function) of the BM_ symbols using nm."""
+        nm_path = shutil.which("nm") # Check if nm exists
+        if not nm_path:
+             logger.warning("'nm' command not found.")
+             return None
+        # Run nm with demangling (and symbol sizes, for targeted disassembly) to get symbol information
+        try:
+            nm_cmd = [nm_path, "-C", "-S", str(benchmark_exe)]
+            result = subprocess.run(nm_cmd, capture_output=True, text=True, check=True, timeout=30, errors='ignore') # Added timeout/ignore
+        except subprocess.CalledProcessError:
+            nm_cmd = [nm_path, "-C", str(benchmark_exe)] # nm without --print-size support
+            result = subprocess.run(nm_cmd, capture_output=True, text=True, check=True, timeout=30, errors='ignore')
+
+        symbols = []
+        for line in result.stdout.splitlines():
+            if "BM_" in line:  # Only look at benchmark functions
+                fields = line.split(None, 3)
+                if len(fields) == 4 and len(fields[2]) == 1 and all(re.fullmatch(r'[0-9a-fA-F]+', f) for f in fields[:2]):
+                    # 'address size type name' (nm -S)
+                    symbols.append((fields[3], int(fields[0], 16), int(fields[1], 16), fields[2] in "tTwW"))
+                else:
+                    parts = line.split(' ', 2)
+                    if len(parts) >= 3:
+                        symbols.append((parts[2], None, 0, parts[1] in "tTwW"))
+        return symbols
+
+    @staticmethod
+    def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Sort address ranges and merge overlapping or adjacent ones."""
+        merged: List[Tuple[int, int]] = []
+        for start, stop in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+        return merged
+
+    def _get_objdump_command(self, objdump_path: str, objdump_flags: List[str], benchmark_exe) -> List[str]:
+        """
+        Disassemble the address window spanning all benchmark symbols, or the whole
+        executable if a full dump was requested or the ranges are unknown.
+
+        A single objdump call is used: each -S process re-reads the DWARF and source
+        files, and GNU objdump takes only one --disassemble=<symbol>. Other functions
+        inside the window are dropped by the DisassemblyIndex symbol filter.
+        """
+        if self.full_dump or not self.symbol_ranges:
+            objdump_cmd = [objdump_path] + objdump_flags + [str(benchmark_exe)]
+            logger.info(f"Running: {' '.join(objdump_cmd)}")
+            return objdump_cmd
+
+        start, stop = self.symbol_ranges[0][0], max(stop for _, stop in self.symbol_ranges)
+        objdump_cmd = [objdump_path] + objdump_flags + [f"--start-address={start:#x}", f"--stop-address={stop:#x}",
+                                                        str(benchmark_exe)]
+        logger.info(f"Running: {' '.join(objdump_cmd)} ({len(self.symbol_ranges)} benchmark symbol range(s))")
+        return objdump_cmd
+
+    def _stream_objdump(self, objdump_path: str, objdump_flags: List[str], benchmark_exe,
+                        tee_path: Optional[Path] = None) -> Iterator[str]:
+        """Yield objdump output line by line, optionally copying it to tee_path as it streams."""
+        tee = open(tee_path, "w", encoding='utf-8') if tee_path else None
+        try:
+            in_ranges = self._make_range_filter()
+            for line in _stream_command(self._get_objdump_command(objdump_path, objdump_flags, benchmark_exe), timeout=120):
+                address = INSTRUCTION_ADDRESS.match(line)
+                if address and not in_ranges(int(address.group(1), 16)):
+                    continue # Padding between the benchmark symbols of the window
+                if tee:
+                    tee.write(line + "\n")
+                yield line
+        finally:
+            if tee:
+                tee.close()
+
+    def _make_range_filter(self) -> Callable[[int], bool]:
+        """Return a predicate telling whether an address lies in a benchmark symbol (always true without ranges)."""
+        if self.full_dump or not self.symbol_ranges:
+            return lambda address: True
+        starts = [start for start, _ in self.symbol_ranges]
+        def in_ranges(address: int) -> bool:
+            i = bisect.bisect_right(starts, address) - 1
+            return i >= 0 and address < self.symbol_ranges[i][1]
+        return in_ranges
+
+    @staticmethod
+    def _make_symbol_filter(benchmark_functions, name_mapping=None) -> Callable[[str], bool]:
+        """Keep symbols containing the base name of a benchmark function (all lookup strategies require it)."""
+        names = set(benchmark_functions) | set((name_mapping or {}).values())
+        base_names = {name.split('<')[0].strip() for name in names if name.split('<')[0].strip()}
+        return lambda symbol: any(base_name in symbol for base_name in base_names)
+
     def _get_benchmark_functions(self, benchmark_exe, experiment): # Added self, takes benchmark_exe, experiment
         """Get list of benchmark functions."""
         # (Identical logic to original _get_benchmark_functions)
@@ -233,23 +540,22 @@ class AssemblyExtractor:
                  pass
 
 
-            objdump_cmd = [objdump_path] + objdump_flags + [str(benchmark_exe)]
-            logger.info(f"Running: {' '.join(objdump_cmd)}")
-
-            result = subprocess.run(objdump_cmd, capture_output=True, text=True, check=True, timeout=120, errors='ignore') # Added timeout/ignore
-            mixed_assembly = result.stdout
-
-            # Write full mixed assembly for reference
-            output_filename = "full_mixed_assembly.txt" if has_debug_info else "full_objdump_output.txt"
-            (assembly_dir / output_filename).write_text(mixed_assembly, encoding='utf-8') # Use write_text
+            # Write full mixed assembly for reference (only on request), streamed to disk
+            full_dump_path = None
+            if self.full_dump:
+                full_dump_path = assembly_dir / ("full_mixed_assembly.txt" if has_debug_info else "full_objdump_output.txt")
 
             # Extract function-specific assembly
+            index = DisassemblyIndex( # Parsed once while streaming, shared by all lookups
+                self._stream_objdump(objdump_path, objdump_flags, benchmark_exe, full_dump_path),
+                keep=self._make_symbol_filter(benchmark_functions, name_mapping)
+            )
             extracted_count = 0 # Track success
             for func_name in benchmark_functions:
                 # If we have name mapping from nm, use it for more precise matching
                 lookup_name = name_mapping.get(func_name, func_name) if name_mapping else func_name
 
-                func_asm = self._extract_function_assembly(mixed_assembly, lookup_name, func_name) # Call helper
+                func_asm = self._extract_function_assembly(index, lookup_name, func_name) # Call helper
 
                 if func_asm:
                     outfile = assembly_dir / f"{func_name}.s"
@@ -276,71 +582,32 @@ class AssemblyExtractor:
             logger.warning(f"Error extracting assembly with objdump: {e}") # Original used warning
             return False
 
-    def _extract_function_assembly(self, assembly_text, lookup_name, original_name=None): # Added self
-        """Extract assembly for a specific function from full assembly text."""
-        # (Identical logic to original _extract_function_assembly)
-        lines = assembly_text.splitlines()
+    def _extract_function_assembly(self, index: DisassemblyIndex, lookup_name, original_name=None): # Added self
+        """Extract assembly for a specific function using the disassembly index."""
         func_asm = []
-        capturing = False
-
         comment_name = original_name if original_name else lookup_name
 
         # Try direct match first
-        for i, line in enumerate(lines):
-            # Look for function start marker (original logic)
-            if lookup_name in line and ":" in line:
-                 # Add heuristic check for function label format
-                 if re.match(r"^[0-9a-f]+\s+<.*" + re.escape(lookup_name) + r".*>:", line) or \
-                    re.match(r"^" + re.escape(lookup_name) + r"\(.*\):", line.strip()):
-                    capturing = True
-                    if original_name and lookup_name != original_name:
-                        func_asm.append(f"// Assembly for benchmark function: {original_name} (matched on '{lookup_name}')")
-                    else:
-                         func_asm.append(f"// Assembly for benchmark function: {comment_name}")
-                    func_asm.append(line)
-            elif capturing:
-                # Look for function end marker (next function label)
-                # Original logic: just looked for the next label <...>:.
-                if "<" in line and ">:" in line and not line.strip().startswith("."):
-                     # Check if it's a *different* function label
-                     if lookup_name not in line:
-                          capturing = False
-                          # Do not append the line starting the next function
-                 # Add check for common end directive
-                elif line.strip() == ".cfi_endproc":
-                     func_asm.append(line)
-                     capturing = False
-                else:
-                    func_asm.append(line)
+        matches = index.find(lookup_name)
+        if matches:
+            if original_name and lookup_name != original_name:
+                func_asm.append(f"// Assembly for benchmark function: {original_name} (matched on '{lookup_name}')")
+            else:
+                func_asm.append(f"// Assembly for benchmark function: {comment_name}")
+            for n in matches:
+                func_asm.extend(index.get_lines(n))
 
         # If we didn't find a match but have a template function, try a more flexible approach (Original logic)
         if not func_asm and "<" in lookup_name and ">" in lookup_name:
             base_name = lookup_name.split("<")[0]
-            # Reset capturing flag
-            capturing = False
-            for i, line in enumerate(lines):
-                # Look for base_name<...> label
-                if base_name in line and "<" in line and ">:" in line:
-                    # Make sure this is the right function by checking parts of the template (Original logic)
-                    template_parts = re.findall(r'<([^<>]+)>', lookup_name)
-                    # Basic check if parts appear in the line
-                    if template_parts and all(part in line for part in template_parts):
-                        capturing = True
-                        if original_name:
-                            func_asm.append(f"// Assembly for benchmark function: {original_name} (flexible match)")
-                        else:
-                             func_asm.append(f"// Assembly for benchmark function: {comment_name} (flexible match)")
-                        func_asm.append(line)
-                elif capturing:
-                    # Same end condition as above
-                    if "<" in line and ">:" in line and not line.strip().startswith("."):
-                         if lookup_name not in line and base_name not in line: # Check base name too
-                              capturing = False
-                    elif line.strip() == ".cfi_endproc":
-                         func_asm.append(line)
-                         capturing = False
-                    else:
-                        func_asm.append(line)
+            # Make sure this is the right function by checking parts of the template (Original logic)
+            template_parts = re.findall(r'<([^<>]+)>', lookup_name)
+            if template_parts:
+                for n in index.find(base_name):
+                    if all(part in index.labels[n][0] for part in template_parts):
+                        if not func_asm:
+                            func_asm.append(f"// Assembly for benchmark function: {comment_name} (flexible match)")
+                        func_asm.extend(index.get_lines(n))
 
         return func_asm
 
@@ -358,15 +625,14 @@ class AssemblyExtractor:
             if self.is_macos: # Add check for macOS specific flags if needed
                  pass # Original didn't add --macho here
 
-            objdump_cmd = [objdump_path] + objdump_flags + [str(benchmark_exe)]
-            result = subprocess.run(objdump_cmd, capture_output=True, text=True, check=True, timeout=120, errors='ignore') # Added timeout/ignore
-            disassembly = result.stdout
-
-            # Write full disassembly for reference
-            (assembly_dir / "full_disassembly.txt").write_text(disassembly, encoding='utf-8') # Use write_text
+            # Write full disassembly for reference (only on request), streamed to disk
+            full_dump_path = assembly_dir / "full_disassembly.txt" if self.full_dump else None
 
             # Extract function-specific assembly using nm name mapping if available
-            lines = disassembly.split('\n')
+            index = DisassemblyIndex( # Parsed once while streaming, shared by all strategies
+                self._stream_objdump(objdump_path, objdump_flags, benchmark_exe, full_dump_path),
+                keep=self._make_symbol_filter(benchmark_functions, name_mapping)
+            )
             extracted_count = 0 # Track success
 
             for func_name in benchmark_functions:
@@ -383,21 +649,21 @@ class AssemblyExtractor:
                  base_name = func_name.split('<')[0] if is_template else func_name
 
                  # Try with the mapped name from nm first
-                 func_asm = self._extract_direct_match(lines, lookup_name, func_name)
+                 func_asm = self._extract_direct_match(index, lookup_name, func_name)
 
                  # If that fails and we don't have a mapping or the mapping didn't help,
                  # fall back to our multi-strategy approach (Original logic)
                  if not func_asm and (not name_mapping or lookup_name == func_name):
                      # Strategy 2: Regex pattern match for C++ templates
-                     func_asm = self._extract_template_match(lines, func_name)
+                     func_asm = self._extract_template_match(index, func_name)
 
                      # Strategy 3: Base name match
                      if not func_asm:
-                         func_asm = self._extract_base_name_match(lines, func_name)
+                         func_asm = self._extract_base_name_match(index, func_name)
 
                      # Strategy 4: Generic pattern match (most relaxed)
                      if not func_asm:
-                         func_asm = self._extract_generic_match(lines, func_name)
+                         func_asm = self._extract_generic_match(index, func_name)
 
                  # Create the assembly file
                  outfile = assembly_dir / f"{func_name}.s"
@@ -428,7 +694,10 @@ class AssemblyExtractor:
                              extracted_count += 1
                          else:
                              f.write(f"// Note: Assembly for {func_name} could not be found\n")
-                             f.write(f"// Look for function containing '{base_name}' in full_disassembly.txt\n")
+                             if self.full_dump:
+                                 f.write(f"// Look for function containing '{base_name}' in full_disassembly.txt\n")
+                             else:
+                                 f.write(f"// Re-run with --full-disassembly and look for function containing '{base_name}' in full_disassembly.txt\n")
                              logger.warning(f"Could not find assembly for {func_name} (manual)")
                              # Create missing marker if not found
                              (assembly_dir / f"{func_name}.s.missing").touch()
@@ -444,42 +713,26 @@ class AssemblyExtractor:
 
     # --- Original Matching Strategy Helpers ---
 
-    def _extract_direct_match(self, lines, lookup_name, original_name=None): # Added self
-        """Extract assembly using direct string match."""
-        # (Identical logic to original _extract_direct_match)
+    def _extract_direct_match(self, index: DisassemblyIndex, lookup_name, original_name=None): # Added self
+        """Extract assembly using a direct name lookup in the index."""
         func_asm = []
-        capturing = False
         comment_name = original_name if original_name else lookup_name
-        for line in lines:
-            if lookup_name in line and ":" in line:
-                 # Add heuristic check for function label format
-                 if re.match(r"^[0-9a-f]+\s+<.*" + re.escape(lookup_name) + r".*>:", line) or \
-                    re.match(r"^" + re.escape(lookup_name) + r"\(.*\):", line.strip()):
-                    capturing = True
-                    if original_name and lookup_name != original_name:
-                        func_asm.append(f"// Assembly for benchmark function: {comment_name}")
-                    func_asm.append(line)
-            elif capturing:
-                if "<" in line and ">:" in line and not line.strip().startswith("."):
-                     if lookup_name not in line: capturing = False
-                elif line.strip() == ".cfi_endproc":
-                     func_asm.append(line); capturing = False
-                else: func_asm.append(line)
+        matches = index.find(lookup_name)
+        if matches and original_name and lookup_name != original_name:
+            func_asm.append(f"// Assembly for benchmark function: {comment_name}")
+        for n in matches:
+            func_asm.extend(index.get_lines(n))
         return func_asm
 
-    def _extract_template_match(self, lines, func_name): # Added self
+    def _extract_template_match(self, index: DisassemblyIndex, func_name): # Added self
         """Extract assembly using regex matching for C++ templates."""
-        # (Identical logic to original _extract_template_match)
-        func_asm = []
-        capturing = False
+        # (Identical matching logic to original _extract_template_match)
         match = re.match(r'([^<]+)(<.*>)?', func_name)
         if not match: return []
         base_name, template_part = match.groups()
 
         if template_part:
             clean_template = template_part.replace(" ", "")
-            template_regex = clean_template.replace('std::', r'std::(?:__1::)?')
-            template_regex = re.sub(r'>$', r'(?:,std::(?:__1::)?allocator<[^>]+>)?>', template_regex)
             # Original pattern was quite complex, trying to replicate
             first_template_arg = clean_template.split('<', 1)[1].split('>')[0].split(',')[0]
             pattern_str = re.escape(base_name) + r'<.*' + re.escape(first_template_arg) + r'.*>'
@@ -488,70 +741,45 @@ class AssemblyExtractor:
             pattern = re.compile(re.escape(base_name) + r'(?:<.*>)?') # Original fallback
 
         start_pattern = re.compile(rf"^[0-9a-f]+\s+<.*{pattern.pattern}.*>:") # Look for pattern within <...>
-        end_pattern = re.compile(r"^(?:[0-9a-f]+\s+<.*>:)|(?:^[_a-zA-Z].*\(.*\):)")
-
-        for line in lines:
-            if capturing:
-                if end_pattern.match(line) and not pattern.search(line):
-                    capturing = False; break
-                else: func_asm.append(line)
-            elif start_pattern.search(line):
-                capturing = True
-                func_asm.append(f"// Best-effort match for {func_name} using template pattern matching:")
-                func_asm.append(line)
+        first = index.find_first(start_pattern)
+        if first is None: return []
+        func_asm = [f"// Best-effort match for {func_name} using template pattern matching:"]
+        func_asm.extend(index.get_run_lines(first, pattern))
         return func_asm
 
 
-    def _extract_base_name_match(self, lines, func_name): # Added self
+    def _extract_base_name_match(self, index: DisassemblyIndex, func_name): # Added self
         """Extract assembly using just the base name of the function."""
-        # (Identical logic to original _extract_base_name_match)
-        func_asm = []
-        capturing = False
+        # (Identical matching logic to original _extract_base_name_match)
         base_name = func_name.split('<')[0] if '<' in func_name else func_name
         escaped_base = re.escape(base_name)
 
         # Original pattern looked for base_name followed by <...>
         start_pattern = re.compile(rf"^[0-9a-f]+\s+<{escaped_base}<.*>:>")
-        end_pattern = re.compile(r"^(?:[0-9a-f]+\s+<.*>:)|(?:^[_a-zA-Z].*\(.*\):)")
-
-        for line in lines:
-            if capturing:
-                if end_pattern.match(line) and not start_pattern.search(line):
-                    capturing = False; break
-                else: func_asm.append(line)
-            elif start_pattern.search(line):
-                capturing = True
-                func_asm.append(f"// Possible match for {func_name} using base name {base_name}:")
-                func_asm.append(line)
+        first = index.find_first(start_pattern)
+        if first is None: return []
+        func_asm = [f"// Possible match for {func_name} using base name {base_name}:"]
+        func_asm.extend(index.get_run_lines(first, start_pattern))
         return func_asm
 
-    def _extract_generic_match(self, lines, func_name): # Added self
+    def _extract_generic_match(self, index: DisassemblyIndex, func_name): # Added self
         """Generic pattern matching as a last resort."""
-        # (Identical logic to original _extract_generic_match)
-        func_asm = []
-        capturing = False
+        # (Identical matching logic to original _extract_generic_match)
         template_args = []
         if '<' in func_name and '>' in func_name:
             template_part = func_name[func_name.find('<')+1:func_name.rfind('>')]
             template_args = re.findall(r'std::(\w+)|(\d+)', template_part)
             template_args = [x[0] or x[1] for x in template_args if x[0] or x[1]]
-
-        if template_args:
-            base_name = func_name.split('<')[0]
-            # Original pattern: address <base_name...arg1...argN...>:
-            start_pattern_str = rf"^[0-9a-f]+\s+<{re.escape(base_name)}.*" + ".*".join(re.escape(arg) for arg in template_args) + r".*>:"
-            start_pattern = re.compile(start_pattern_str)
-            end_pattern = re.compile(r"^(?:[0-9a-f]+\s+<.*>:)|(?:^[_a-zA-Z].*\(.*\):)")
-
-            for line in lines:
-                if capturing:
-                    if end_pattern.match(line) and not start_pattern.search(line):
-                         capturing = False; break
-                    else: func_asm.append(line)
-                elif start_pattern.search(line):
-                    capturing = True
-                    func_asm.append(f"// Best-effort match for {func_name} using generic pattern matching:")
-                    func_asm.append(line)
+        if not template_args: return []
+
+        base_name = func_name.split('<')[0]
+        # Original pattern: address <base_name...arg1...argN...>:
+        start_pattern_str = rf"^[0-9a-f]+\s+<{re.escape(base_name)}.*" + ".*".join(re.escape(arg) for arg in template_args) + r".*>:"
+        start_pattern = re.compile(start_pattern_str)
+        first = index.find_first(start_pattern)
+        if first is None: return []
+        func_asm = [f"// Best-effort match for {func_name} using generic pattern matching:"]
+        func_asm.extend(index.get_run_lines(first, start_pattern))
         return func_asm
 
 
@@ -0,0 +1,75 @@
+# scripts/lib/assembly_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict
+
+from .logger import get_logger
+
+logger = get_logger()
+
+
+class AssemblyCache:
+    """
+    Content-addressed cache of extracted assembly directories.
+
+    Layout (under .cache/assembly/):
+        <key[:2]>/<key>/    Files of one assembly/ directory (.s snippets, markers, full dumps)
+
+    The key covers everything the extraction output depends on: the executable and
+    experiment source digests, the extractor version and the extraction options.
+    Entries are written once and never modified. They are copied into results
+    directories rather than hardlinked, so later writes to a results directory can
+    never change a cache entry.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def get_key(key_data: Dict) -> str:
+        """Return the cache key for a JSON-serializable description of the extraction."""
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _get_entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def restore(self, key: str, assembly_dir: Path) -> bool:
+        """Copy a cached entry into assembly_dir. Returns False on a miss."""
+        entry_dir = self._get_entry_dir(key)
+        if not entry_dir.is_dir():
+            return False
+        try:
+            os.makedirs(assembly_dir, exist_ok=True)
+            for cached_file in entry_dir.iterdir():
+                target = assembly_dir / cached_file.name
+                if target.exists() or target.is_symlink():
+                    target.unlink()
+                shutil.copy2(cached_file, target)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to restore assembly from cache entry {entry_dir}: {e}")
+            return False
+
+    def store(self, key: str, assembly_dir: Path):
+        """Copy the files of assembly_dir into the cache (atomically, first writer wins)."""
+        entry_dir = self._get_entry_dir(key)
+        if entry_dir.exists():
+            return
+        tmp_dir = entry_dir.with_name(f"{entry_dir.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.makedirs(tmp_dir)
+            for produced_file in assembly_dir.iterdir():
+                if produced_file.is_file():
+                    shutil.copy2(produced_file, tmp_dir / produced_file.name)
+            tmp_dir.rename(entry_dir)
+            logger.debug(f"Stored assembly in cache: {entry_dir}")
+        except Exception as e:
+            if not entry_dir.exists(): # Otherwise a concurrent run stored the same entry first
+                logger.warning(f"Failed to store assembly in cache: {e}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
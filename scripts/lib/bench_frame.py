@@ -0,0 +1,168 @@
+# scripts/lib/bench_frame.py
+
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .logger import get_logger
+
+logger = get_logger()
+
+FRAME_FILE = "benchmark_frame.npz"
+# String fields of a Google Benchmark entry, stored as categoricals ("run" is the run label)
+CATEGORICAL_COLUMNS = ("name", "run_name", "run_type", "aggregate_name", "time_unit", "run")
+
+
+class Categorical(NamedTuple):
+    codes: np.ndarray       # int32 index into categories per row, -1 if missing
+    categories: np.ndarray  # Unique values (unicode array)
+
+    def values(self) -> np.ndarray:
+        """Decoded values (missing entries become '')."""
+        if not len(self.categories):
+            return np.full(len(self.codes), "", dtype=str)
+        return np.where(self.codes >= 0, self.categories[np.maximum(self.codes, 0)], "")
+
+
+def _make_categorical(values: List[Optional[str]]) -> Categorical:
+    present = sorted({value for value in values if value is not None})
+    lookup = {value: code for code, value in enumerate(present)}
+    codes = np.array([lookup.get(value, -1) if value is not None else -1 for value in values], dtype=np.int32)
+    return Categorical(codes, np.array(present, dtype=str))
+
+
+def _make_numeric(values: List) -> np.ndarray:
+    """int64 if every row has an integer (or bool) value, else float64 with NaN for missing rows."""
+    if values and all(isinstance(value, int) for value in values):
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _is_integer_field(values: List) -> bool:
+    """All present values are integers (e.g. iterations, which BigO/RMS entries lack)."""
+    present = [value for value in values if value is not None]
+    return bool(present) and all(isinstance(value, int) for value in present)
+
+
+class BenchmarkFrame:
+    """
+    Columnar view of Google Benchmark results: one row per benchmark entry.
+
+    Numeric fields (real_time, cpu_time, iterations and all counters) are NumPy arrays;
+    name, run_name, run_type, aggregate_name, time_unit and the run label are categoricals.
+    A frame is built from one run (from_gbench) or several (from_runs) and is stored as
+    benchmark_frame.npz next to benchmark_output.json.
+    """
+
+    def __init__(self, categoricals: Dict[str, Categorical], columns: Dict[str, np.ndarray],
+                 integer_columns: Iterable[str] = ()):
+        self.categoricals = categoricals
+        self.columns = columns
+        # Integer fields stored as float64 because some rows lack them; value() returns ints for these
+        self.integer_columns = set(integer_columns)
+
+    def __len__(self) -> int:
+        return len(self.categoricals["name"].codes)
+
+    @classmethod
+    def from_gbench(cls, benchmark_data: Optional[Dict], run: str = "") -> "BenchmarkFrame":
+        return cls.from_runs([(run, benchmark_data)])
+
+    @classmethod
+    def from_runs(cls, runs: Iterable[Tuple[str, Optional[Dict]]]) -> "BenchmarkFrame":
+        """Build one frame from (run label, Google Benchmark JSON) pairs."""
+        rows = [(run, benchmark) for run, benchmark_data in runs
+                for benchmark in (benchmark_data or {}).get("benchmarks", [])]
+        categoricals = {
+            column: _make_categorical([run if column == "run" else benchmark.get(column) for run, benchmark in rows])
+            for column in CATEGORICAL_COLUMNS
+        }
+        numeric_names = []
+        for _, benchmark in rows:
+            numeric_names.extend(key for key, value in benchmark.items()
+                                 if isinstance(value, (int, float)) and key not in numeric_names)
+        columns, integer_columns = {}, []
+        for name in numeric_names:
+            values = [benchmark.get(name) for _, benchmark in rows]
+            columns[name] = _make_numeric(values)
+            if _is_integer_field(values):
+                integer_columns.append(name)
+        return cls(categoricals, columns, integer_columns)
+
+    def names(self) -> np.ndarray:
+        return self.categoricals["name"].values()
+
+    def column(self, name: str) -> np.ndarray:
+        """A numeric column as float64 (NaN where missing, all NaN if the column does not exist)."""
+        if name not in self.columns:
+            return np.full(len(self), np.nan)
+        return self.columns[name].astype(np.float64, copy=False)
+
+    def value(self, name: str, row: int):
+        """A single value as a Python int/float, or None if missing."""
+        if name not in self.columns:
+            return None
+        value = self.columns[name][row].item()
+        if isinstance(value, float):
+            if np.isnan(value):
+                return None
+            if name in self.integer_columns:
+                return int(value)
+        return value
+
+    def last_rows_by_name(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sorted unique benchmark names and the last row with each name (as a dict keyed
+        by name would keep it).
+        """
+        name = self.categoricals["name"]
+        last = np.full(len(name.categories), -1, dtype=np.int64)
+        valid = name.codes >= 0
+        np.maximum.at(last, name.codes[valid], np.arange(len(self))[valid])
+        return name.categories, last
+
+    def align(self, other: "BenchmarkFrame") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Match benchmarks by name.
+
+        Returns:
+            (sorted common names, row in self, row in other) per common name.
+        """
+        self_names, self_rows = self.last_rows_by_name()
+        other_names, other_rows = other.last_rows_by_name()
+        common, self_index, other_index = np.intersect1d(self_names, other_names, assume_unique=True,
+                                                         return_indices=True)
+        return common, self_rows[self_index], other_rows[other_index]
+
+    def save(self, path: Path):
+        """Write the frame as a .npz archive (plain arrays only, no pickling)."""
+        arrays = {}
+        for column, categorical in self.categoricals.items():
+            arrays[f"cat:{column}:codes"] = categorical.codes
+            arrays[f"cat:{column}:categories"] = categorical.categories
+        for column, values in self.columns.items():
+            arrays[f"num:{column}"] = values
+        arrays["integer_columns"] = np.array(sorted(self.integer_columns), dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Path) -> "BenchmarkFrame":
+        with np.load(path, allow_pickle=False) as archive:
+            categoricals = {
+                column: Categorical(archive[f"cat:{column}:codes"], archive[f"cat:{column}:categories"])
+                for column in CATEGORICAL_COLUMNS
+            }
+            columns = {key[len("num:"):]: archive[key] for key in archive.files if key.startswith("num:")}
+            integer_columns = archive["integer_columns"].tolist()
+        return cls(categoricals, columns, integer_columns)
+
+
+def save_benchmark_frame(results_dir: Path, benchmark_data: Optional[Dict]) -> bool:
+    """Export the Google Benchmark results of a run to <results_dir>/benchmark_frame.npz."""
+    try:
+        BenchmarkFrame.from_gbench(benchmark_data, run=results_dir.name).save(results_dir / FRAME_FILE)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not write {results_dir / FRAME_FILE}: {e}")
+        return False
@@ -0,0 +1,212 @@
+# scripts/lib/checkpoint.py
+
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+from .logger import get_logger
+
+logger = get_logger()
+
+
+BENCHMARK_FILTER_FLAGS = ("--benchmark_filter=", "-benchmark_filter=")
+# Counter lines ("  1,234,567      cycles   # ...") and time lines ("  1.02 seconds time elapsed") of perf stat
+PERF_COUNTER_LINE = re.compile(r'^\s*([0-9][0-9,]*(?:\.[0-9]+)?)\s+(?:msec\s+)?([A-Za-z][\w\-:./]*)')
+PERF_TIME_LINE = re.compile(r'^\s*([0-9][0-9.]*)\s+seconds\s+(time elapsed|user|sys)')
+PERF_BLOCK_START = "Performance counter stats for"
+
+
+def list_benchmark_families(benchmark_exe: Path, gbench_args: List[str]) -> Dict[str, List[str]]:
+    """
+    Return the benchmark families of an executable in registration order, each with
+    the names of its benchmark instances.
+
+    A family is the part of a benchmark name before the first '/', e.g.
+    'BM_PushBack/1024/real_time' belongs to 'BM_PushBack'. gbench_args are passed
+    along so that a --benchmark_filter in exp_config.json selects the instances.
+    """
+    list_cmd = [str(benchmark_exe), "--benchmark_list_tests=true"] + gbench_args
+    try:
+        result = subprocess.run(list_cmd, capture_output=True, text=True, check=True, timeout=30)
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"Failed to list benchmarks for checkpointing: {e}")
+        return {}
+    families: Dict[str, List[str]] = {}
+    for line in result.stdout.splitlines():
+        name = line.strip()
+        if name:
+            families.setdefault(name.split('/', 1)[0], []).append(name)
+    return families
+
+
+def strip_benchmark_filter(gbench_args: List[str]) -> List[str]:
+    """
+    Remove --benchmark_filter from gbench_args.
+
+    Google Benchmark uses the last filter given, so a chunk filter appended after the
+    user's one would replace it; the user's filter is applied when listing instead.
+    """
+    return [arg for arg in gbench_args if not arg.startswith(BENCHMARK_FILTER_FLAGS)]
+
+
+def _escape_regex(text: str) -> str:
+    # Only escapes that mean the same in Google Benchmark's std::regex and POSIX regex backends
+    return re.sub(r'([\\.^$|?*+()\[\]{}])', r'\\\1', text)
+
+
+def get_chunk_filter(names: List[str]) -> str:
+    """Return a --benchmark_filter regex matching exactly the given benchmark instances."""
+    return "^(" + "|".join(_escape_regex(name) for name in names) + ")$"
+
+
+def summarize_perf_stat_log(perf_stat_file: Path) -> int:
+    """
+    Prepend the totals of all blocks to a perf_stat.log written by several chunks.
+
+    In combined perf mode every chunk adds its own block via 'perf stat --append'.
+    Counters and times are summed per event over the blocks; the blocks are kept below.
+
+    Returns:
+        The number of blocks in the log.
+    """
+    try:
+        content = perf_stat_file.read_text(errors='replace')
+    except OSError:
+        return 0
+    blocks = content.count(PERF_BLOCK_START)
+    if blocks < 2:
+        return blocks
+
+    totals: Dict[str, float] = {}
+    for line in content.splitlines():
+        match = PERF_TIME_LINE.match(line)
+        if match:
+            key = f"seconds {match.group(2)}"
+        else:
+            match = PERF_COUNTER_LINE.match(line)
+            if not match:
+                continue
+            key = match.group(2)
+        value = float(match.group(1).replace(',', ''))
+        totals[key] = totals.get(key, 0) + value
+
+    header = [f"# Checkpointed run: perf stat ran once per benchmark family, {blocks} blocks follow.",
+              "# Totals over all blocks:", "#"]
+    for key, value in totals.items():
+        if key.startswith("seconds "):
+            header.append(f"# {value:>20.6f} {key}")
+        else:
+            header.append(f"# {value:>20,.0f}      {key}")
+    tmp_path = perf_stat_file.with_suffix(".tmp")
+    tmp_path.write_text("\n".join(header) + "\n\n" + content)
+    os.replace(tmp_path, perf_stat_file)
+    return blocks
+
+
+class BenchmarkCheckpoint:
+    """
+    Partial benchmark results of one experiment run, kept until all chunks are done.
+
+    Layout (under <results_dir>/.partial/):
+        manifest.json       content_hash of the run and the completed family -> chunk file map
+        chunk_<NNNN>.json   Google Benchmark JSON output of one family
+
+    Chunks are only reused when the manifest's content_hash matches the current run,
+    so a rebuilt executable or changed gbench_args always starts from scratch.
+    """
+
+    PARTIAL_DIR = ".partial"
+    MANIFEST = "manifest.json"
+
+    def __init__(self, results_dir: Path, content_hash: str):
+        self.partial_dir = results_dir / self.PARTIAL_DIR
+        self.manifest_path = self.partial_dir / self.MANIFEST
+        self.content_hash = content_hash
+        self.chunks: Dict[str, str] = {}
+
+    def is_pending(self) -> bool:
+        """True if an earlier attempt with the same content left unfinished chunks."""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f).get("content_hash") == self.content_hash
+        except Exception:
+            return False
+
+    def load(self, reset: bool = False) -> Dict[str, str]:
+        """
+        Load the completed chunks, discarding them if reset is set or the content changed.
+
+        Returns:
+            Mapping of completed family name to chunk file name.
+        """
+        self.chunks = {}
+        if reset:
+            self.clear()
+            return {}
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read checkpoint manifest {self.manifest_path}: {e}. Starting over.")
+            self.clear()
+            return {}
+
+        if manifest.get("content_hash") != self.content_hash:
+            logger.info("Checkpoint belongs to different content. Discarding partial results.")
+            self.clear()
+            return {}
+
+        self.chunks = {family: chunk for family, chunk in manifest.get("chunks", {}).items()
+                       if (self.partial_dir / chunk).exists()}
+        return dict(self.chunks)
+
+    def get_chunk_path(self, index: int) -> Path:
+        os.makedirs(self.partial_dir, exist_ok=True)
+        return self.partial_dir / f"chunk_{index:04d}.json"
+
+    def mark_complete(self, family: str, chunk_path: Path):
+        """Record a finished chunk. The manifest is replaced atomically."""
+        self.chunks[family] = chunk_path.name
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({"content_hash": self.content_hash, "chunks": self.chunks}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def merge(self, families: List[str], output_file: Path) -> bool:
+        """
+        Merge the chunks of all families into a single Google Benchmark JSON file.
+
+        The context is taken from the first chunk; benchmarks are concatenated in family order.
+        """
+        merged = None
+        for family in families:
+            chunk = self.chunks.get(family)
+            if not chunk:
+                logger.error(f"Cannot merge checkpoint: family '{family}' has no results.")
+                return False
+            try:
+                with open(self.partial_dir / chunk, 'r') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"Cannot merge checkpoint: failed to read {chunk}: {e}")
+                return False
+            if merged is None:
+                merged = {"context": data.get("context", {}), "benchmarks": []}
+            merged["benchmarks"].extend(data.get("benchmarks", []))
+
+        if merged is None:
+            return False
+        tmp_path = output_file.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(merged, f, indent=2)
+        os.replace(tmp_path, output_file)
+        return True
+
+    def clear(self):
+        shutil.rmtree(self.partial_dir, ignore_errors=True)
@@ -0,0 +1,145 @@
+# scripts/lib/compiler_cache.py
+
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger()
+
+SUPPORTED_COMPILER_CACHES = ("ccache", "sccache")
+
+
+class CompilerCache:
+    """
+    ccache/sccache integration for experiment builds.
+
+    The cache executable is injected as CMAKE_<LANG>_COMPILER_LAUNCHER, and hit/miss
+    statistics are collected for every build:
+      - ccache: per build, from a stats log (CCACHE_STATSLOG) written into the build dir.
+      - sccache: difference between server statistics before and after the build. The
+        sccache server is shared, so sccache builds are serialized with build_lock().
+    """
+
+    def __init__(self, tool: str):
+        """
+        Args:
+            tool: 'ccache', 'sccache' or 'auto' (first one found in PATH).
+        """
+        self.tool = None
+        self.tool_path = None
+        self._build_lock = threading.Lock()
+        candidates = SUPPORTED_COMPILER_CACHES if tool == "auto" else (tool,)
+        for candidate in candidates:
+            path = shutil.which(candidate)
+            if path:
+                self.tool, self.tool_path = candidate, path
+                break
+        if self.tool:
+            logger.info(f"Using compiler cache: {self.tool} ({self.tool_path})")
+        else:
+            logger.warning(f"Compiler cache '{tool}' not found in PATH. Building without it.")
+
+    @property
+    def enabled(self) -> bool:
+        return self.tool_path is not None
+
+    def get_cmake_args(self) -> List[str]:
+        """Return the CMake configure arguments that route compilations through the cache."""
+        if not self.enabled:
+            return []
+        return [f"-DCMAKE_CXX_COMPILER_LAUNCHER={self.tool_path}", f"-DCMAKE_C_COMPILER_LAUNCHER={self.tool_path}"]
+
+    @property
+    def serializes_builds(self) -> bool:
+        """sccache only has server-wide counters: its builds must not overlap."""
+        return self.tool == "sccache"
+
+    def build_lock(self):
+        """
+        Context manager to hold around a configure + build.
+
+        Serializes sccache builds, so the before/after delta of the server counters
+        belongs to one build. ccache builds keep running concurrently.
+        """
+        return self._build_lock if self.serializes_builds else contextlib.nullcontext()
+
+    def _stats_log_path(self, build_dir: Path) -> Path:
+        return build_dir / "ccache_stats.log"
+
+    def _read_sccache_counts(self) -> Optional[Dict[str, int]]:
+        """Return sccache's cumulative hit/miss counters, or None if unavailable."""
+        try:
+            result = subprocess.run([self.tool_path, "--show-stats", "--stats-format=json"],
+                                    capture_output=True, text=True, check=True, timeout=30)
+            stats = json.loads(result.stdout).get("stats", {})
+            return {
+                "hits": sum(stats.get("cache_hits", {}).get("counts", {}).values()),
+                "misses": sum(stats.get("cache_misses", {}).get("counts", {}).values()),
+                "compile_requests": stats.get("compile_requests", 0),
+            }
+        except Exception as e:
+            logger.warning(f"Could not read sccache statistics: {e}")
+            return None
+
+    def prepare_build(self, build_dir: Path) -> Dict:
+        """
+        Prepare statistics collection for one build.
+
+        Returns:
+            A state dict to pass to collect_stats(), with 'env' holding the extra
+            environment variables for the configure/build subprocesses.
+        """
+        state = {"env": {}}
+        if self.tool == "ccache":
+            stats_log = self._stats_log_path(build_dir)
+            if stats_log.exists():
+                stats_log.unlink()
+            state["env"]["CCACHE_STATSLOG"] = str(stats_log)
+        elif self.tool == "sccache":
+            state["before"] = self._read_sccache_counts()
+        return state
+
+    def collect_stats(self, build_dir: Path, state: Dict) -> Optional[Dict]:
+        """Return hit/miss statistics for the build prepared with prepare_build()."""
+        if not self.enabled:
+            return None
+
+        stats = {"tool": self.tool, "scope": "build", "hits": 0, "misses": 0}
+        if self.tool == "ccache":
+            counters: Dict[str, int] = {}
+            stats_log = self._stats_log_path(build_dir)
+            if stats_log.exists():
+                with open(stats_log, 'r', errors='ignore') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not line.startswith('#'):
+                            counters[line] = counters.get(line, 0) + 1
+            stats["hits"] = counters.get("direct_cache_hit", 0) + counters.get("preprocessed_cache_hit", 0)
+            stats["misses"] = counters.get("cache_miss", 0)
+            stats["counters"] = counters
+        elif self.tool == "sccache":
+            before, after = state.get("before"), self._read_sccache_counts()
+            if before is None or after is None:
+                return None
+            for key in ("hits", "misses", "compile_requests"):
+                stats[key] = after[key] - before[key]
+
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else None
+        return stats
+
+
+def make_build_env(extra_env: Dict[str, str]) -> Optional[Dict[str, str]]:
+    """Return os.environ extended with extra_env, or None (inherit) if there is nothing to add."""
+    if not extra_env:
+        return None
+    env = os.environ.copy()
+    env.update(extra_env)
+    return env
@@ -6,6 +6,9 @@ from .logger import get_logger
 
 logger = get_logger()
 
+# Build flag IDs used for glob expansion when the config has no "build_flags" list
+DEFAULT_BUILD_FLAG_IDS = ["Debug_O0", "RelWithDebInfo_O2", "Release_O3"]
+
 class BenchEverythingConfig:
     """Manages configuration loading and project paths."""
 
@@ -73,6 +76,11 @@ class BenchEverythingConfig:
         config = self.get_global_config()
         return config.get('compilers', [])
 
+    def get_build_flag_ids(self):
+        """Return the list of known build flag IDs (used to expand --build-flags patterns)."""
+        config = self.get_global_config()
+        return config.get('build_flags', DEFAULT_BUILD_FLAG_IDS)
+
     def get_experiment_details(self, experiment_name):
         """Return the configuration dictionary for a specific experiment from the global config."""
         config = self.get_global_config()
@@ -104,9 +112,25 @@ class BenchEverythingConfig:
         """Construct the Path object for the build directory."""
         return self.project_root / "build" / platform_id / compiler_id / build_flags_id
 
+    def get_cache_dir(self):
+        """Return the Path object for the project-level cache directory (.cache/)."""
+        return self.project_root / ".cache"
+
+    def get_dependency_cache_dir(self):
+        """Return the Path object for the shared third-party dependency cache."""
+        return self.get_cache_dir() / "deps"
+
+    def get_assembly_cache_dir(self):
+        """Return the Path object for the content-addressed assembly cache."""
+        return self.get_cache_dir() / "assembly"
+
+    def get_results_root_dir(self):
+        """Return the Path object for the top-level results directory (results/)."""
+        return self.project_root / "results"
+
     def get_results_base_dir(self, platform_id, compiler_id, build_flags_id, metadata_hash):
          """Construct the Path object for the base results directory (up to hash)."""
-         return self.project_root / "results" / platform_id / compiler_id / build_flags_id / metadata_hash
+         return self.get_results_root_dir() / platform_id / compiler_id / build_flags_id / metadata_hash
 
     def get_results_dir(self, platform_id, compiler_id, build_flags_id, metadata_hash, experiment_name):
         """Construct the Path object for a specific experiment's results directory."""
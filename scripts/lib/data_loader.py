@@ -1,9 +1,18 @@
 import json
-import glob
+import os
+import sqlite3
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterable, List, Tuple
 
 from .logger import get_logger
+from .asm_analysis import METRICS_SUFFIX
+from .mca import MCA_SUFFIX
+from .artifacts import COMPRESSION_SUFFIXES, load_artifact_index, read_artifact_text, strip_compression_suffix
+from .results_index import ResultsIndex, scan_result_dirs
+from .bench_frame import FRAME_FILE, BenchmarkFrame
 
 logger = get_logger()
 
@@ -31,6 +40,27 @@ def load_gbench_json(file_path: Path) -> Optional[Dict]:
          return None
 
 
+def load_benchmark_frame(results_dir: Path) -> Optional[BenchmarkFrame]:
+    """
+    Load the columnar benchmark frame of a run.
+
+    Uses benchmark_frame.npz when it is at least as new as benchmark_output.json,
+    otherwise builds the frame from the JSON (runs recorded before frames were exported).
+    """
+    gbench_file = results_dir / "benchmark_output.json"
+    frame_file = results_dir / FRAME_FILE
+    try:
+        if frame_file.exists() and (not gbench_file.exists() or
+                                    frame_file.stat().st_mtime_ns >= gbench_file.stat().st_mtime_ns):
+            return BenchmarkFrame.load(frame_file)
+    except Exception as e:
+        logger.warning(f"Could not read benchmark frame {frame_file}, falling back to JSON: {e}")
+    gbench_data = load_gbench_json(gbench_file)
+    if gbench_data is None:
+        return None
+    return BenchmarkFrame.from_gbench(gbench_data, run=results_dir.name)
+
+
 def load_metadata_json(file_path: Path) -> Optional[Dict]:
     """Load and parse metadata.json."""
     if not file_path.exists():
@@ -58,16 +88,40 @@ def load_perf_log(file_path: Path) -> Optional[str]:
         logger.error(f"Error reading perf log {file_path}: {e}")
         return None
 
+def _find_snippet_files(assembly_dir: Path, subdir: str = "") -> Dict[str, Path]:
+    """
+    Map function name -> .s file in assembly_dir (or a subdirectory such as 'annotated').
+
+    Compressed snippets (--compress-artifacts) are listed from assembly/index.json without
+    touching their content; use read_assembly_text() to decompress one on demand.
+    """
+    snippets = {}
+    index = load_artifact_index(assembly_dir)
+    if index:
+        for name, entry in index.get("files", {}).items():
+            parent, _, file_name = name.rpartition('/')
+            if parent == subdir and file_name.endswith(".s"):
+                snippets[file_name[:-len(".s")]] = assembly_dir / entry["file"]
+    directory = assembly_dir / subdir if subdir else assembly_dir
+    if not index: # Compressed files without an index (e.g. an interrupted run)
+        for suffix in COMPRESSION_SUFFIXES.values():
+            for asm_file in directory.glob(f"*.s{suffix}"):
+                snippets[strip_compression_suffix(asm_file.name)[:-len(".s")]] = asm_file
+    for asm_file in directory.glob("*.s"): # Uncompressed snippets take precedence
+        snippets[asm_file.stem] = asm_file
+    return snippets
+
+def read_assembly_text(asm_path: Path) -> str:
+    """Read an assembly snippet, decompressing .gz/.zst files."""
+    return read_artifact_text(asm_path)
+
 def find_assembly_files(assembly_dir: Path) -> Dict[str, Path]:
-    """Find assembly files (.s) in the assembly directory."""
-    assembly_files = {}
+    """Find assembly files (.s, possibly compressed) in the assembly directory."""
     if not assembly_dir.is_dir():
         logger.debug(f"Assembly directory not found or not a directory: {assembly_dir}")
         return {}
 
-    for asm_file in assembly_dir.glob("*.s"):
-        func_name = asm_file.stem # Use filename without extension as function name key
-        assembly_files[func_name] = asm_file # Store the Path object
+    assembly_files = _find_snippet_files(assembly_dir) # Function name -> Path
 
     # Log markers for failures if they exist
     if (assembly_dir / "_no_functions_found.txt").exists():
@@ -79,29 +133,120 @@ def find_assembly_files(assembly_dir: Path) -> Dict[str, Path]:
 
     return assembly_files
 
+def find_annotated_assembly_files(assembly_dir: Path) -> Dict[str, Path]:
+    """Find profile-annotated assembly files (assembly/annotated/*.s, written with --profile)."""
+    if not assembly_dir.is_dir():
+        return {}
+    return _find_snippet_files(assembly_dir, "annotated")
+
+def _load_function_json_files(assembly_dir: Path, suffix: str) -> Dict[str, Dict]:
+    """Load assembly/<function><suffix> files into a function name -> data mapping."""
+    function_data = {}
+    for json_file in assembly_dir.glob(f"*{suffix}"):
+        try:
+            with open(json_file, 'r') as f:
+                function_data[json_file.name[:-len(suffix)]] = json.load(f)
+        except Exception as e:
+            logger.warning(f"Error reading {json_file}: {e}")
+    return function_data
+
+def load_instruction_mix(assembly_dir: Path) -> Dict[str, Dict]:
+    """Load the static instruction mix of each function (assembly/<function>.metrics.json)."""
+    return _load_function_json_files(assembly_dir, METRICS_SUFFIX)
+
+def load_mca_analysis(assembly_dir: Path) -> Dict[str, Dict]:
+    """Load the llvm-mca loop analysis of each function (assembly/<function>.mca.json, written with --mca)."""
+    return _load_function_json_files(assembly_dir, MCA_SUFFIX)
+
 class BenchmarkRunData:
-     """Holds loaded data for a single benchmark run."""
+     """
+     Holds data for a single benchmark run.
+
+     load() parses metadata.json and benchmark_output.json; every other artifact is read on
+     first access and cached, so callers (and report templates) only pay for the files they use.
+     """
      def __init__(self, results_dir: Path):
           self.results_dir = results_dir
-          self.gbench_data: Optional[Dict] = None
-          self.metadata: Optional[Dict] = None
-          self.perf_log: Optional[str] = None
-          self.assembly_files: Dict[str, Path] = {} # Map func name to Path
           self.load_error = False
 
      def load(self):
+          """
+          Parse the essential data (metadata.json and benchmark_output.json), so a missing,
+          truncated or corrupt file sets load_error here rather than failing during rendering.
+          The other artifacts stay lazy.
+          """
           logger.debug(f"Loading data from: {self.results_dir}")
-          self.gbench_data = load_gbench_json(self.results_dir / "benchmark_output.json")
-          self.metadata = load_metadata_json(self.results_dir / "metadata.json")
-          self.perf_log = load_perf_log(self.results_dir / "perf_stat.log")
-          self.assembly_files = find_assembly_files(self.results_dir / "assembly")
 
           # Basic check for essential data
-          if self.gbench_data is None or self.metadata is None:
+          if self.metadata is None or self.gbench_data is None:
                logger.warning(f"Essential data (gbench/metadata) missing for run: {self.results_dir}")
                self.load_error = True
           return not self.load_error
 
+     @cached_property
+     def gbench_data(self) -> Optional[Dict]:
+          return load_gbench_json(self.results_dir / "benchmark_output.json")
+
+     @cached_property
+     def benchmark_frame(self) -> Optional[BenchmarkFrame]:
+          """Columnar (NumPy) view of gbench_data."""
+          return load_benchmark_frame(self.results_dir)
+
+     @cached_property
+     def metadata(self) -> Optional[Dict]:
+          return load_metadata_json(self.results_dir / "metadata.json")
+
+     @cached_property
+     def perf_log(self) -> Optional[str]:
+          return load_perf_log(self.results_dir / "perf_stat.log")
+
+     @cached_property
+     def assembly_files(self) -> Dict[str, Path]:
+          """Map func name to Path."""
+          return find_assembly_files(self.results_dir / "assembly")
+
+     @cached_property
+     def annotated_assembly_files(self) -> Dict[str, Path]:
+          """Same, with perf record sample percentages."""
+          return find_annotated_assembly_files(self.results_dir / "assembly")
+
+     @cached_property
+     def instruction_mix(self) -> Dict[str, Dict]:
+          """Map func name to static instruction mix metrics."""
+          return load_instruction_mix(self.results_dir / "assembly")
+
+     @cached_property
+     def mca_analysis(self) -> Dict[str, Dict]:
+          """Map func name to llvm-mca predictions of its innermost loops."""
+          return load_mca_analysis(self.results_dir / "assembly")
+
+
+class RunContext(Mapping):
+     """
+     Template context backed by a BenchmarkRunData: run fields are only loaded when the
+     renderer looks them up. Extra entries (experiment_name, results_dir, ...) are passed as keywords.
+     """
+     RUN_FIELDS = ("gbench_data", "metadata", "perf_log", "assembly_files", "annotated_assembly_files",
+                   "instruction_mix", "mca_analysis")
+
+     def __init__(self, run_data: BenchmarkRunData, **extra):
+          self.run_data = run_data
+          self.extra = extra
+
+     def __getitem__(self, key):
+          if key in self.extra:
+               return self.extra[key]
+          if key in self.RUN_FIELDS:
+               return getattr(self.run_data, key)
+          raise KeyError(key)
+
+     def __iter__(self):
+          yield from self.extra
+          yield from (key for key in self.RUN_FIELDS if key not in self.extra)
+
+     def __len__(self):
+          return len(set(self.extra) | set(self.RUN_FIELDS))
+
 def load_benchmark_run(results_dir_path: Path) -> Optional[BenchmarkRunData]:
     """Load all data for a single benchmark run into a BenchmarkRunData object."""
     if not results_dir_path or not results_dir_path.is_dir():
@@ -114,42 +259,92 @@ def load_benchmark_run(results_dir_path: Path) -> Optional[BenchmarkRunData]:
     else:
         return None # Indicate loading failed
 
-def find_all_result_dirs(project_root: Path) -> List[Path]:
-    """Find all valid experiment result directories under results/."""
+# Fields read eagerly by load_benchmark_runs (load() already parses these; the rest stays lazy)
+BULK_LOAD_FIELDS = ("metadata", "gbench_data")
+
+def _load_run_fields(results_dir: Path, fields: Tuple[str, ...]) -> Tuple[Optional[BenchmarkRunData], Optional[str]]:
+    """Worker of load_benchmark_runs: load one run and read the requested fields."""
+    try:
+        if not results_dir.is_dir():
+            return None, "Not a directory"
+        run_data = BenchmarkRunData(results_dir)
+        if not run_data.load():
+            return None, "Essential data (gbench/metadata) missing"
+        for field in fields:
+            getattr(run_data, field)
+        return run_data, None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def load_benchmark_runs(result_dirs: Iterable[Path], max_workers: Optional[int] = None, use_processes: bool = False,
+                        fields: Tuple[str, ...] = BULK_LOAD_FIELDS) -> Tuple[List[Optional[BenchmarkRunData]], Dict[Path, str]]:
+    """
+    Load many result directories with a bounded thread (or process) pool.
+
+    Reading results is latency bound on cold caches and network file systems, so threads
+    are the default; use_processes helps when JSON parsing dominates instead.
+
+    Args:
+        result_dirs: Result directories to load
+        max_workers: Pool size (default: as ThreadPoolExecutor, min(32, CPUs + 4))
+        use_processes: Load in worker processes instead of threads
+        fields: BenchmarkRunData fields to read in the pool; others are loaded on access
+
+    Returns:
+        (runs, errors): runs[i] is the BenchmarkRunData of result_dirs[i] or None if it could
+        not be loaded, and errors maps each failed directory to the reason.
+    """
+    result_dirs = [Path(d) for d in result_dirs]
+    if not result_dirs:
+        return [], {}
+    max_workers = max(1, min(max_workers or min(32, (os.cpu_count() or 1) + 4), len(result_dirs)))
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        # map() keeps the input order; chunks reduce the per-task overhead of worker processes
+        loaded = list(executor.map(_load_run_fields, result_dirs, [tuple(fields)] * len(result_dirs),
+                                   chunksize=max(1, len(result_dirs) // (max_workers * 4))))
+
+    runs = [run_data for run_data, _ in loaded]
+    errors = {results_dir: error for results_dir, (_, error) in zip(result_dirs, loaded) if error}
+    for results_dir, error in errors.items():
+        logger.warning(f"Could not load {results_dir}: {error}")
+    logger.debug(f"Loaded {len(result_dirs) - len(errors)}/{len(result_dirs)} result directories with {max_workers} "
+                 f"{'processes' if use_processes else 'threads'}.")
+    return runs, errors
+
+def find_all_result_dirs(project_root: Path, rescan: bool = False, **filters) -> List[Path]:
+    """
+    Find all valid experiment result directories under results/.
+
+    Discovery goes through the SQLite results index (.cache/results_index.sqlite), which is
+    refreshed first from the run journals in results/.journal/ (or by walking results/ on
+    first use or with rescan=True); only new or changed runs are parsed. Optional filters
+    (experiment, compiler, build_flags, platform, metadata_hash) take a value or a list of values.
+    """
     results_root = project_root / "results"
     if not results_root.is_dir():
         logger.warning(f"Base results directory not found: {results_root}")
         return []
 
-    # Pattern: results/*/*/*/*/<experiment_name>
-    # Where the '*' represent platform, compiler, flags, hash
-    pattern = str(results_root / "*" / "*" / "*" / "*" / "*")
-    potential_dirs = glob.glob(pattern)
-
-    valid_dirs = []
-    for dir_str in potential_dirs:
-        path = Path(dir_str)
-        # Check if it's a directory and contains the essential metadata file
-        if path.is_dir() and (path / "metadata.json").exists():
-             # Basic check: ensure parent dir name looks like a hash (e.g. 8 hex chars)
-             # and grandparent looks like build flags etc. This helps filter out
-             # intermediate or incorrectly structured directories.
-             parent_name = path.parent.name
-             grandparent_name = path.parent.parent.name
-             if len(parent_name) == 8 and all(c in '0123456789abcdef' for c in parent_name.lower()):
-                 # Add more checks on grandparent etc. if needed
-                valid_dirs.append(path)
-             else:
-                 logger.debug(f"Skipping directory - parent name '{parent_name}' doesn't look like metadata hash: {path}")
+    try:
+        with ResultsIndex(project_root) as index:
+            index.refresh(rescan=rescan)
+            valid_dirs = index.find_result_dirs(**filters)
+    except sqlite3.Error as e:
+        logger.warning(f"Results index unavailable ({e}), scanning {results_root} instead.")
+        valid_dirs = scan_result_dirs(results_root)
+        if any(filters.values()):
+            logger.warning("Result directory filters are ignored without the results index.")
 
     logger.info(f"Found {len(valid_dirs)} potential result directories.")
     return valid_dirs
 
 
-def load_benchmark_results_comparison(result_path: Path, experiment_name: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+def load_benchmark_results_comparison(result_path: Path, experiment_name: str,
+                                      index: Optional[ResultsIndex] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
     """
     Loads benchmark data and metadata specifically for comparison.
-    Used by generate_combined_report.
+    Used by generate_combined_report. With a ResultsIndex, the data is read from the index.
     Returns: Tuple of (benchmark_data, metadata) or (None, None).
     """
     experiment_dir = result_path / experiment_name
@@ -157,11 +352,11 @@ def load_benchmark_results_comparison(result_path: Path, experiment_name: str) -
         logger.warning(f"Comparison: Experiment directory not found: {experiment_dir}")
         return None, None
 
-    benchmark_file = experiment_dir / "benchmark_output.json"
-    metadata_file = experiment_dir / "metadata.json"
-
-    benchmark_data = load_gbench_json(benchmark_file)
-    metadata = load_metadata_json(metadata_file)
+    if index is not None:
+        benchmark_data, metadata = index.load_run(experiment_dir)
+    else:
+        benchmark_data = load_gbench_json(experiment_dir / "benchmark_output.json")
+        metadata = load_metadata_json(experiment_dir / "metadata.json")
 
     if benchmark_data is None:
         logger.warning(f"Comparison: Benchmark data missing for {experiment_name} in {result_path}")
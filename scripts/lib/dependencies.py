@@ -0,0 +1,152 @@
+# scripts/lib/dependencies.py
+
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger()
+
+# Keep in sync with the FetchContent_Declare(benchmark ...) block in the top-level CMakeLists.txt
+GBENCH_REPOSITORY = "https://github.com/google/benchmark.git"
+GBENCH_TAG = "v1.8.0"
+
+
+class DependencyCache:
+    """
+    Project-level cache for Google Benchmark, shared by all build directories.
+
+    Layout (under .cache/deps/):
+        src/benchmark-<tag>/                                  Local source checkout
+        benchmark-<tag>/<compiler_id>/<build_type>/build/     Build tree of the prebuilt library
+        benchmark-<tag>/<compiler_id>/<build_type>/install/   Install prefix used by the experiments
+
+    The source checkout is cloned once; on air-gapped machines it can be copied
+    into place manually. Each (compiler, build type) library is built once and
+    reused by every build directory through BENCHEVERYTHING_BENCHMARK_PREFIX.
+    """
+
+    COMPLETE_MARKER = ".complete"
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.source_dir = cache_dir / "src" / f"benchmark-{GBENCH_TAG}"
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _get_lock(self, key: str) -> threading.Lock:
+        """Return the lock serializing work on one cache entry (builds may run concurrently)."""
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _get_prefix_root(self, compiler_id: str, cmake_build_type: str) -> Path:
+        return self.cache_dir / f"benchmark-{GBENCH_TAG}" / compiler_id / cmake_build_type
+
+    def ensure_source(self) -> Optional[Path]:
+        """Return the local Google Benchmark checkout, cloning it if missing."""
+        with self._get_lock("source"):
+            if (self.source_dir / "CMakeLists.txt").exists():
+                return self.source_dir
+
+            git_path = shutil.which("git")
+            if not git_path:
+                logger.warning(f"git not found; cannot populate dependency cache. "
+                               f"Place a Google Benchmark {GBENCH_TAG} checkout at {self.source_dir}")
+                return None
+
+            tmp_dir = self.source_dir.with_name(self.source_dir.name + ".tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir.parent, exist_ok=True)
+            clone_cmd = [git_path, "clone", "--depth", "1", "--branch", GBENCH_TAG, GBENCH_REPOSITORY, str(tmp_dir)]
+            logger.info(f"Populating dependency cache: {' '.join(clone_cmd)}")
+            try:
+                subprocess.run(clone_cmd, check=True, capture_output=True, text=True, timeout=300)
+                tmp_dir.rename(self.source_dir)
+                return self.source_dir
+            except subprocess.CalledProcessError as e:
+                logger.warning(f"Failed to clone Google Benchmark (return code {e.returncode}). "
+                               f"Place a {GBENCH_TAG} checkout at {self.source_dir} for offline builds.")
+                if e.stderr: logger.warning(f"git stderr:\n{e.stderr[-1000:]}")
+            except subprocess.TimeoutExpired:
+                logger.warning("Cloning Google Benchmark timed out.")
+            except Exception as e:
+                logger.warning(f"Error populating dependency cache: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return None
+
+    def ensure_prebuilt(self, compiler_id: str, toolchain_path: Path, cmake_build_type: str,
+                        jobs: Optional[int] = None) -> Optional[Path]:
+        """
+        Return the install prefix of Google Benchmark built for this compiler and build type,
+        building and installing it from the cached source checkout if needed.
+        """
+        prefix_root = self._get_prefix_root(compiler_id, cmake_build_type)
+        install_dir = prefix_root / "install"
+        build_dir = prefix_root / "build"
+
+        with self._get_lock(str(prefix_root)):
+            if (install_dir / self.COMPLETE_MARKER).exists():
+                logger.info(f"Using cached Google Benchmark for {compiler_id} ({cmake_build_type}): {install_dir}")
+                return install_dir
+
+            source_dir = self.ensure_source()
+            if not source_dir:
+                return None
+
+            shutil.rmtree(prefix_root, ignore_errors=True)
+            configure_cmd = [
+                "cmake",
+                "-S", str(source_dir),
+                "-B", str(build_dir),
+                f"-DCMAKE_TOOLCHAIN_FILE={toolchain_path}",
+                f"-DCMAKE_BUILD_TYPE={cmake_build_type}",
+                f"-DCMAKE_INSTALL_PREFIX={install_dir}",
+                "-DBENCHMARK_ENABLE_TESTING=OFF",
+                "-DBENCHMARK_ENABLE_GTEST_TESTS=OFF",
+                "-DBENCHMARK_ENABLE_WERROR=OFF",
+                "-DBENCHMARK_ENABLE_INSTALL=ON",
+            ]
+            install_cmd = ["cmake", "--build", str(build_dir), "--parallel"]
+            if jobs:
+                install_cmd.append(str(jobs))
+            install_cmd += ["--target", "install"]
+
+            logger.info(f"Building Google Benchmark for {compiler_id} ({cmake_build_type}) into the dependency cache...")
+            try:
+                for cmd in (configure_cmd, install_cmd):
+                    logger.debug(f"Running: {' '.join(cmd)}")
+                    subprocess.run(cmd, check=True, capture_output=True, text=True, timeout=600)
+            except subprocess.CalledProcessError as e:
+                logger.warning(f"Building cached Google Benchmark failed (return code {e.returncode}). "
+                               f"Falling back to building it inside the build directory.")
+                if e.stderr: logger.warning(f"Stderr:\n{e.stderr[-1000:]}")
+                return None
+            except subprocess.TimeoutExpired:
+                logger.warning("Building cached Google Benchmark timed out.")
+                return None
+            except Exception as e:
+                logger.warning(f"Unexpected error building cached Google Benchmark: {e}")
+                return None
+
+            (install_dir / self.COMPLETE_MARKER).touch()
+            logger.info(f"Cached Google Benchmark installed to {install_dir}")
+            return install_dir
+
+    def get_cmake_args(self, compiler_id: str, toolchain_path: Path, cmake_build_type: str,
+                       jobs: Optional[int] = None) -> List[str]:
+        """
+        Return the extra CMake configure arguments that make a build directory use the cache.
+
+        Prefers the prebuilt library; falls back to pointing FetchContent at the local
+        source checkout; returns no arguments if neither is available.
+        """
+        install_dir = self.ensure_prebuilt(compiler_id, toolchain_path, cmake_build_type, jobs)
+        if install_dir:
+            return [f"-DBENCHEVERYTHING_BENCHMARK_PREFIX={install_dir}"]
+        if (self.source_dir / "CMakeLists.txt").exists():
+            return [f"-DFETCHCONTENT_SOURCE_DIR_BENCHMARK={self.source_dir}"]
+        return []
@@ -0,0 +1,120 @@
+# scripts/lib/elf.py
+
+import mmap
+import shutil
+import struct
+import subprocess
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .logger import get_logger
+
+logger = get_logger()
+
+SHT_SYMTAB = 2
+SHT_DYNSYM = 11
+STT_FUNC = 2
+SHN_UNDEF = 0
+
+
+class ElfSymbol(NamedTuple):
+    name: str      # Mangled name as stored in the string table
+    address: int
+    size: int
+    is_function: bool
+
+
+def _read_c_string(data, offset: int) -> bytes:
+    end = data.find(b"\0", offset)
+    return data[offset:end if end >= 0 else len(data)]
+
+
+def read_elf_symbols(path: Path, name_filter: Optional[str] = None) -> Optional[List[ElfSymbol]]:
+    """
+    Read the defined symbols of an ELF file from .symtab and .dynsym.
+
+    The file is memory-mapped and the tables are decoded in place with struct; only
+    the names of symbols containing name_filter (if given) are copied out.
+
+    Returns:
+        The symbols (deduplicated by name and address), or None if the file is not a
+        readable ELF file (e.g. Mach-O on macOS), so callers can fall back to nm.
+    """
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _parse_symbols(data, name_filter.encode("utf-8") if name_filter else None)
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug(f"Could not read ELF symbols from {path}: {e}")
+        return None
+
+
+def _parse_symbols(data, name_filter: Optional[bytes]) -> Optional[List[ElfSymbol]]:
+    if len(data) < 64 or data[:4] != b"\x7fELF":
+        return None
+    is_64 = data[4] == 2
+    endian = "<" if data[5] == 1 else ">"
+
+    if is_64:
+        shoff, = struct.unpack_from(endian + "Q", data, 0x28)
+        shentsize, shnum = struct.unpack_from(endian + "HH", data, 0x3A)
+        section_fmt, symbol_size = endian + "IIQQQQIIQQ", 24
+    else:
+        shoff, = struct.unpack_from(endian + "I", data, 0x20)
+        shentsize, shnum = struct.unpack_from(endian + "HH", data, 0x2E)
+        section_fmt, symbol_size = endian + "IIIIIIIIII", 16
+    if shoff == 0:
+        return None
+
+    def section(index):
+        # (sh_type, sh_offset, sh_size, sh_link, sh_entsize)
+        fields = struct.unpack_from(section_fmt, data, shoff + index * shentsize)
+        return fields[1], fields[4], fields[5], fields[6], fields[9]
+
+    if shnum == 0: # Extended section numbering: the count lives in section 0
+        shnum = section(0)[2]
+
+    symbols: Dict[tuple, ElfSymbol] = {}
+    for index in range(shnum):
+        sh_type, sh_offset, sh_size, sh_link, sh_entsize = section(index)
+        if sh_type not in (SHT_SYMTAB, SHT_DYNSYM):
+            continue
+        _, strtab_offset, strtab_size, _, _ = section(sh_link)
+        entsize = sh_entsize or symbol_size
+        for offset in range(sh_offset, sh_offset + sh_size - entsize + 1, entsize):
+            if is_64:
+                st_name, st_info, _, st_shndx, st_value, st_size = struct.unpack_from(endian + "IBBHQQ", data, offset)
+            else:
+                st_name, st_value, st_size, st_info, _, st_shndx = struct.unpack_from(endian + "IIIBBH", data, offset)
+            if st_shndx == SHN_UNDEF or st_name == 0 or st_name >= strtab_size:
+                continue
+            name_bytes = _read_c_string(data, strtab_offset + st_name)
+            if name_filter and name_filter not in name_bytes:
+                continue
+            name = name_bytes.decode("utf-8", errors="replace")
+            symbols.setdefault((name, st_value), ElfSymbol(name, st_value, st_size, (st_info & 0xF) == STT_FUNC))
+    return list(symbols.values())
+
+
+def demangle_symbols(names: List[str]) -> Optional[Dict[str, str]]:
+    """
+    Demangle C++ symbol names with the toolchain's c++filt (or llvm-cxxfilt) in one batch.
+
+    Names that cannot be demangled map to themselves. Returns None if no demangler is
+    installed or it failed.
+    """
+    if not names:
+        return {}
+    demangler = shutil.which("c++filt") or shutil.which("llvm-cxxfilt")
+    if not demangler:
+        logger.debug("Neither c++filt nor llvm-cxxfilt found.")
+        return None
+    try:
+        result = subprocess.run([demangler], input="\n".join(names) + "\n", capture_output=True,
+                                text=True, check=True, timeout=30, errors='ignore')
+        demangled = result.stdout.splitlines()
+        if len(demangled) != len(names):
+            raise ValueError(f"expected {len(names)} names, got {len(demangled)}")
+        return dict(zip(names, demangled))
+    except Exception as e:
+        logger.warning(f"Demangling with {demangler} failed: {e}")
+        return None
@@ -2,12 +2,87 @@ import platform
 import subprocess
 import re
 import os
+import json
+import shutil
+import threading
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 from .logger import get_logger
 
 logger = get_logger()
 
+# --- Probe Cache ---
+# Output of '<compiler> --version'-style probes, keyed by the resolved binary path, its
+# mtime/size and the flag. Kept in memory for the process and, once set_probe_cache_dir()
+# is called, persisted so later runs do not spawn the compilers again.
+PROBE_CACHE_FILE = "environment_probes.json"
+_probe_cache: Optional[Dict[str, Dict]] = None
+_probe_cache_file: Optional[Path] = None
+_probe_cache_lock = threading.Lock()
+
+
+def set_probe_cache_dir(cache_dir: Path):
+    """Persist compiler probe results in cache_dir (e.g. <project_root>/.cache)."""
+    global _probe_cache, _probe_cache_file
+    with _probe_cache_lock:
+        _probe_cache_file = Path(cache_dir) / PROBE_CACHE_FILE
+        _probe_cache = None # Reload, merging with what is on disk
+
+
+def _load_probe_cache() -> Dict[str, Dict]:
+    """Return the probe cache, reading it from disk on first use. Caller holds the lock."""
+    global _probe_cache
+    if _probe_cache is None:
+        _probe_cache = {}
+        if _probe_cache_file and _probe_cache_file.exists():
+            try:
+                with open(_probe_cache_file, 'r') as f:
+                    _probe_cache = json.load(f)
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable probe cache {_probe_cache_file}: {e}")
+    return _probe_cache
+
+
+def _save_probe_cache():
+    """Write the probe cache to disk (atomically). Caller holds the lock."""
+    if not _probe_cache_file:
+        return
+    try:
+        os.makedirs(_probe_cache_file.parent, exist_ok=True)
+        tmp_file = _probe_cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(_probe_cache, f, indent=2)
+        os.replace(tmp_file, _probe_cache_file)
+    except Exception as e:
+        logger.debug(f"Could not write probe cache {_probe_cache_file}: {e}")
+
+
+def _run_version_probe(compiler: str, flag: str) -> Tuple[int, str]:
+    """
+    Run '<compiler> <flag>' once per compiler binary and return (returncode, stdout).
+
+    Raises FileNotFoundError if the compiler cannot be found, like subprocess.run would.
+    """
+    resolved = shutil.which(compiler)
+    if not resolved:
+        raise FileNotFoundError(f"Compiler not found: {compiler}")
+    real_path = os.path.realpath(resolved)
+    stat = os.stat(real_path)
+    key = f"{real_path}|{stat.st_mtime_ns}|{stat.st_size}|{flag}"
+
+    with _probe_cache_lock:
+        cached = _load_probe_cache().get(key)
+    if cached is not None:
+        return cached["returncode"], cached["stdout"]
+
+    result = subprocess.run([compiler, flag], capture_output=True, text=True, check=False, timeout=5)
+    with _probe_cache_lock:
+        _load_probe_cache()[key] = {"returncode": result.returncode, "stdout": result.stdout}
+        _save_probe_cache()
+    return result.returncode, result.stdout
+
 # --- System Information ---
 
 def get_os():
@@ -18,6 +93,7 @@ def get_arch():
     """Get the machine architecture."""
     return platform.machine()
 
+@lru_cache(maxsize=None)
 def get_cpu_model():
     """Get a cleaned CPU model string suitable for paths."""
     cpu_info = "unknown"
@@ -73,7 +149,11 @@ def get_detailed_platform_id():
     return f"{get_os()}-{get_arch()}-{get_cpu_model()}"
 
 def get_full_system_details():
-    """Get a dictionary with detailed system information."""
+    """Get a dictionary with detailed system information (probed once per process)."""
+    return dict(_get_full_system_details())
+
+@lru_cache(maxsize=None)
+def _get_full_system_details():
     system_info = {
         "platform": platform.system(),
         "platform_release": platform.release(),
@@ -87,9 +167,9 @@ def get_full_system_details():
     # Add common compiler versions if available in PATH
     for compiler_cmd, key in [("g++", "gcc_path_version"), ("clang++", "clang_path_version")]:
         try:
-            result = subprocess.run([compiler_cmd, "--version"], capture_output=True, text=True, check=False, timeout=5)
-            if result.returncode == 0:
-                system_info[key] = result.stdout.strip().split('\n')[0]
+            returncode, stdout = _run_version_probe(compiler_cmd, "--version")
+            if returncode == 0:
+                system_info[key] = stdout.strip().split('\n')[0]
             else:
                  system_info[key] = "Not available or error"
         except FileNotFoundError:
@@ -105,6 +185,7 @@ def get_full_system_details():
 
 # --- Compiler Information ---
 
+@lru_cache(maxsize=None)
 def extract_compiler_from_toolchain(toolchain_file_path):
     """Extract the C++ compiler path and type ('gcc', 'clang', or 'unknown') from a toolchain file."""
     compiler_path_str = None
@@ -168,28 +249,25 @@ def get_compiler_version(compiler_path_str):
     try:
         # Try common version flags
         for flag in ["--version", "-dumpversion"]:
-            cmd = [compiler_path_str, flag]
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, check=False, timeout=5
-            )
+            returncode, stdout = _run_version_probe(compiler_path_str, flag)
 
-            if result.returncode == 0 and result.stdout:
+            if returncode == 0 and stdout:
                 # Try to extract semantic version first (most reliable)
-                version_match = re.search(r'(\d+\.\d+\.\d+)', result.stdout)
+                version_match = re.search(r'(\d+\.\d+\.\d+)', stdout)
                 if version_match:
                     version = version_match.group(1)
                     logger.debug(f"Extracted version {version} using flag {flag} for {compiler_path_str}")
                     return version
 
                 # Try to extract simpler version (e.g., just major for -dumpversion)
-                version_match_simple = re.search(r'(\d+\.\d+)', result.stdout)
+                version_match_simple = re.search(r'(\d+\.\d+)', stdout)
                 if version_match_simple:
                      version = version_match_simple.group(1)
                      logger.debug(f"Extracted version {version} using flag {flag} for {compiler_path_str}")
                      return version
 
                 # Fallback: Use the first line, cleaned
-                first_line = result.stdout.split('\n')[0].strip()
+                first_line = stdout.split('\n')[0].strip()
                 # Remove extra info often added by compilers
                 first_line = re.sub(r'\s*\(.*\)\s*', '', first_line).strip()
                 # Basic cleaning for path safety
@@ -0,0 +1,163 @@
+# scripts/lib/mca.py
+
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .asm_analysis import (
+    Instruction, classify_instruction, detect_isa, find_loops, get_branch_target, parse_instructions, strip_operands
+)
+from .logger import get_logger
+
+logger = get_logger()
+
+MCA_SUFFIX = ".mca.json"
+MCA_ITERATIONS = 100
+# Resources within this fraction of the most used one are reported as the bottleneck
+BOTTLENECK_THRESHOLD = 0.95
+
+
+def find_llvm_mca() -> Optional[str]:
+    """Locate llvm-mca, preferring the unversioned name, else the newest llvm-mca-<N> on PATH."""
+    mca_path = shutil.which("llvm-mca")
+    if mca_path:
+        return mca_path
+    candidates = []
+    for path_dir in os.environ.get("PATH", "").split(os.pathsep):
+        for candidate in glob.glob(os.path.join(path_dir, "llvm-mca-[0-9]*")):
+            version = re.search(r'llvm-mca-(\d+)$', candidate)
+            if version and os.access(candidate, os.X_OK):
+                candidates.append((int(version.group(1)), candidate))
+    return max(candidates)[1] if candidates else None
+
+
+def loop_to_assembly(body: List[Instruction], isa: str) -> str:
+    """
+    Turn an objdump loop body back into assembler input for llvm-mca.
+
+    Direct branch targets are replaced by labels (targets outside the body jump to a
+    label after the loop), since objdump prints absolute addresses.
+    """
+    body_addresses = {insn.address for insn in body}
+    targets = {}
+    for insn in body:
+        target = get_branch_target(insn, isa)
+        if target is not None:
+            targets[insn.address] = f".Lbb_{target:x}" if target in body_addresses else ".Lexit"
+
+    lines = []
+    for insn in body:
+        if f".Lbb_{insn.address:x}" in targets.values():
+            lines.append(f".Lbb_{insn.address:x}:")
+        operands = strip_operands(insn.operands, isa)
+        if insn.address in targets:
+            # Keep the condition operands of cbz/tbz (AArch64), replace only the trailing target
+            operands = re.sub(r'(?:0x)?[0-9a-f]+$', targets[insn.address], operands)
+        lines.append(f"    {insn.mnemonic} {operands}".rstrip())
+    lines.append(".Lexit:")
+    return "\n".join(lines) + "\n"
+
+
+def run_llvm_mca(mca_path: str, assembly: str, mcpu: str = "native") -> Optional[Dict]:
+    """
+    Simulate a loop body with llvm-mca.
+
+    Returns:
+        Predicted cycles per iteration, block reciprocal throughput, IPC, the per-iteration
+        pressure on each resource and the bottleneck resources, or None if llvm-mca fails.
+    """
+    mca_cmd = [mca_path, f"-mcpu={mcpu}", f"-iterations={MCA_ITERATIONS}", "-json", "-"]
+    try:
+        result = subprocess.run(mca_cmd, input=assembly, capture_output=True, text=True, check=True, timeout=60)
+        report = json.loads(result.stdout)
+    except subprocess.CalledProcessError as e:
+        logger.debug(f"llvm-mca failed (return code {e.returncode}): {e.stderr[:500] if e.stderr else ''}")
+        return None
+    except (subprocess.TimeoutExpired, OSError, ValueError) as e:
+        logger.debug(f"Error running llvm-mca: {e}")
+        return None
+
+    region = report["CodeRegions"][0]
+    summary = region["SummaryView"]
+    resources = report.get("TargetInfo", {}).get("Resources", [])
+    # The pressure rows with InstructionIndex == number of instructions hold the per-iteration totals
+    total_index = len(region.get("Instructions", []))
+    pressure = {}
+    for entry in region.get("ResourcePressureView", {}).get("ResourcePressureInfo", []):
+        if entry["InstructionIndex"] == total_index and entry["ResourceIndex"] < len(resources):
+            pressure[resources[entry["ResourceIndex"]]] = round(entry["ResourceUsage"], 2)
+    max_pressure = max(pressure.values(), default=0)
+    bottleneck = sorted(name for name, usage in pressure.items()
+                        if max_pressure and usage >= BOTTLENECK_THRESHOLD * max_pressure)
+
+    return {
+        "cpu": report.get("TargetInfo", {}).get("CPUName", mcpu),
+        "cycles_per_iteration": round(summary["TotalCycles"] / summary["Iterations"], 2),
+        "block_rthroughput": summary.get("BlockRThroughput"),
+        "ipc": summary.get("IPC"),
+        "dispatch_width": summary.get("DispatchWidth"),
+        "resource_pressure": pressure,
+        "bottleneck": bottleneck,
+    }
+
+
+def analyze_function(mca_path: str, lines: List[str], mcpu: str = "native") -> Optional[Dict]:
+    """
+    Run llvm-mca on the innermost loops of an extracted function.
+
+    Loops containing calls are skipped, since llvm-mca cannot see the callee. The
+    largest remaining loop is marked primary: it is usually the measured kernel.
+    """
+    instructions = parse_instructions(lines)
+    if not instructions:
+        return None
+    isa = detect_isa(instructions)
+    analyzed, skipped = [], 0
+    for loop in find_loops(instructions, isa):
+        if not loop["innermost"]:
+            continue
+        start, end = int(loop["start"], 16), int(loop["end"], 16)
+        body = [insn for insn in instructions if start <= insn.address <= end]
+        if any(classify_instruction(insn, isa)["calls"] for insn in body):
+            skipped += 1
+            continue
+        prediction = run_llvm_mca(mca_path, loop_to_assembly(body, isa), mcpu)
+        if prediction is None:
+            logger.debug(f"llvm-mca could not analyze loop {loop['start']}-{loop['end']}")
+            skipped += 1
+            continue
+        analyzed.append({"start": loop["start"], "end": loop["end"], "instructions": len(body), **prediction})
+
+    primary = max(range(len(analyzed)), key=lambda i: analyzed[i]["instructions"]) if analyzed else None
+    return {"loops": analyzed, "primary": primary, "skipped_loops": skipped}
+
+
+def write_mca_analysis(assembly_dir: Path, mcpu: str = "native") -> Optional[int]:
+    """
+    Write <function>.mca.json next to every extracted <function>.s in assembly_dir.
+
+    Returns:
+        The number of functions with at least one analyzed loop, or None if llvm-mca is not installed.
+    """
+    mca_path = find_llvm_mca()
+    if not mca_path:
+        logger.warning("llvm-mca not found, skipping throughput analysis.")
+        return None
+    analyzed = 0
+    for asm_file in sorted(assembly_dir.glob("*.s")):
+        try:
+            with open(asm_file, 'r', encoding='utf-8', errors='ignore') as f:
+                analysis = analyze_function(mca_path, f.read().splitlines(), mcpu)
+            if analysis is None:
+                continue
+            with open(assembly_dir / f"{asm_file.stem}{MCA_SUFFIX}", 'w', encoding='utf-8') as f:
+                json.dump({"function": asm_file.stem, "tool": mca_path, "iterations": MCA_ITERATIONS, **analysis}, f, indent=2)
+            analyzed += analysis["primary"] is not None
+        except Exception as e:
+            logger.warning(f"llvm-mca analysis of {asm_file} failed: {e}")
+    return analyzed
@@ -54,6 +54,46 @@ def generate_metadata_hash(
     return short_hash, metadata_source_string
 
 
+def _hash_file(file_path: Path, hash_obj) -> None:
+    """Feed a file's contents into hash_obj in chunks."""
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            hash_obj.update(chunk)
+
+
+def generate_content_hash(experiment_dir: Path, executable_path: Path, gbench_args: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Generate a hash of everything that determines a run's output beyond its metadata hash:
+    the experiment sources (src/, CMakeLists.txt, exp_config.json), the built executable
+    and the Google Benchmark arguments.
+
+    Returns:
+        Tuple of (content_hash, per-component digests)
+    """
+    sources_hash = hashlib.sha256()
+    source_paths = [experiment_dir / "CMakeLists.txt", experiment_dir / "exp_config.json"]
+    source_dir = experiment_dir / "src"
+    if source_dir.is_dir():
+        source_paths += [p for p in source_dir.rglob("*") if p.is_file()]
+    for source_path in sorted(p for p in source_paths if p.is_file()):
+        # Include the relative path so renames/moves change the hash too
+        sources_hash.update(source_path.relative_to(experiment_dir).as_posix().encode('utf-8') + b'\0')
+        _hash_file(source_path, sources_hash)
+
+    executable_hash = hashlib.sha256()
+    _hash_file(executable_path, executable_hash)
+
+    components = {
+        "sources": sources_hash.hexdigest(),
+        "executable": executable_hash.hexdigest(),
+        "gbench_args": hashlib.sha256(" ".join(gbench_args.split()).encode('utf-8')).hexdigest(),
+    }
+    content_hash = hashlib.sha256("|".join(f"{k}={v}" for k, v in sorted(components.items())).encode('utf-8')).hexdigest()
+
+    logger.debug(f"Generated content hash '{content_hash[:12]}' for {experiment_dir.name}: {components}")
+    return content_hash, components
+
+
 def create_metadata_dict(
     config: BenchEverythingConfig,
     experiment_name: str,
@@ -61,7 +101,9 @@ def create_metadata_dict(
     build_flags_id: str,
     cxx_flags_used: str,
     cmake_build_type: str,
-    gbench_cmd_base: list # Base command before args specific to this run
+    gbench_cmd_base: list, # Base command before args specific to this run
+    compiler_info: Optional[Dict] = None, # Pre-detected compiler info (see BenchmarkRunner.get_compiler_info)
+    extra_hash_data: Optional[Dict] = None # Run options that should produce a distinct metadata hash
 ) -> Dict:
     """
     Create the complete metadata dictionary for an experiment run.
@@ -74,12 +116,18 @@ def create_metadata_dict(
 
     # --- Gather Compiler Info ---
     toolchain_path_rel = compiler_config.get('toolchain_file', '')
-    toolchain_path_abs = project_root / toolchain_path_rel if toolchain_path_rel else None
-    compiler_path, compiler_type = extract_compiler_from_toolchain(toolchain_path_abs)
-    compiler_version = get_compiler_version(compiler_path)
-    detailed_compiler_id = get_detailed_compiler_id(
-        compiler_config['name'], compiler_path, compiler_type, compiler_version
-    ) # e.g., gcc-11.2.0
+    if compiler_info:
+        compiler_path = compiler_info['compiler_path']
+        compiler_type = compiler_info['compiler_type']
+        compiler_version = compiler_info['compiler_version']
+        detailed_compiler_id = compiler_info['detailed_compiler_id']
+    else:
+        toolchain_path_abs = project_root / toolchain_path_rel if toolchain_path_rel else None
+        compiler_path, compiler_type = extract_compiler_from_toolchain(toolchain_path_abs)
+        compiler_version = get_compiler_version(compiler_path)
+        detailed_compiler_id = get_detailed_compiler_id(
+            compiler_config['name'], compiler_path, compiler_type, compiler_version
+        ) # e.g., gcc-11.2.0
 
     # --- Generate Hash ---
     exp_config = config.load_experiment_config(experiment_name)
@@ -89,6 +137,8 @@ def create_metadata_dict(
         additional_hash_data["exp_cmake_flags"] = exp_config["cmake_flags"]
     if exp_config.get("cxx_flags"):
         additional_hash_data["exp_cxx_flags"] = exp_config["cxx_flags"]
+    if extra_hash_data:
+        additional_hash_data.update(extra_hash_data)
 
     metadata_hash, metadata_source_string = generate_metadata_hash(
         detailed_platform_id,
@@ -1,9 +1,13 @@
 import math
 import os
+import re
 from pathlib import Path
 from typing import Dict, Set, Optional, List
 
+import numpy as np
+
 from .logger import get_logger
+from .bench_frame import BenchmarkFrame
 
 logger = get_logger()
 
@@ -164,6 +168,89 @@ def create_assembly_links_section(assembly_files: Dict[str, Path], report_dir: P
 
     return links
 
+def create_instruction_mix_table(instruction_mix: Dict[str, Dict]) -> str:
+    """
+    Create Markdown tables of the static instruction mix per function (assembly/*.metrics.json)
+    and of their innermost loops, where vectorization shows up.
+    """
+    if not instruction_mix:
+        return "No instruction mix available."
+
+    columns = [("Insns", "instructions"), ("Vector FP", "vector_fp"), ("Scalar FP", "scalar_fp"),
+               ("Vector Int", "vector_int"), ("Scalar Int", "scalar_int"), ("Memory", "memory"),
+               ("Calls", "calls"), ("Branches", "branches")]
+    header = " | ".join(name for name, _ in columns)
+    separator = "|".join("-" * (len(name) + 2) for name, _ in columns)
+
+    table = f"| Function | {header} | Loops |\n"
+    table += f"|----------|{separator}|-------|\n"
+    loop_rows = ""
+    for func_name in sorted(instruction_mix.keys()):
+        metrics = instruction_mix[func_name]
+        values = " | ".join(str(metrics.get(key, "N/A")) for _, key in columns)
+        table += f"| `{func_name}` | {values} | {len(metrics.get('loops', []))} |\n"
+        for loop in metrics.get("loops", []):
+            if loop.get("innermost"):
+                values = " | ".join(str(loop["mix"].get(key, "N/A")) for _, key in columns)
+                loop_rows += f"| `{func_name}` | {loop['start']}-{loop['end']} | {values} |\n"
+
+    if loop_rows:
+        table += "\n**Innermost loops**\n\n"
+        table += f"| Function | Addresses | {header} |\n"
+        table += f"|----------|-----------|{separator}|\n"
+        table += loop_rows
+
+    return table
+
+TIME_UNIT_TO_NS = {"ns": 1.0, "us": 1e3, "ms": 1e6, "s": 1e9}
+
+def _normalize_function_name(name: str) -> str:
+    """Benchmark and symbol names differ in template spacing and libstdc++ inline namespaces."""
+    return re.sub(r'\s+|__cxx11::', '', name)
+
+def create_mca_summary_table(mca_analysis: Dict[str, Dict], benchmark_data: Optional[Dict]) -> str:
+    """
+    Create a Markdown table comparing the llvm-mca prediction for the primary loop of each
+    function (assembly/*.mca.json) with the measured CPU time per benchmark iteration.
+
+    Predicted cycles are converted to time with the CPU frequency from the Google Benchmark
+    context (mhz_per_cpu). A Measured/Predicted ratio far from 1 points at measurement noise,
+    frequency scaling, or a benchmark iteration that runs the loop more than once.
+    """
+    if not mca_analysis:
+        return "No llvm-mca analysis available."
+
+    context = (benchmark_data or {}).get("context", {})
+    mhz = context.get("mhz_per_cpu")
+    benchmarks = [b for b in (benchmark_data or {}).get("benchmarks", []) if b.get("run_type") != "aggregate"]
+
+    table = "| Function | Loop | CPU | Cycles/Iter | Bottleneck | Predicted (ns) | Benchmark | Measured CPU (ns) | Measured/Predicted |\n"
+    table += "|----------|------|-----|-------------|------------|----------------|-----------|-------------------|--------------------|\n"
+    for func_name in sorted(mca_analysis.keys()):
+        analysis = mca_analysis[func_name]
+        if analysis.get("primary") is None:
+            table += f"| `{func_name}` | N/A ({analysis.get('skipped_loops', 0)} loop(s) skipped) | | | | | | | |\n"
+            continue
+        loop = analysis["loops"][analysis["primary"]]
+        predicted_ns = loop["cycles_per_iteration"] * 1000.0 / mhz if mhz else None
+        prefix = (f"| `{func_name}` | {loop['start']}-{loop['end']} | {loop.get('cpu', 'N/A')} | "
+                  f"{loop['cycles_per_iteration']:.2f} | {', '.join(loop.get('bottleneck', [])) or 'N/A'} | "
+                  f"{f'{predicted_ns:.3f}' if predicted_ns else 'N/A'} | ")
+
+        matching = [b for b in benchmarks
+                    if _normalize_function_name(b.get("name", "").split('/')[0]) == _normalize_function_name(func_name)]
+        if not matching:
+            table += prefix + "N/A | N/A | N/A |\n"
+        for benchmark in matching:
+            measured_ns = benchmark.get("cpu_time", 0) * TIME_UNIT_TO_NS.get(benchmark.get("time_unit", "ns"), 1.0)
+            ratio = f"{measured_ns / predicted_ns:.2f}" if predicted_ns else "N/A"
+            table += prefix + f"`{benchmark.get('name')}` | {measured_ns:.3f} | {ratio} |\n"
+
+    if not mhz:
+        table += "\n*CPU frequency (mhz_per_cpu) not found in the benchmark context; predicted times are not available.*\n"
+    return table
+
+
 
 # --- Comparison Report Utilities ---
 
@@ -198,35 +285,23 @@ def identify_common_metrics(baseline_data: Dict, contender_data: Dict) -> Set[st
     logger.debug(f"Identified common metrics: {common}")
     return common
 
-def calculate_improvement(baseline_value: float, contender_value: float, metric_name: str) -> float:
+# Metrics where lower is better; higher is better for all other numeric metrics
+LOWER_IS_BETTER_METRICS = ['real_time', 'cpu_time', 'time', 'cycles', 'instructions', 'cache_misses']
+
+def calculate_improvements(baseline_values: np.ndarray, contender_values: np.ndarray, metric_name: str) -> np.ndarray:
     """
-    Calculate improvement percentage.
+    Calculate improvement percentages over aligned value arrays.
     Positive = contender is better. Negative = baseline is better.
-    Handles division by zero.
+    A zero baseline gives 0 (no change) or +/- infinity; NaN where a value is missing.
     """
-    # Metrics where lower is better
-    lower_is_better = ['real_time', 'cpu_time', 'time', 'cycles', 'instructions', 'cache_misses']
-    # Metrics where higher is better
-    # higher_is_better = ['items_per_second', 'bytes_per_second'] # Add others as needed
-
-    if baseline_value == 0:
-        if contender_value == 0:
-            return 0.0 # No change
-        elif contender_value < 0 and metric_name in lower_is_better:
-             return float('inf') # Baseline was zero, contender negative (inf improvement)
-        elif contender_value > 0 and metric_name in lower_is_better:
-             return float('-inf') # Baseline was zero, contender positive (inf regression)
-        elif contender_value > 0: # Higher is better case
-             return float('inf')
-        else: # Contender < 0 for higher_is_better
-             return float('-inf')
-
-    # Normal calculation
-    if metric_name in lower_is_better:
-        improvement = ((baseline_value - contender_value) / abs(baseline_value)) * 100
-    else: # Assume higher is better for all other numeric metrics
-        improvement = ((contender_value - baseline_value) / abs(baseline_value)) * 100
-
+    sign = -1.0 if metric_name in LOWER_IS_BETTER_METRICS else 1.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        improvement = sign * (contender_values - baseline_values) / np.abs(baseline_values) * 100
+    # Baseline zero: no change, or +/- infinity depending on the direction of the contender
+    zero_baseline = baseline_values == 0
+    improvement[zero_baseline] = np.where(contender_values[zero_baseline] == 0, 0.0,
+                                          np.copysign(np.inf, sign * contender_values[zero_baseline]))
+    improvement[np.isnan(baseline_values) | np.isnan(contender_values)] = np.nan
     return improvement
 
 def get_winner(improvement: float, threshold: float = 1.0) -> str:
@@ -266,6 +341,12 @@ def format_improvement_value(improvement: float) -> str:
 
      return f"<span style='color:{color}'>{value}</span>"
 
+def _distinct_values(frame: BenchmarkFrame, column: str) -> Set[str]:
+    """Distinct values (as strings) of a column over the last row of each benchmark name."""
+    _, rows = frame.last_rows_by_name()
+    values = (frame.value(column, row) for row in rows.tolist())
+    return {str(value) for value in values if value is not None}
+
 def create_comparison_table(
     baseline_data: Dict, contender_data: Dict,
     baseline_label: str, contender_label: str,
@@ -303,52 +384,45 @@ def create_comparison_table(
     table = "| " + " | ".join(headers) + " |\n"
     table += "| " + " | ".join(["-" * len(h) for h in headers]) + " |\n"
 
-    # Data rows
-    baseline_benchmarks = {b['name']: b for b in baseline_data.get('benchmarks', [])}
-    contender_benchmarks = {b['name']: b for b in contender_data.get('benchmarks', [])}
-    common_benchmark_names = sorted(set(baseline_benchmarks.keys()).intersection(contender_benchmarks.keys()))
+    # Data rows: benchmarks are matched by name on columnar frames
+    baseline_frame = BenchmarkFrame.from_gbench(baseline_data)
+    contender_frame = BenchmarkFrame.from_gbench(contender_data)
+    common_benchmark_names, baseline_rows, contender_rows = baseline_frame.align(contender_frame)
 
-    if not common_benchmark_names:
+    if not len(common_benchmark_names):
          return "[No common benchmarks found between runs]"
 
     primary_metric = 'real_time' if 'real_time' in common_metrics else ('cpu_time' if 'cpu_time' in common_metrics else None)
-    significant_diff_found = False
 
-    for bench_name in common_benchmark_names:
-        baseline_bench = baseline_benchmarks[bench_name]
-        contender_bench = contender_benchmarks[bench_name]
+    # Improvements of all common benchmarks, one array per metric
+    improvements = {
+        metric: calculate_improvements(baseline_frame.column(metric)[baseline_rows],
+                                       contender_frame.column(metric)[contender_rows], metric)
+        for metric in ordered_metrics
+    }
+    significant_diff_found = any(bool(np.any(np.isfinite(values) & (np.abs(values) > 1.0)))
+                                 for values in improvements.values())
+    primary_improvements = np.zeros(len(common_benchmark_names))
+    if primary_metric in improvements:
+        primary_improvements = np.nan_to_num(improvements[primary_metric], nan=0.0, posinf=1e9, neginf=-1e9)
 
+    for i, bench_name in enumerate(common_benchmark_names.tolist()):
         row_values = [bench_name]
-        primary_improvement = 0.0
-
         for metric in ordered_metrics:
-            try:
-                b_val = baseline_bench.get(metric)
-                c_val = contender_bench.get(metric)
-
-                # Ensure values are numeric for calculation
-                b_float = float(b_val)
-                c_float = float(c_val)
-
-                improvement = calculate_improvement(b_float, c_float, metric)
-
-                row_values.append(format_comparison_value(b_val))
-                row_values.append(format_comparison_value(c_val))
-                row_values.append(format_improvement_value(improvement))
-
-                if metric == primary_metric:
-                    primary_improvement = improvement if math.isfinite(improvement) else (1e9 if improvement > 0 else -1e9)
-                if abs(improvement) > 1.0 and math.isfinite(improvement): # Check for >1% diff
-                     significant_diff_found = True
-
-            except (ValueError, TypeError, KeyError) as e:
-                logger.debug(f"Skipping metric '{metric}' for benchmark '{bench_name}' due to non-numeric value or missing key: {e}")
-                row_values.append(str(baseline_bench.get(metric, "N/A")))
-                row_values.append(str(contender_bench.get(metric, "N/A")))
+            b_val = baseline_frame.value(metric, baseline_rows[i])
+            c_val = contender_frame.value(metric, contender_rows[i])
+            if b_val is None or c_val is None:
+                logger.debug(f"Skipping metric '{metric}' for benchmark '{bench_name}' due to a missing value")
+                row_values.append(str(b_val if b_val is not None else "N/A"))
+                row_values.append(str(c_val if c_val is not None else "N/A"))
                 row_values.append("N/A") # Cannot calculate improvement
+                continue
+            row_values.append(format_comparison_value(b_val))
+            row_values.append(format_comparison_value(c_val))
+            row_values.append(format_improvement_value(float(improvements[metric][i])))
 
         # Determine winner based on primary metric
-        winner = get_winner(primary_improvement)
+        winner = get_winner(float(primary_improvements[i]))
         # Adjust winner label for clarity
         winner_label = contender_label if winner == 'contender' else (baseline_label if winner == 'baseline' else 'tie')
         row_values.append(winner_label)
@@ -363,8 +437,8 @@ def create_comparison_table(
     warnings = []
     for key in ['iterations', 'repetitions']:
         if key in common_metrics:
-            baseline_vals = set(str(b.get(key)) for b in baseline_benchmarks.values() if key in b)
-            contender_vals = set(str(b.get(key)) for b in contender_benchmarks.values() if key in b)
+            baseline_vals = _distinct_values(baseline_frame, key)
+            contender_vals = _distinct_values(contender_frame, key)
             if len(baseline_vals) > 1 or len(contender_vals) > 1 or baseline_vals != contender_vals:
                  warnings.append(f"**{key.capitalize()} differ:** Baseline: {sorted(list(baseline_vals))}, Contender: {sorted(list(contender_vals))}")
 
@@ -0,0 +1,469 @@
+# scripts/lib/results_index.py
+
+import glob
+import json
+import os
+import socket
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from .logger import get_logger
+
+logger = get_logger()
+
+RESULTS_INDEX_FILE = Path(".cache") / "results_index.sqlite"
+SCHEMA_VERSION = 2
+# results/.journal/<host>.jsonl: one line per finished run, appended by the runner.
+# One file per machine, so journals committed together with results/ never conflict.
+JOURNAL_DIR = ".journal"
+# Identifiers of a Google Benchmark entry that are not measurements
+NON_METRIC_FIELDS = {"family_index", "per_family_instance_index", "repetitions", "repetition_index", "threads"}
+
+SCHEMA = """
+CREATE TABLE runs (
+    id INTEGER PRIMARY KEY,
+    results_dir TEXT NOT NULL UNIQUE,
+    platform TEXT,
+    compiler TEXT,
+    compiler_type TEXT,
+    build_flags TEXT,
+    metadata_hash TEXT,
+    experiment TEXT,
+    timestamp TEXT,
+    files TEXT NOT NULL,
+    metadata TEXT,
+    context TEXT
+);
+CREATE TABLE benchmarks (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    run_name TEXT,
+    run_type TEXT,
+    aggregate_name TEXT,
+    time_unit TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE metrics (
+    benchmark_id INTEGER NOT NULL REFERENCES benchmarks(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL
+);
+CREATE TABLE journals (
+    file TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    tail TEXT NOT NULL
+);
+CREATE TABLE state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX idx_runs_experiment ON runs(experiment);
+CREATE INDEX idx_runs_compiler ON runs(compiler);
+CREATE INDEX idx_runs_build_flags ON runs(build_flags);
+CREATE INDEX idx_runs_platform ON runs(platform);
+CREATE INDEX idx_runs_metadata_hash ON runs(metadata_hash);
+CREATE INDEX idx_benchmarks_run ON benchmarks(run_id);
+CREATE INDEX idx_benchmarks_name ON benchmarks(name);
+CREATE INDEX idx_metrics_benchmark ON metrics(benchmark_id, name);
+"""
+
+Filter = Optional[Union[str, Iterable[str]]]
+
+
+def is_metadata_hash(name: str) -> bool:
+    """Result directories sit below an 8 hex digit metadata hash directory."""
+    return len(name) == 8 and all(c in '0123456789abcdef' for c in name.lower())
+
+
+def scan_result_dirs(results_root: Path) -> List[Path]:
+    """Glob results/<platform>/<compiler>/<flags>/<hash>/<experiment> directories that contain metadata.json."""
+    valid_dirs = []
+    for dir_str in glob.glob(str(results_root / "*" / "*" / "*" / "*" / "*")):
+        path = Path(dir_str)
+        if not (path.is_dir() and (path / "metadata.json").exists()):
+            continue
+        if is_metadata_hash(path.parent.name):
+            valid_dirs.append(path)
+        else:
+            logger.debug(f"Skipping directory - parent name '{path.parent.name}' doesn't look like metadata hash: {path}")
+    return sorted(valid_dirs)
+
+
+def stat_run_dir(results_dir: Path) -> Optional[Dict[str, List[int]]]:
+    """
+    Fingerprint of a results directory: [mtime_ns, size] of each entry directly inside it.
+
+    The assembly/ entry changes whenever snippets are added or removed. Returns None if
+    the directory holds no metadata.json.
+    """
+    files = {}
+    try:
+        with os.scandir(results_dir) as entries:
+            for entry in entries:
+                stat = entry.stat()
+                files[entry.name] = [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return None
+    return files if "metadata.json" in files else None
+
+
+def append_journal(results_root: Path, results_dir: Path):
+    """Record a finished run in results/.journal/<host>.jsonl, so the results index picks it up without a rescan."""
+    journal_dir = results_root / JOURNAL_DIR
+    try:
+        os.makedirs(journal_dir, exist_ok=True)
+        entry = {"results_dir": Path(results_dir).relative_to(results_root).as_posix(),
+                 "time": datetime.now().isoformat(timespec="seconds")}
+        # A single O_APPEND write keeps lines intact when several runners share a host
+        with open(journal_dir / f"{socket.gethostname()}.jsonl", 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not append {results_dir} to the results journal: {e}")
+
+
+class ResultsIndex:
+    """
+    SQLite index of the runs, benchmarks and metrics under results/.
+
+    Layout (.cache/results_index.sqlite):
+        runs        One row per results directory: platform, compiler, flags, hash, experiment,
+                    metadata.json and the Google Benchmark context
+        benchmarks  One row per benchmark entry (name, run/aggregate type, original JSON)
+        metrics     One row per numeric benchmark field (real_time, cpu_time, iterations, counters)
+        journals    Read position in each results/.journal/<host>.jsonl
+
+    The index is a cache of the JSON files: a run is re-parsed whenever the size or mtime
+    of a file in its directory changes, and the index can be deleted at any time. After the
+    first full scan, new runs are discovered from the journals in results/.journal/
+    instead of walking results/.
+    """
+
+    def __init__(self, project_root: Path, db_path: Optional[Path] = None):
+        self.project_root = Path(project_root).resolve()
+        self.results_root = self.project_root / "results"
+        self.db_path = db_path or self.project_root / RESULTS_INDEX_FILE
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self._ensure_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _ensure_schema(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return
+        if version:
+            logger.info(f"Results index schema changed ({version} -> {SCHEMA_VERSION}), rebuilding {self.db_path}")
+        with self.conn:
+            # Drop every existing table (whatever the old schema defined), dependents first
+            tables = [row[0] for row in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY rowid DESC"
+            )]
+            for table in tables:
+                self.conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            self.conn.executescript(SCHEMA)
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _key(self, results_dir: Path) -> str:
+        """Index key of a results directory: relative to the project root where possible."""
+        path = Path(results_dir)
+        if not path.is_absolute():
+            path = self.project_root / path
+        path = path.resolve()
+        try:
+            return path.relative_to(self.project_root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def _path(self, key: str) -> Path:
+        return self.project_root / key
+
+    # --- Ingestion ---
+
+    def refresh(self, result_dirs: Optional[Iterable[Path]] = None, rescan: bool = False) -> Dict[str, int]:
+        """
+        Bring the index up to date.
+
+        Args:
+            result_dirs: Directories to check. By default, the directories appended to the
+                journals since the last refresh are checked, and runs whose directory was
+                deleted are removed.
+            rescan: Walk all of results/ (also removing runs whose directory is gone). Done
+                automatically on first use and when a journal was rewritten.
+
+        Returns:
+            Counts of added, updated, removed and unchanged runs.
+        """
+        full_scan = False
+        prune = result_dirs is None
+        journal_positions = {}
+        if result_dirs is None:
+            if not rescan and self._get_state("scanned"):
+                result_dirs, journal_positions = self._read_journals()
+            full_scan = result_dirs is None
+            if full_scan:
+                result_dirs = scan_result_dirs(self.results_root) if self.results_root.is_dir() else []
+        result_dirs = list(result_dirs)
+
+        fingerprints = self._get_fingerprints(None if full_scan else [self._key(d) for d in result_dirs])
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        seen = set()
+        with self.conn:
+            for results_dir in result_dirs:
+                key = self._key(results_dir)
+                if key in seen:
+                    continue
+                seen.add(key)
+                path = self._path(key)
+                files = stat_run_dir(path)
+                if files is None:
+                    # No metadata.json: the directory is (no longer) a valid run
+                    if key in fingerprints:
+                        self.conn.execute("DELETE FROM runs WHERE results_dir = ?", (key,))
+                        counts["removed"] += 1
+                    continue
+                if fingerprints.get(key) == files:
+                    counts["unchanged"] += 1
+                    continue
+                if self._index_run(key, path, files):
+                    counts["updated" if key in fingerprints else "added"] += 1
+            if full_scan:
+                for key in fingerprints.keys() - seen:
+                    self.conn.execute("DELETE FROM runs WHERE results_dir = ?", (key,))
+                    counts["removed"] += 1
+                journal_positions = self._get_journal_ends()
+                self._set_state("scanned", datetime.now().isoformat(timespec="seconds"))
+            elif prune:
+                # Deletions are not journaled: drop runs whose metadata.json is gone (one stat per run)
+                for key in self._get_indexed_keys() - seen:
+                    if not (self._path(key) / "metadata.json").is_file():
+                        self.conn.execute("DELETE FROM runs WHERE results_dir = ?", (key,))
+                        counts["removed"] += 1
+            # Journal offsets advance in the same transaction as the runs they announced
+            self.conn.executemany("INSERT OR REPLACE INTO journals (file, offset, tail) VALUES (?, ?, ?)",
+                                  [(name, offset, tail) for name, (offset, tail) in journal_positions.items()])
+        if counts["added"] or counts["updated"] or counts["removed"]:
+            logger.info(f"Results index: {counts['added']} added, {counts['updated']} updated, "
+                        f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+        return counts
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def _journal_files(self) -> List[Path]:
+        return sorted((self.results_root / JOURNAL_DIR).glob("*.jsonl"))
+
+    @staticmethod
+    def _complete_lines(data: bytes) -> Tuple[int, List[str]]:
+        """Length and lines of the complete part of journal data; a line being written is read next time."""
+        complete = data[:data.rfind(b"\n") + 1]
+        return len(complete), complete.decode('utf-8', errors='replace').splitlines()
+
+    def _read_journals(self) -> Tuple[Optional[List[Path]], Dict[str, Tuple[int, str]]]:
+        """
+        Return the run directories appended to the journals since the last refresh, and the
+        new read position (offset, last line) of each journal.
+
+        Only the new bytes of each journal are read. Returns (None, {}) if a journal shrank
+        or its already read part changed (a rewrite or merge): a full scan is needed then.
+        """
+        positions = {row["file"]: (row["offset"], row["tail"]) for row in self.conn.execute("SELECT * FROM journals")}
+        result_dirs, new_positions = [], {}
+        for journal in self._journal_files():
+            offset, tail = positions.get(journal.name, (0, ""))
+            tail_bytes = tail.encode('utf-8')
+            try:
+                with open(journal, 'rb') as f:
+                    f.seek(max(offset - len(tail_bytes), 0))
+                    if f.read(len(tail_bytes)) != tail_bytes:
+                        logger.info(f"Results journal {journal.name} was rewritten, rescanning results/")
+                        return None, {}
+                    length, lines = self._complete_lines(f.read())
+            except OSError as e:
+                logger.warning(f"Could not read results journal {journal}: {e}")
+                continue
+            for line in lines:
+                try:
+                    result_dirs.append(self.results_root / json.loads(line)["results_dir"])
+                except (ValueError, KeyError, TypeError):
+                    logger.debug(f"Skipping malformed line in {journal}: {line!r}")
+            if lines:
+                new_positions[journal.name] = (offset + length, lines[-1] + "\n")
+        return result_dirs, new_positions
+
+    def _get_journal_ends(self) -> Dict[str, Tuple[int, str]]:
+        """Read positions at the end of every journal: after a full scan, all entries so far are indexed."""
+        positions = {}
+        for journal in self._journal_files():
+            try:
+                with open(journal, 'rb') as f:
+                    length, lines = self._complete_lines(f.read())
+            except OSError:
+                continue
+            positions[journal.name] = (length, (lines[-1] + "\n") if lines else "")
+        return positions
+
+    def _get_indexed_keys(self) -> Set[str]:
+        return {row["results_dir"] for row in self.conn.execute("SELECT results_dir FROM runs")}
+
+    def _get_fingerprints(self, keys: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Recorded file fingerprint (see stat_run_dir) per indexed run."""
+        query = "SELECT results_dir, files FROM runs"
+        if keys is None:
+            rows = self.conn.execute(query)
+        else:
+            rows = [row for key in keys for row in self.conn.execute(query + " WHERE results_dir = ?", (key,))]
+        return {row["results_dir"]: json.loads(row["files"]) for row in rows}
+
+    def _index_run(self, key: str, path: Path, files: Dict[str, List[int]]) -> bool:
+        """Replace the rows of one run with the content of its JSON files."""
+        try:
+            with open(path / "metadata.json", 'r') as f:
+                metadata = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Results index: cannot read {path / 'metadata.json'}: {e}")
+            return False
+        gbench_data = None
+        if "benchmark_output.json" in files:
+            try:
+                with open(path / "benchmark_output.json", 'r') as f:
+                    gbench_data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Results index: cannot read {path / 'benchmark_output.json'}: {e}")
+
+        # Path components as fallback for older metadata files
+        parts = Path(key).parts
+        platform, compiler, build_flags, metadata_hash, experiment = (list(parts[-5:]) + [None] * 5)[:5]
+        self.conn.execute("DELETE FROM runs WHERE results_dir = ?", (key,))
+        run_id = self.conn.execute(
+            "INSERT INTO runs (results_dir, platform, compiler, compiler_type, build_flags, metadata_hash, experiment, "
+            "timestamp, files, metadata, context) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key,
+             metadata.get("detailed_platform_id", platform),
+             metadata.get("detailed_compiler_id", compiler),
+             metadata.get("compiler_type"),
+             metadata.get("build_flags_id", build_flags),
+             metadata.get("metadata_hash", metadata_hash),
+             metadata.get("experiment_name", experiment),
+             metadata.get("timestamp_iso"),
+             json.dumps(files),
+             json.dumps(metadata),
+             json.dumps(gbench_data.get("context", {})) if gbench_data is not None else None),
+        ).lastrowid
+
+        for position, benchmark in enumerate((gbench_data or {}).get("benchmarks", [])):
+            benchmark_id = self.conn.execute(
+                "INSERT INTO benchmarks (run_id, position, name, run_name, run_type, aggregate_name, time_unit, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, position, benchmark.get("name", ""), benchmark.get("run_name"), benchmark.get("run_type"),
+                 benchmark.get("aggregate_name"), benchmark.get("time_unit"), json.dumps(benchmark)),
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO metrics (benchmark_id, name, value) VALUES (?, ?, ?)",
+                [(benchmark_id, name, value) for name, value in benchmark.items()
+                 if isinstance(value, (int, float)) and not isinstance(value, bool) and name not in NON_METRIC_FIELDS],
+            )
+        return True
+
+    # --- Queries ---
+
+    @staticmethod
+    def _filter_clauses(filters: Dict[str, Filter]) -> Tuple[List[str], List]:
+        """Build SQL conditions on runs; each filter is a single value or a list of accepted values."""
+        clauses, params = [], []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            placeholders = ", ".join("?" * len(values))
+            if column == "compiler":
+                # Match the detailed id (gcc-12.2.0) or the compiler type (gcc)
+                clauses.append(f"(runs.compiler IN ({placeholders}) OR runs.compiler_type IN ({placeholders}))")
+                params.extend(values * 2)
+            else:
+                clauses.append(f"runs.{column} IN ({placeholders})")
+                params.extend(values)
+        return clauses, params
+
+    def find_result_dirs(self, experiment: Filter = None, compiler: Filter = None, build_flags: Filter = None,
+                         platform: Filter = None, metadata_hash: Filter = None) -> List[Path]:
+        """Return the indexed results directories matching all given filters, sorted by path."""
+        clauses, params = self._filter_clauses({"experiment": experiment, "compiler": compiler, "build_flags": build_flags,
+                                                "platform": platform, "metadata_hash": metadata_hash})
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        rows = self.conn.execute(f"SELECT results_dir FROM runs{where} ORDER BY results_dir", params)
+        return [self._path(row["results_dir"]) for row in rows]
+
+    def load_run(self, results_dir: Path) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        Return (benchmark_data, metadata) of one run, as stored in its JSON files.
+
+        The run is re-indexed first if its files changed. Returns (None, None) if the
+        directory holds no valid run.
+        """
+        self.refresh([results_dir])
+        run = self.conn.execute("SELECT id, metadata, context FROM runs WHERE results_dir = ?",
+                                (self._key(results_dir),)).fetchone()
+        if run is None:
+            return None, None
+        metadata = json.loads(run["metadata"])
+        if run["context"] is None:
+            return None, metadata
+        benchmarks = [json.loads(row["data"]) for row in self.conn.execute(
+            "SELECT data FROM benchmarks WHERE run_id = ? ORDER BY position", (run["id"],))]
+        return {"context": json.loads(run["context"]), "benchmarks": benchmarks}, metadata
+
+    def get_metric_values(self, metric: str, benchmark_name: Filter = None, run_type: Optional[str] = None,
+                          **filters: Filter) -> List[Dict]:
+        """
+        Return one metric of the matching benchmarks across runs, e.g.
+        get_metric_values("cpu_time", benchmark_name="BM_IntAddition", compiler="gcc").
+
+        Args:
+            metric: Numeric benchmark field (real_time, cpu_time, iterations or a counter)
+            benchmark_name: Benchmark name(s) to include (default: all)
+            run_type: 'iteration' or 'aggregate' (default: both)
+            **filters: Run filters as in find_result_dirs()
+
+        Returns:
+            Rows with results_dir, experiment, compiler, build_flags, benchmark, aggregate_name,
+            time_unit and value, ordered by results directory and benchmark position.
+        """
+        clauses, params = self._filter_clauses(filters)
+        clauses.insert(0, "metrics.name = ?")
+        params.insert(0, metric)
+        if benchmark_name is not None:
+            names = [benchmark_name] if isinstance(benchmark_name, str) else list(benchmark_name)
+            clauses.append(f"benchmarks.name IN ({', '.join('?' * len(names))})")
+            params.extend(names)
+        if run_type is not None:
+            clauses.append("benchmarks.run_type = ?")
+            params.append(run_type)
+        rows = self.conn.execute(
+            "SELECT runs.results_dir, runs.experiment, runs.compiler, runs.build_flags, benchmarks.name AS benchmark, "
+            "benchmarks.aggregate_name, benchmarks.time_unit, metrics.value "
+            "FROM metrics JOIN benchmarks ON metrics.benchmark_id = benchmarks.id "
+            "JOIN runs ON benchmarks.run_id = runs.id "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY runs.results_dir, benchmarks.position",
+            params,
+        )
+        return [{**dict(row), "results_dir": self._path(row["results_dir"])} for row in rows]
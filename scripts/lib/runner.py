@@ -1,17 +1,36 @@
 # scripts/lib/runner.py
 
+import contextlib
+import json
 import subprocess
 import os
 import shutil
 import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from pathlib import Path
 from typing import Dict, Tuple, Optional, List # Added List
 
 from .logger import get_logger
 from .config import BenchEverythingConfig
-from .environment import extract_compiler_from_toolchain, get_compiler_version
-from .metadata import create_metadata_dict, save_metadata, load_metadata
+from .environment import (
+    extract_compiler_from_toolchain, get_compiler_version, get_detailed_compiler_id, get_detailed_platform_id,
+    set_probe_cache_dir
+)
+from .metadata import create_metadata_dict, save_metadata, load_metadata, generate_content_hash
 from .assembly import AssemblyExtractor
+from .assembly_cache import AssemblyCache
+from .dependencies import DependencyCache
+from .compiler_cache import CompilerCache, make_build_env
+from .checkpoint import (
+    BenchmarkCheckpoint, list_benchmark_families, get_chunk_filter, strip_benchmark_filter, summarize_perf_stat_log
+)
+from .affinity import CpuPinning, format_cpu_list
+from .annotate import PERF_DATA_FILE, ANNOTATED_DIR, load_perf_samples, write_annotated_assembly
+from .mca import MCA_SUFFIX, write_mca_analysis
+from .artifacts import compress_assembly_dir, remove_compressed_artifacts
+from .results_index import append_journal
+from .bench_frame import FRAME_FILE, save_benchmark_frame
 
 logger = get_logger()
 
@@ -27,11 +46,79 @@ class BenchmarkExecutionError(Exception):
 class BenchmarkRunner:
     """Handles building and running benchmarks."""
 
-    def __init__(self, config: BenchEverythingConfig):
+    def __init__(self, config: BenchEverythingConfig, clean_timing: bool = False, use_dependency_cache: bool = True,
+                 compiler_cache: Optional[str] = None, checkpoint: bool = False, pin_cores: Optional[str] = None,
+                 pin_in_hash: bool = False, postprocess_workers: int = 0, full_disassembly: bool = False,
+                 use_assembly_cache: bool = True, profile: bool = False, mca: bool = False,
+                 compress_artifacts: str = "none"):
         self.config = config
         self.project_root = config.get_project_root()
+        # Compiler '--version' probes are cached on disk, keyed by binary path and mtime
+        set_probe_cache_dir(config.get_cache_dir())
+        # When False (default), perf stat wraps the timed benchmark run so a single
+        # process produces both benchmark_output.json and perf_stat.log.
+        # When True, the benchmark is timed without perf and perf stat runs separately.
+        self.clean_timing = clean_timing
+        # Run benchmark families one at a time and keep partial results so that an
+        # interrupted run resumes with the missing families (see BenchmarkCheckpoint)
+        self.checkpoint = checkpoint
+        # Optional CPU pinning: benchmarks run on pin_cores, everything else on the remaining CPUs.
+        # Applied here, before any build threads exist, so that they inherit the orchestrator mask.
+        self.cpu_pinning = CpuPinning(pin_cores) if pin_cores else None
+        if self.cpu_pinning:
+            self.cpu_pinning.isolate_orchestrator()
+        # Include the pinned core set in the metadata hash (pinned and unpinned results kept apart)
+        self.pin_in_hash = pin_in_hash
+        # Background workers for assembly extraction and metadata saving, so the next experiment
+        # is measured while the previous one is post-processed (0 = inline, on the critical path)
+        self._postprocess_executor = ThreadPoolExecutor(max_workers=postprocess_workers, thread_name_prefix="postprocess") \
+            if postprocess_workers > 0 else None
+        # (experiment_name, compiler_name, build_flags_id) and the future of each queued post-processing
+        self._postprocess_futures: List[Tuple[Tuple[str, str, str], Future]] = []
+        # Also write the disassembly of the whole executable (default: benchmark symbols only)
+        self.full_disassembly = full_disassembly
+        # Sample the benchmark with perf record in an extra run and annotate the extracted assembly
+        self.profile = profile
+        # Predict the throughput of the innermost loops of each extracted function with llvm-mca
+        self.mca = mca
+        # Compress assembly snippets and dumps after post-processing ('none', 'gzip' or 'zstd')
+        self.compress_artifacts = compress_artifacts
+        # Extracted assembly shared between result directories with identical executables (see AssemblyCache)
+        self.assembly_cache = AssemblyCache(config.get_assembly_cache_dir()) if use_assembly_cache else None
+        # Shared Google Benchmark source checkout and prebuilt libraries (see DependencyCache)
+        self.dependency_cache = DependencyCache(config.get_dependency_cache_dir()) if use_dependency_cache else None
+        # Optional ccache/sccache launcher ('ccache', 'sccache' or 'auto')
+        self.compiler_cache = CompilerCache(compiler_cache) if compiler_cache and compiler_cache != "none" else None
+        # Per build directory information recorded in metadata.json (e.g. compiler cache statistics)
+        self.build_info: Dict[Path, Dict] = {}
+        # Compiler/platform detection shared by the build and run phases of every cell
+        self._compiler_info_cache: Dict[str, Dict] = {}
+        self._compiler_info_lock = threading.Lock()
+
+    def get_compiler_info(self, compiler_name: str, compiler_config: Dict) -> Dict:
+        """
+        Detect compiler path/type/version and the detailed platform/compiler IDs once per compiler.
+
+        The result is cached for the lifetime of the runner so that every
+        (compiler, build_flags) cell reuses the same detection.
+        """
+        with self._compiler_info_lock:
+            if compiler_name not in self._compiler_info_cache:
+                toolchain_path_rel = compiler_config.get('toolchain_file', '')
+                toolchain_path_abs = self.project_root / toolchain_path_rel if toolchain_path_rel else None
+                compiler_path, compiler_type = extract_compiler_from_toolchain(toolchain_path_abs)
+                compiler_version = get_compiler_version(compiler_path)
+                self._compiler_info_cache[compiler_name] = {
+                    "compiler_path": compiler_path,
+                    "compiler_type": compiler_type,
+                    "compiler_version": compiler_version,
+                    "detailed_compiler_id": get_detailed_compiler_id(
+                        compiler_config['name'], compiler_path, compiler_type, compiler_version
+                    ),
+                    "detailed_platform_id": get_detailed_platform_id(),
+                }
+            return self._compiler_info_cache[compiler_name]
 
-    # ... (keep _determine_build_params and build_experiment as they are) ...
     def _determine_build_params(self, build_flags_id: str) -> Tuple[str, str]:
         """Determine CMake build type and CXX flags from the build_flags_id."""
         # Defaults
@@ -70,9 +157,28 @@ class BenchmarkRunner:
                     f"CMake Type='{cmake_build_type}', CXX Flags='{cxx_flags}'")
         return cmake_build_type, cxx_flags
 
-    def build_experiment(self, compiler_name: str, build_flags_id: str, incremental: bool) -> Optional[Path]:
+    def _get_build_targets(self, experiments: Optional[List[str]]) -> List[str]:
+        """Return the CMake target names (benchmark_executable) for the given experiments."""
+        targets = []
+        for experiment_name in experiments or []:
+            exp_details = self.config.get_experiment_details(experiment_name)
+            executable_name = exp_details.get('benchmark_executable') if exp_details else None
+            if executable_name:
+                targets.append(executable_name)
+            else:
+                logger.warning(f"No 'benchmark_executable' for experiment '{experiment_name}', cannot select its build target.")
+        return targets
+
+    def build_experiment(self, compiler_name: str, build_flags_id: str, incremental: bool, jobs: Optional[int] = None,
+                         experiments: Optional[List[str]] = None) -> Optional[Path]:
         """
-        Configure and build all experiments for a given compiler and build flags.
+        Configure and build experiments for a given compiler and build flags.
+
+        Args:
+            jobs: Number of parallel build jobs passed to 'cmake --build --parallel'.
+                  None lets the native build tool decide.
+            experiments: Only build the benchmark targets of these experiments
+                         (plus their dependencies). None builds every target.
 
         Returns:
             The Path to the build directory if successful, None otherwise.
@@ -84,17 +190,11 @@ class BenchmarkRunner:
             logger.error(f"Compiler config for '{compiler_name}' not found.")
             return None
 
-        # Generate metadata first to get detailed IDs needed for paths
-        # Need to pass dummy values for hash/source generation, they aren't used for path determination here
+        # Determine detailed IDs needed for paths (detection is shared across cells)
         try:
-             # Pass dummy command base needed by create_metadata_dict
-            dummy_gbench_cmd_base = ["dummy_executable"]
-            metadata_template = create_metadata_dict(
-                self.config, "dummy_experiment", compiler_config, build_flags_id,
-                 "dummy_flags", "dummy_type", dummy_gbench_cmd_base
-            )
-            detailed_platform_id = metadata_template['detailed_platform_id']
-            detailed_compiler_id = metadata_template['detailed_compiler_id']
+            compiler_info = self.get_compiler_info(compiler_name, compiler_config)
+            detailed_platform_id = compiler_info['detailed_platform_id']
+            detailed_compiler_id = compiler_info['detailed_compiler_id']
         except Exception as e:
              logger.error(f"Failed to pre-determine platform/compiler IDs for build path: {e}", exc_info=True) # Add traceback
              # Fallback to simpler names if detailed ID generation fails
@@ -133,6 +233,22 @@ class BenchmarkRunner:
             f"-DCMAKE_BUILD_TYPE={cmake_build_type}",
             f"-DCMAKE_CXX_FLAGS={cxx_flags}"
         ]
+        if self.dependency_cache:
+            cmake_cmd += self.dependency_cache.get_cmake_args(detailed_compiler_id, toolchain_path, cmake_build_type, jobs)
+
+        # sccache statistics are server-wide, so those builds run one at a time
+        build_lock = self.compiler_cache.build_lock() if self.compiler_cache else contextlib.nullcontext()
+        with build_lock:
+            return self._configure_and_build(cmake_cmd, build_dir, compiler_name, build_flags_id, jobs, experiments)
+
+    def _configure_and_build(self, cmake_cmd: List[str], build_dir: Path, compiler_name: str, build_flags_id: str,
+                             jobs: Optional[int], experiments: Optional[List[str]]) -> Optional[Path]:
+        """Run CMake configure and build in build_dir, collecting compiler cache statistics."""
+        cache_state = {"env": {}}
+        if self.compiler_cache and self.compiler_cache.enabled:
+            cmake_cmd += self.compiler_cache.get_cmake_args()
+            cache_state = self.compiler_cache.prepare_build(build_dir)
+        build_env = make_build_env(cache_state["env"])
 
         # Add experiment-specific CMake flags (currently global, needs refinement if truly per-exp)
         # all_experiments = self.config.get_all_experiment_names()
@@ -144,7 +260,7 @@ class BenchmarkRunner:
         logger.info(f"Running CMake configure: {' '.join(cmake_cmd)}")
         try:
             # Capture output for better error reporting
-            result = subprocess.run(cmake_cmd, check=True, capture_output=True, text=True, cwd=build_dir, timeout=180)
+            result = subprocess.run(cmake_cmd, check=True, capture_output=True, text=True, cwd=build_dir, timeout=180, env=build_env)
             logger.debug(f"CMake Configure Output:\n{result.stdout[-1000:]}") # Log last 1k lines
             if result.stderr:
                  logger.warning(f"CMake Configure Stderr:\n{result.stderr[-1000:]}")
@@ -162,13 +278,26 @@ class BenchmarkRunner:
 
         # Run CMake build
         build_cmd = ["cmake", "--build", str(build_dir), "--parallel"] # Use parallel build
+        if jobs:
+            build_cmd.append(str(jobs))
+        build_targets = self._get_build_targets(experiments)
+        if experiments and len(build_targets) == len(experiments):
+            build_cmd += ["--target"] + build_targets
+        elif experiments:
+            logger.warning("Could not determine build targets for all requested experiments. Building all targets.")
         logger.info(f"Running CMake build: {' '.join(build_cmd)}")
         try:
-            result = subprocess.run(build_cmd, check=True, capture_output=True, text=True, cwd=build_dir, timeout=600) # 10 min timeout
+            result = subprocess.run(build_cmd, check=True, capture_output=True, text=True, cwd=build_dir, timeout=600, env=build_env) # 10 min timeout
             logger.debug(f"CMake Build Output:\n{result.stdout[-1000:]}")
             if result.stderr:
                  logger.warning(f"CMake Build Stderr:\n{result.stderr[-1000:]}")
             logger.info("Build completed successfully.")
+            if self.compiler_cache and self.compiler_cache.enabled:
+                cache_stats = self.compiler_cache.collect_stats(build_dir, cache_state)
+                self.build_info[build_dir] = {"compiler_cache": cache_stats}
+                if cache_stats:
+                    logger.info(f"Compiler cache ({cache_stats['tool']}): {cache_stats['hits']} hits, "
+                                f"{cache_stats['misses']} misses for {compiler_name} ({build_flags_id})")
             return build_dir
         except subprocess.CalledProcessError as e:
             logger.error(f"CMake build failed (return code {e.returncode})")
@@ -226,8 +355,21 @@ class BenchmarkRunner:
             try:
                 metadata = create_metadata_dict(
                     self.config, experiment_name, compiler_config, build_flags_id,
-                    cxx_flags_used, cmake_build_type, gbench_cmd_base
+                    cxx_flags_used, cmake_build_type, gbench_cmd_base,
+                    compiler_info=self.get_compiler_info(compiler_name, compiler_config),
+                    extra_hash_data=self._get_extra_hash_data()
                 )
+                if self.cpu_pinning and self.cpu_pinning.enabled:
+                    metadata['config']['cpu_affinity'] = self.cpu_pinning.to_metadata()
+                if build_dir in self.build_info:
+                    metadata['build'] = self.build_info[build_dir]
+                exp_config = self.config.load_experiment_config(experiment_name)
+                content_hash, content_hash_components = generate_content_hash(
+                    self.project_root / "experiments" / experiment_name, benchmark_exe_path,
+                    exp_config.get("gbench_args", "")
+                )
+                metadata['content_hash'] = content_hash
+                metadata['content_hash_components'] = content_hash_components
                 metadata_hash = metadata['metadata_hash']
                 detailed_platform_id = metadata['detailed_platform_id']
                 detailed_compiler_id = metadata['detailed_compiler_id']
@@ -244,9 +386,17 @@ class BenchmarkRunner:
                 logger.warning(f"Results directory already exists: {results_dir}")
                 existing_metadata = load_metadata(results_dir)
                 if existing_metadata and existing_metadata.get('metadata_hash') == metadata_hash:
+                     existing_components = existing_metadata.get('content_hash_components', {})
+                     if existing_metadata.get('content_hash') != content_hash:
+                          changed = [k for k, v in content_hash_components.items() if existing_components.get(k) != v]
+                          logger.info(f"Content changed since the last run ({', '.join(changed)}). Re-running.")
+                          # Proceed to run
+                     elif self.checkpoint and BenchmarkCheckpoint(results_dir, content_hash).is_pending():
+                          logger.info("Unfinished checkpoint found. Resuming the interrupted run.")
+                          # Proceed to run
                      # Check if essential output file also exists
-                     if (results_dir / "benchmark_output.json").exists():
-                          logger.info("Valid results exist and metadata hash matches. Skipping run.")
+                     elif (results_dir / "benchmark_output.json").exists():
+                          logger.info("Valid results exist and metadata and content hashes match. Skipping run.")
                           return results_dir, "SKIPPED" # <<< Explicitly return SKIPPED status
                      else:
                           logger.warning("Metadata matches, but benchmark output missing. Overwriting.")
@@ -261,14 +411,39 @@ class BenchmarkRunner:
 
             benchmark_output_file = results_dir / "benchmark_output.json"
 
-            exp_config = self.config.load_experiment_config(experiment_name)
             gbench_args = exp_config.get("gbench_args", "").split()
 
             json_benchmark_cmd = [str(benchmark_exe_path), "--benchmark_format=json", f"--benchmark_out={benchmark_output_file}"] + gbench_args
 
-            # Run JSON output command
-            logger.info(f"Running benchmark (JSON): {' '.join(json_benchmark_cmd)}")
-            result_json = subprocess.run(json_benchmark_cmd, check=True, capture_output=True, text=True, cwd=results_dir, timeout=600)
+            # --- Run Benchmark (with perf stat on Linux) ---
+            perf_cmd_prefix = None
+            if platform.system() == "Linux":
+                perf_cmd_prefix = self._get_perf_stat_prefix(results_dir, exp_config)
+            else:
+                logger.info("Skipping perf stat (not on Linux).")
+
+            if perf_cmd_prefix and not self.clean_timing:
+                # Combined mode: one process under perf stat produces both outputs
+                metadata['config']['perf_stat_mode'] = "combined"
+            else:
+                metadata['config']['perf_stat_mode'] = "separate" if perf_cmd_prefix else "disabled"
+
+            families = list_benchmark_families(benchmark_exe_path, gbench_args) if self.checkpoint else {}
+            if self.checkpoint and not families:
+                logger.warning("Could not determine benchmark families. Running without checkpoints.")
+
+            if families:
+                result_json = self._run_benchmark_checkpointed(
+                    families, benchmark_exe_path, gbench_args, results_dir, content_hash,
+                    perf_cmd_prefix, force, metadata
+                )
+            elif metadata['config']['perf_stat_mode'] == "combined":
+                result_json, metadata['config']['perf_stat_mode'] = self._run_benchmark_with_perf_stat(
+                    perf_cmd_prefix, json_benchmark_cmd, results_dir
+                )
+            else:
+                logger.info(f"Running benchmark (JSON): {' '.join(json_benchmark_cmd)}")
+                result_json = subprocess.run(self._pin_command(json_benchmark_cmd), check=True, capture_output=True, text=True, cwd=results_dir, timeout=600)
 
             # Check if JSON file was actually created and is not empty
             if not benchmark_output_file.exists() or benchmark_output_file.stat().st_size == 0:
@@ -277,24 +452,29 @@ class BenchmarkRunner:
                  logger.error(f"Benchmark stderr:\n{result_json.stderr}")
                  raise BenchmarkExecutionError("Benchmark JSON output file empty/missing.")
 
-            # --- Run Perf Stat (Linux only) ---
-            if platform.system() == "Linux":
-                self._run_perf_stat(results_dir, json_benchmark_cmd, exp_config)
-            else:
-                logger.info("Skipping perf stat (not on Linux).")
+            # Clean timing mode: collect counters in a second, untimed execution
+            if perf_cmd_prefix and self.clean_timing:
+                self._run_perf_stat(perf_cmd_prefix, json_benchmark_cmd, results_dir)
 
-            # --- Extract Assembly ---
-            try:
-                 extractor = AssemblyExtractor(build_dir, experiment_name, benchmark_executable_name, self.project_root)
-                 extractor.extract_assembly(results_dir, build_flags_id)
-            except Exception as e:
-                 logger.error(f"Assembly extraction failed: {e}", exc_info=True)
-                 # Continue without assembly
+            # Profiling: sample the benchmark in one more, untimed execution (annotated during post-processing)
+            (results_dir / PERF_DATA_FILE).unlink(missing_ok=True)
+            if self.profile:
+                if platform.system() == "Linux":
+                    self._run_perf_record([str(benchmark_exe_path)] + gbench_args, results_dir)
+                else:
+                    logger.info("Skipping perf record (not on Linux).")
 
-            # --- Save Metadata ---
-            if not save_metadata(metadata, results_dir):
-                logger.error("Failed to save metadata file.")
-                # Continue but maybe log a higher severity warning?
+            # --- Extract Assembly & Save Metadata ---
+            if self._postprocess_executor:
+                future = self._postprocess_executor.submit(
+                    self._postprocess_results, build_dir, experiment_name, benchmark_executable_name,
+                    build_flags_id, results_dir, metadata
+                )
+                self._postprocess_futures.append(((experiment_name, compiler_name, build_flags_id), future))
+                logger.info(f"Post-processing of {experiment_name} queued in the background.")
+            elif not self._postprocess_results(build_dir, experiment_name, benchmark_executable_name,
+                                               build_flags_id, results_dir, metadata):
+                raise BenchmarkExecutionError(f"Post-processing failed for {experiment_name}; results are incomplete.")
 
             logger.info(f"--- Experiment {experiment_name} completed successfully. Results: {results_dir} ---")
             status = "RAN" # <<< Explicitly set RAN status on success
@@ -322,12 +502,210 @@ class BenchmarkRunner:
         return results_dir, status # results_dir might be None here
 
 
-    def _run_perf_stat(self, results_dir: Path, benchmark_cmd: list, exp_config: Dict):
-        """Run perf stat for the benchmark command."""
+    def _postprocess_results(self, build_dir: Path, experiment_name: str, benchmark_executable_name: str,
+                             build_flags_id: str, results_dir: Path, metadata: Dict) -> bool:
+        """
+        Extract assembly and save metadata.json for a finished run.
+
+        metadata.json is written last, so an interrupted post-processing step leaves the
+        results incomplete and the experiment is re-run next time.
+
+        Returns:
+            True if the metadata was saved.
+        """
+        # --- Extract Assembly ---
+        try:
+             extractor = AssemblyExtractor(build_dir, experiment_name, benchmark_executable_name, self.project_root,
+                                           full_dump=self.full_disassembly, cache=self.assembly_cache,
+                                           content_components=metadata.get('content_hash_components'))
+             extractor.extract_assembly(results_dir, build_flags_id)
+        except Exception as e:
+             logger.error(f"Assembly extraction failed: {e}", exc_info=True)
+             # Continue without assembly
+
+        # --- Annotate Assembly with Profile Samples ---
+        shutil.rmtree(results_dir / "assembly" / ANNOTATED_DIR, ignore_errors=True)
+        perf_data = results_dir / PERF_DATA_FILE
+        if perf_data.exists():
+            try:
+                self._annotate_assembly(perf_data, build_dir / "experiments" / experiment_name / benchmark_executable_name,
+                                        results_dir, metadata)
+            except Exception as e:
+                logger.error(f"Assembly annotation failed: {e}", exc_info=True)
+            finally:
+                perf_data.unlink(missing_ok=True) # Large binary file, only the annotations are kept
+
+        # --- Static Throughput Analysis of Hot Loops ---
+        for stale_file in (results_dir / "assembly").glob(f"*{MCA_SUFFIX}"):
+            stale_file.unlink()
+        if self.mca:
+            try:
+                analyzed = write_mca_analysis(results_dir / "assembly")
+                if analyzed is not None:
+                    metadata['config']['mca'] = {"analyzed_functions": analyzed}
+                    logger.info(f"llvm-mca analysis written for {analyzed} function(s).")
+            except Exception as e:
+                logger.error(f"llvm-mca analysis failed: {e}", exc_info=True)
+
+        # --- Compress Artifacts (last, as the steps above read the plain .s files) ---
+        remove_compressed_artifacts(results_dir / "assembly")
+        if self.compress_artifacts != "none" and (results_dir / "assembly").is_dir():
+            compression = compress_assembly_dir(results_dir / "assembly", self.compress_artifacts)
+            if compression:
+                metadata['config']['artifact_compression'] = compression
+                logger.info(f"Compressed assembly artifacts with {compression['compression']}: "
+                            f"{compression['original_bytes']} -> {compression['compressed_bytes']} bytes")
+
+        # --- Export Columnar Benchmark Frame (read by the comparison reports) ---
+        (results_dir / FRAME_FILE).unlink(missing_ok=True)
+        try:
+            with open(results_dir / "benchmark_output.json", 'r') as f:
+                save_benchmark_frame(results_dir, json.load(f))
+        except Exception as e:
+            logger.warning(f"Could not export benchmark frame: {e}")
+
+        # --- Save Metadata ---
+        if not save_metadata(metadata, results_dir):
+            logger.error("Failed to save metadata file.")
+            return False
+        # Announce the finished run to the results index (generate_report.py reads only new journal lines)
+        append_journal(self.config.get_results_root_dir(), results_dir)
+        return True
+
+    def wait_for_postprocessing(self) -> List[Tuple[str, str, str]]:
+        """
+        Wait for all queued background post-processing to finish.
+
+        Returns:
+            (experiment_name, compiler_name, build_flags_id) of every experiment whose
+            post-processing failed. These experiments were reported as RAN by run_experiment().
+        """
+        failures = []
+        if self._postprocess_futures:
+            logger.info(f"Waiting for post-processing of {len(self._postprocess_futures)} experiment(s)...")
+        for task, future in self._postprocess_futures:
+            try:
+                if not future.result():
+                    failures.append(task)
+            except Exception as e:
+                experiment_name, compiler_name, build_flags_id = task
+                logger.error(f"Post-processing failed for {experiment_name} ({compiler_name}, {build_flags_id}): {e}",
+                             exc_info=True)
+                failures.append(task)
+        self._postprocess_futures = []
+        return failures
+
+    def _run_benchmark_checkpointed(self, families: Dict[str, List[str]], benchmark_exe_path: Path, gbench_args: List[str],
+                                    results_dir: Path, content_hash: str, perf_cmd_prefix: Optional[List[str]],
+                                    force: bool, metadata: Dict) -> subprocess.CompletedProcess:
+        """
+        Run the benchmark one family at a time via --benchmark_filter.
+
+        families maps each family to its benchmark instances (as listed with the user's
+        gbench_args); each chunk filter names these instances exactly. Each family's JSON output is persisted in <results_dir>/.partial as soon as it
+        completes, and families finished by an earlier, interrupted attempt are skipped.
+        The chunks are merged into benchmark_output.json at the end.
+        """
+        benchmark_output_file = results_dir / "benchmark_output.json"
+        checkpoint = BenchmarkCheckpoint(results_dir, content_hash)
+        completed = checkpoint.load(reset=force)
+        if completed:
+            logger.info(f"Resuming from checkpoint: {len(completed)}/{len(families)} benchmark families already completed.")
+        else:
+            # Fresh start: drop counters appended by an earlier, discarded attempt
+            (results_dir / "perf_stat.log").unlink(missing_ok=True)
+
+        # In combined mode every chunk appends its counters to the same perf_stat.log
+        chunk_perf_prefix = None
+        if perf_cmd_prefix and not self.clean_timing:
+            chunk_perf_prefix = perf_cmd_prefix[:2] + ["--append"] + perf_cmd_prefix[2:]
+
+        # The user's filter is already applied to the instance lists (the last filter given wins)
+        chunk_args = strip_benchmark_filter(gbench_args)
+        result = subprocess.CompletedProcess(args=[str(benchmark_exe_path)], returncode=0, stdout="", stderr="")
+        for index, (family, names) in enumerate(families.items()):
+            if family in completed:
+                continue
+            chunk_path = checkpoint.get_chunk_path(index)
+            chunk_cmd = [str(benchmark_exe_path), "--benchmark_format=json", f"--benchmark_out={chunk_path}"] + \
+                        chunk_args + [f"--benchmark_filter={get_chunk_filter(names)}"]
+            logger.info(f"Running benchmark family {index + 1}/{len(families)}: {family}")
+            if chunk_perf_prefix:
+                result, perf_stat_mode = self._run_benchmark_with_perf_stat(chunk_perf_prefix, chunk_cmd, results_dir)
+                if perf_stat_mode != "combined":
+                    # perf failed and its log was removed: run the remaining families without it
+                    chunk_perf_prefix = None
+                    metadata['config']['perf_stat_mode'] = perf_stat_mode
+            else:
+                logger.info(f"Running benchmark (JSON): {' '.join(chunk_cmd)}")
+                result = subprocess.run(self._pin_command(chunk_cmd), check=True, capture_output=True, text=True, cwd=results_dir, timeout=600)
+
+            if not chunk_path.exists() or chunk_path.stat().st_size == 0:
+                logger.error(f"Benchmark stdout:\n{result.stdout}")
+                logger.error(f"Benchmark stderr:\n{result.stderr}")
+                raise BenchmarkExecutionError(f"Benchmark family '{family}' produced no JSON output.")
+            checkpoint.mark_complete(family, chunk_path)
+
+        if not checkpoint.merge(list(families), benchmark_output_file):
+            raise BenchmarkExecutionError("Failed to merge checkpointed benchmark output.")
+        checkpoint.clear()
+        if chunk_perf_prefix:
+            blocks = summarize_perf_stat_log(results_dir / "perf_stat.log")
+            metadata['config']['perf_stat_blocks'] = blocks
+        metadata['config']['checkpoint'] = {"families": len(families), "resumed_families": len(completed)}
+        return result
+
+    def _run_perf_record(self, benchmark_cmd: List[str], results_dir: Path):
+        """Sample the benchmark with perf record into <results_dir>/perf.data (separate, untimed execution)."""
         perf_path = shutil.which("perf")
         if not perf_path:
-            logger.warning("perf command not found, skipping performance counters.")
+            logger.warning("perf command not found, skipping profiling.")
+            return
+        perf_cmd = [perf_path, "record", "-q", "-o", str(results_dir / PERF_DATA_FILE), "--"] + benchmark_cmd
+
+        logger.info(f"Running perf record: {' '.join(perf_cmd)}")
+        try:
+            subprocess.run(self._pin_command(perf_cmd), check=True, capture_output=True, text=True, cwd=results_dir, timeout=900)
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"Perf record failed (return code {e.returncode}). Skipping annotation.")
+            if e.stderr: logger.warning(f"Perf stderr:\n{e.stderr[:1000]}...")
+            (results_dir / PERF_DATA_FILE).unlink(missing_ok=True)
+        except subprocess.TimeoutExpired:
+            logger.warning("Perf record command timed out.")
+            (results_dir / PERF_DATA_FILE).unlink(missing_ok=True)
+        except Exception as e: logger.warning(f"Error running perf record: {e}")
+
+    def _annotate_assembly(self, perf_data: Path, benchmark_exe_path: Path, results_dir: Path, metadata: Dict):
+        """Map perf record samples onto the extracted functions and write assembly/annotated/*.s."""
+        assembly_dir = results_dir / "assembly"
+        if not any(assembly_dir.glob("*.s")):
+            logger.warning("No extracted assembly to annotate.")
             return
+        loaded = load_perf_samples(perf_data, benchmark_exe_path)
+        if loaded is None:
+            return
+        samples, total_samples = loaded
+        function_samples = write_annotated_assembly(assembly_dir, samples, total_samples)
+        metadata['config']['profile'] = {"total_samples": total_samples, "function_samples": function_samples}
+        logger.info(f"Annotated assembly of {len(function_samples)} function(s) with {total_samples} samples: "
+                    f"{assembly_dir / ANNOTATED_DIR}")
+
+    def _get_extra_hash_data(self) -> Optional[Dict]:
+        """Run options that are part of the metadata hash (currently the pinned core set with --pin-in-hash)."""
+        if self.pin_in_hash and self.cpu_pinning and self.cpu_pinning.enabled:
+            return {"pinned_cpus": format_cpu_list(self.cpu_pinning.benchmark_cpus)}
+        return None
+
+    def _pin_command(self, cmd: List[str]) -> List[str]:
+        """The command line of a benchmark execution, wrapped in taskset when CPU pinning is on."""
+        return self.cpu_pinning.pin_command(cmd) if self.cpu_pinning else cmd
+
+    def _get_perf_stat_prefix(self, results_dir: Path, exp_config: Dict) -> Optional[List[str]]:
+        """Build the 'perf stat ... --' command prefix, or None if perf is unavailable."""
+        perf_path = shutil.which("perf")
+        if not perf_path:
+            logger.warning("perf command not found, skipping performance counters.")
+            return None
 
         perf_stat_file = results_dir / "perf_stat.log"
         perf_events = "cycles,instructions,cache-references,cache-misses,branch-instructions,branch-misses"
@@ -336,15 +714,47 @@ class BenchmarkRunner:
              elif isinstance(exp_config["perf_events"], str): perf_events = exp_config["perf_events"]
              logger.info(f"Using custom perf events: {perf_events}")
 
-        perf_cmd = [perf_path, "stat", "-o", str(perf_stat_file), "-e", perf_events, "--"] + benchmark_cmd
+        return [perf_path, "stat", "-o", str(perf_stat_file), "-e", perf_events, "--"]
+
+    def _run_benchmark_with_perf_stat(self, perf_cmd_prefix: List[str], benchmark_cmd: list,
+                                      results_dir: Path) -> Tuple[subprocess.CompletedProcess, str]:
+        """
+        Run the benchmark once under perf stat, producing both the JSON output and perf_stat.log.
+
+        Returns:
+            The completed process and the perf stat mode actually used: "combined", or
+            "disabled" if perf failed and the benchmark was re-run without it.
+        """
+        perf_cmd = perf_cmd_prefix + benchmark_cmd
+        logger.info(f"Running benchmark under perf stat (combined): {' '.join(perf_cmd)}")
+        try:
+            result = subprocess.run(self._pin_command(perf_cmd), check=True, capture_output=True, text=True, cwd=results_dir, timeout=900)
+            logger.info(f"Performance counters collected with perf stat, saved to {results_dir / 'perf_stat.log'}")
+            return result, "combined"
+        except subprocess.CalledProcessError as e:
+            # perf itself may fail (e.g. perf_event_paranoid); retry without it so a
+            # genuine benchmark failure is still reported by the plain run below.
+            logger.warning(f"Benchmark under perf stat failed (return code {e.returncode}). Retrying without perf.")
+            if e.stderr: logger.warning(f"Perf stderr:\n{e.stderr[:1000]}...")
+        # Counters of the failed run must not end up in the report
+        (results_dir / "perf_stat.log").unlink(missing_ok=True)
+
+        logger.info(f"Running benchmark (JSON): {' '.join(benchmark_cmd)}")
+        result = subprocess.run(self._pin_command(benchmark_cmd), check=True, capture_output=True, text=True, cwd=results_dir, timeout=600)
+        return result, "disabled"
+
+    def _run_perf_stat(self, perf_cmd_prefix: List[str], benchmark_cmd: list, results_dir: Path):
+        """Run perf stat for the benchmark command as a separate execution."""
+        perf_stat_file = results_dir / "perf_stat.log"
+        perf_cmd = perf_cmd_prefix + benchmark_cmd
 
         logger.info(f"Running perf stat: {' '.join(perf_cmd)}")
         try:
-            subprocess.run(perf_cmd, check=True, capture_output=True, text=True, cwd=results_dir, timeout=900)
+            subprocess.run(self._pin_command(perf_cmd), check=True, capture_output=True, text=True, cwd=results_dir, timeout=900)
             logger.info(f"Performance counters collected with perf stat, saved to {perf_stat_file}")
         except subprocess.CalledProcessError as e:
             logger.warning(f"Perf stat failed (return code {e.returncode}). Check {perf_stat_file} for details.")
             if e.stderr: logger.warning(f"Perf stderr:\n{e.stderr[:1000]}...")
         except FileNotFoundError: logger.warning("perf command not found during execution.")
         except subprocess.TimeoutExpired: logger.warning("Perf stat command timed out.")
-        except Exception as e: logger.warning(f"Error running perf stat: {e}")
\ No newline at end of file
+        except Exception as e: logger.warning(f"Error running perf stat: {e}")
@@ -0,0 +1,80 @@
+# scripts/lib/scheduler.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .logger import get_logger
+from .runner import BenchmarkRunner, BuildError
+
+logger = get_logger()
+
+# A build cell is one (compiler_name, build_flags_id) combination
+BuildCell = Tuple[str, str]
+
+
+class BuildScheduler:
+    """
+    Configures and builds several (compiler, build_flags) combinations concurrently.
+
+    Builds share a global job budget: each concurrent build gets an equal share of
+    it for 'cmake --build --parallel'. Benchmark measurement is not scheduled here
+    and stays serialized in the caller, after all builds have finished.
+    """
+
+    def __init__(self, runner: BenchmarkRunner, max_jobs: Optional[int] = None, max_concurrent_builds: Optional[int] = None):
+        self.runner = runner
+        self.max_jobs = max(1, max_jobs or os.cpu_count() or 1)
+        self.max_concurrent_builds = max_concurrent_builds
+
+    def _plan_workers(self, num_cells: int) -> Tuple[int, int]:
+        """Return (concurrent builds, jobs per build) for the given number of cells."""
+        workers = min(num_cells, self.max_jobs)
+        if self.max_concurrent_builds:
+            workers = min(workers, self.max_concurrent_builds)
+        compiler_cache = self.runner.compiler_cache
+        if compiler_cache and compiler_cache.enabled and compiler_cache.serializes_builds:
+            workers = 1 # Builds would only queue on the cache's build lock; give one build the whole budget
+        workers = max(1, workers)
+        jobs_per_build = max(1, self.max_jobs // workers)
+        return workers, jobs_per_build
+
+    def _build_cell(self, cell: BuildCell, incremental: bool, jobs: int, experiments: Optional[List[str]]) -> Optional[Path]:
+        """Build one cell, converting build errors into a None result."""
+        compiler_name, build_flags_id = cell
+        try:
+            return self.runner.build_experiment(compiler_name, build_flags_id, incremental, jobs=jobs, experiments=experiments)
+        except BuildError as build_err:
+            logger.error(f"Build error encountered for {compiler_name} ({build_flags_id}): {build_err}")
+        except Exception as e:
+            logger.error(f"Unexpected error building {compiler_name} ({build_flags_id}): {e}", exc_info=True)
+        return None
+
+    def build_all(self, cells: List[BuildCell], incremental: bool, experiments: Optional[List[str]] = None) -> Dict[BuildCell, Optional[Path]]:
+        """
+        Build every cell and wait for all of them to finish.
+
+        Args:
+            experiments: Restrict each build to these experiments' targets (None builds everything).
+
+        Returns:
+            Dict mapping each cell to its build directory, or None if its build failed.
+        """
+        results: Dict[BuildCell, Optional[Path]] = {}
+        if not cells:
+            return results
+
+        workers, jobs_per_build = self._plan_workers(len(cells))
+        logger.info(f"Scheduling {len(cells)} build(s): {workers} concurrent, "
+                    f"{jobs_per_build} job(s) each (budget: {self.max_jobs} jobs)")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="build") as executor:
+            futures = {executor.submit(self._build_cell, cell, incremental, jobs_per_build, experiments): cell for cell in cells}
+            for future in as_completed(futures):
+                cell = futures[future]
+                results[cell] = future.result()
+                status = "done" if results[cell] else "FAILED"
+                logger.info(f"Build {status}: {cell[0]} ({cell[1]}) [{len(results)}/{len(cells)}]")
+
+        return results
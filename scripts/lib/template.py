@@ -1,11 +1,13 @@
 import re
 import json
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Mapping, Optional, List
 
 from .logger import get_logger
+from .data_loader import read_assembly_text
 from .report_utils import (
-     create_gbench_table, create_metadata_table, create_assembly_links_section,
+     create_gbench_table, create_metadata_table, create_assembly_links_section, create_instruction_mix_table,
+     create_mca_summary_table,
      format_path_for_markdown
 )
 
@@ -30,14 +32,14 @@ class TemplateRenderer:
             logger.error(f"Error reading template file {self.template_path}: {e}")
             return None
 
-    def render(self, context: Dict, report_dir: Path, project_root: Path) -> Optional[str]:
+    def render(self, context: Mapping, report_dir: Path, project_root: Path) -> Optional[str]:
         """
         Replace placeholders in the template with data from the context.
 
         Args:
-            context: Dictionary containing data for placeholders. Expected keys:
+            context: Mapping containing data for placeholders (a dict, or a lazy RunContext). Expected keys:
                      'gbench_data', 'metadata', 'perf_log', 'assembly_files' (dict path),
-                     'experiment_name', etc.
+                     'annotated_assembly_files' (dict path), 'instruction_mix', 'mca_analysis', 'experiment_name', etc.
             report_dir: The directory where the report.md file will be saved.
             project_root: The root directory of the project.
 
@@ -78,9 +80,19 @@ class TemplateRenderer:
              asm_links_section = create_assembly_links_section(assembly_files, report_dir)
              content = content.replace('{{ASSEMBLY_LINKS}}', asm_links_section)
 
+        if '{{INSTRUCTION_MIX}}' in content:
+             instruction_mix_table = create_instruction_mix_table(context.get('instruction_mix', {}))
+             content = content.replace('{{INSTRUCTION_MIX}}', instruction_mix_table)
+
+        if '{{MCA_SUMMARY}}' in content:
+             mca_summary = create_mca_summary_table(context.get('mca_analysis', {}), context.get('gbench_data'))
+             content = content.replace('{{MCA_SUMMARY}}', mca_summary)
+
         # --- Specific Metadata Placeholders: {{METADATA:field.subfield}} ---
-        metadata = context.get('metadata', {})
-        for match in re.finditer(r'\{\{METADATA:([^}]+)\}\}', content):
+        # Context fields are looked up only for placeholders present in the template (see RunContext)
+        metadata_matches = list(re.finditer(r'\{\{METADATA:([^}]+)\}\}', content))
+        metadata = context.get('metadata', {}) if metadata_matches else {}
+        for match in metadata_matches:
             key_path = match.group(1)
             value = metadata
             try:
@@ -95,16 +107,21 @@ class TemplateRenderer:
                 logger.warning(f"Error resolving metadata placeholder {match.group(0)}: {e}")
                 content = content.replace(match.group(0), f"[Error: {key_path}]")
 
-        # --- Specific Assembly Placeholders: {{ASSEMBLY:FunctionName}} ---
-        assembly_files = context.get('assembly_files', {})
-        for match in re.finditer(r'\{\{ASSEMBLY:([^}]+)\}\}', content):
-             func_name = match.group(1)
+        # --- Specific Assembly Placeholders: {{ASSEMBLY:FunctionName}}, {{ASSEMBLY_ANNOTATED:FunctionName}} ---
+        # The annotated view (per-instruction perf record samples) falls back to the plain assembly
+        assembly_matches = list(re.finditer(r'\{\{ASSEMBLY(_ANNOTATED)?:([^}]+)\}\}', content))
+        assembly_files = context.get('assembly_files', {}) if assembly_matches else {}
+        if any(match.group(1) for match in assembly_matches):
+             annotated_assembly_files = context.get('annotated_assembly_files', {})
+        for match in assembly_matches:
+             func_name = match.group(2)
              asm_path = assembly_files.get(func_name)
+             if match.group(1):
+                  asm_path = annotated_assembly_files.get(func_name, asm_path)
              asm_content = f"[Assembly for {func_name} not found]"
              if asm_path and asm_path.exists():
                   try:
-                       with open(asm_path, 'r', encoding='utf-8') as f:
-                            asm_content = f.read()
+                       asm_content = read_assembly_text(asm_path) # Decompresses .gz/.zst snippets
                   except Exception as e:
                        logger.error(f"Error reading assembly file {asm_path}: {e}")
                        asm_content = f"[Error reading assembly for {func_name}]"
@@ -3,6 +3,7 @@
 #!/usr/bin/env python3
 
 import argparse
+import fnmatch
 import sys
 import traceback
 from pathlib import Path
@@ -13,13 +14,34 @@ sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from lib.logger import setup_logger, get_logger
 from lib.config import BenchEverythingConfig
-from lib.runner import BenchmarkRunner, BuildError, BenchmarkExecutionError
+from lib.runner import BenchmarkRunner, BenchmarkExecutionError
+from lib.scheduler import BuildScheduler
 # lib.metadata import load_metadata # No longer needed here
 
 # Setup logger first
 setup_logger()
 logger = get_logger()
 
+def expand_build_flags(build_flags_arg: str, known_build_flags: list) -> list:
+    """
+    Expand a comma-separated list of build flag IDs and glob patterns (e.g. 'Rel*,Debug_O0').
+
+    Plain IDs are used as given; patterns are matched against the known build flag IDs
+    from the configuration. Order is preserved and duplicates are removed.
+    """
+    expanded = []
+    for item in [part.strip() for part in build_flags_arg.split(',') if part.strip()]:
+        if any(c in item for c in '*?['):
+            matches = [flag_id for flag_id in known_build_flags if fnmatch.fnmatchcase(flag_id, item)]
+            if not matches:
+                logger.warning(f"Build flags pattern '{item}' did not match any known build flag ID "
+                               f"({', '.join(known_build_flags)}). Skipping.")
+            expanded.extend(matches)
+        else:
+            expanded.append(item)
+    return list(dict.fromkeys(expanded))
+
+
 def main():
     """Main function to run benchmarks."""
     parser = argparse.ArgumentParser(description='Build and run benchmarks, collect results.')
@@ -30,18 +52,71 @@ def main():
     parser.add_argument('--experiments',
                         help='Comma-separated list of experiment names (from config) to run (default: all)')
     parser.add_argument('--build-flags', default='Release_O3',
-                        help='Build flags identifier (e.g., Release_O3, Debug_O0, RelWithDebInfo_O2_native)')
+                        help='Comma-separated list of build flags identifiers and/or glob patterns over the '
+                             'configured IDs (e.g., Release_O3, Debug_O0,Release_O3, "Rel*") (default: Release_O3)')
     parser.add_argument('--force', action='store_true',
                         help='Force re-run of benchmarks even if results exist')
     parser.add_argument('--incremental-build', action='store_true',
                         help='Use incremental build (faster for development, potentially less reproducible)')
+    parser.add_argument('--jobs', type=int,
+                        help='Global job budget shared by concurrent builds (default: number of CPUs)')
+    parser.add_argument('--max-parallel-builds', type=int,
+                        help='Maximum number of (compiler, build flags) builds to run at once (default: all)')
+    parser.add_argument('--no-dep-cache', action='store_true',
+                        help='Do not use the shared Google Benchmark cache in .cache/deps; '
+                             'let every build directory fetch and build it')
+    parser.add_argument('--compiler-cache', choices=['none', 'auto', 'ccache', 'sccache'], default='none',
+                        help='Compile through ccache/sccache and record hit/miss statistics in metadata.json '
+                             '(default: none; auto picks the first one found)')
+    parser.add_argument('--clean-timing', action='store_true',
+                        help='Time the benchmark without perf and collect perf stat counters in a separate run '
+                             '(default: a single run under perf stat produces both, Linux only)')
+    parser.add_argument('--checkpoint', action='store_true',
+                        help='Run benchmark families one at a time and keep partial results, so an interrupted '
+                             'or timed-out run resumes with the missing families')
+    parser.add_argument('--full-disassembly', action='store_true',
+                        help='Also disassemble the whole executable into assembly/full_*.txt '
+                             '(default: only the benchmark symbols are disassembled)')
+    parser.add_argument('--no-assembly-cache', action='store_true',
+                        help='Always re-extract assembly instead of reusing .cache/assembly for identical executables')
+    parser.add_argument('--profile', action='store_true',
+                        help='Sample each benchmark with perf record in an extra run and write assembly annotated '
+                             'with per-instruction sample percentages to assembly/annotated (Linux only)')
+    parser.add_argument('--mca', action='store_true',
+                        help='Predict cycles/iteration and bottleneck ports of the innermost loop of each benchmark '
+                             'function with llvm-mca for the host CPU (requires llvm-mca)')
+    parser.add_argument('--compress-artifacts', choices=['none', 'gzip', 'zstd'], default='none',
+                        help='Compress assembly snippets and disassembly dumps in the results directory '
+                             '(default: none; zstd requires the zstandard package, else gzip is used)')
+    parser.add_argument('--pin-cores',
+                        help='Pin benchmark processes to these CPUs (taskset syntax, e.g. "2,3" or "4-7") and keep '
+                             'the orchestrator and builds on the remaining CPUs (Linux only)')
+    parser.add_argument('--postprocess-workers', type=int, default=0,
+                        help='Extract assembly and save metadata in N background workers while the next experiment '
+                             'runs (default: 0, inline). Best combined with --pin-cores')
+    parser.add_argument('--pin-in-hash', action='store_true',
+                        help='Include the pinned CPU set in the metadata hash, keeping pinned results separate')
     args = parser.parse_args()
 
     try:
         # --- Initialization ---
         logger.info("--- Starting Benchmark Run ---")
         config = BenchEverythingConfig(config_file=args.config)
-        runner = BenchmarkRunner(config)
+        runner = BenchmarkRunner(
+            config,
+            clean_timing=args.clean_timing,
+            use_dependency_cache=not args.no_dep_cache,
+            compiler_cache=args.compiler_cache,
+            checkpoint=args.checkpoint,
+            pin_cores=args.pin_cores,
+            pin_in_hash=args.pin_in_hash,
+            postprocess_workers=args.postprocess_workers,
+            full_disassembly=args.full_disassembly,
+            use_assembly_cache=not args.no_assembly_cache,
+            profile=args.profile,
+            mca=args.mca,
+            compress_artifacts=args.compress_artifacts
+        )
 
         # --- Determine Compilers ---
         all_compiler_configs = config.get_all_compiler_configs()
@@ -87,38 +162,55 @@ def main():
             target_experiments = all_experiment_names
             logger.info("Running all configured experiments.")
 
+        # --- Determine Build Flags ---
+        target_build_flags = expand_build_flags(args.build_flags, config.get_build_flag_ids())
+        if not target_build_flags:
+            logger.error(f"No build flags selected by '{args.build_flags}'.")
+            sys.exit(1)
+
+        # --- Plan the Run Matrix ---
+        build_cells = [(compiler_config['name'], build_flags_id)
+                       for compiler_config in target_compilers
+                       for build_flags_id in target_build_flags]
+        total_tasks_planned = len(build_cells) * len(target_experiments)
+
+        logger.info("\n--- Run Plan ---")
+        logger.info(f"Compilers:   {', '.join(cfg['name'] for cfg in target_compilers)}")
+        logger.info(f"Build flags: {', '.join(target_build_flags)}")
+        logger.info(f"Experiments: {', '.join(target_experiments)}")
+        for cell_num, (compiler_name, build_flags_id) in enumerate(build_cells, start=1):
+            logger.info(f"  [{cell_num}/{len(build_cells)}] {compiler_name} / {build_flags_id}: {len(target_experiments)} experiment(s)")
+        logger.info(f"Total tasks planned: {total_tasks_planned}")
+        logger.info("----------------")
+
         # --- Build and Run ---
         run_summary = {'success': 0, 'fail_build': 0, 'fail_run': 0, 'skipped': 0} # Removed 'total' here
+        cell_summaries = {cell: dict(run_summary) for cell in build_cells}
         tasks_processed = 0 # Track tasks actually processed
-        total_tasks_planned = len(target_compilers) * len(target_experiments)
-        logger.info(f"Planning to run {len(target_experiments)} experiments across {len(target_compilers)} compilers "
-                    f"with build flags '{args.build_flags}'. Total tasks planned: {total_tasks_planned}")
 
+        # --- Build Phase: configure and build all combinations concurrently ---
+        scheduler = BuildScheduler(runner, max_jobs=args.jobs, max_concurrent_builds=args.max_parallel_builds)
+        build_dirs = scheduler.build_all(build_cells, args.incremental_build, experiments=target_experiments)
 
-        for i, compiler_config in enumerate(target_compilers):
-            compiler_name = compiler_config['name']
-            logger.info(f"\n=== Processing Compiler: {compiler_name} ({i+1}/{len(target_compilers)}) ===")
+        # --- Run Phase: measurement stays serialized ---
+        for i, (compiler_name, build_flags_id) in enumerate(build_cells):
+            logger.info(f"\n=== Processing: {compiler_name} / {build_flags_id} ({i+1}/{len(build_cells)}) ===")
+            cell_summary = cell_summaries[(compiler_name, build_flags_id)]
 
-            build_dir = None
             try:
-                # Build all experiments for this compiler config once
-                build_dir = runner.build_experiment(
-                    compiler_name,
-                    args.build_flags,
-                    args.incremental_build
-                )
+                build_dir = build_dirs.get((compiler_name, build_flags_id))
                 if not build_dir:
-                    # Build failed, skip all experiments for this compiler
-                    logger.error(f"Build failed for compiler {compiler_name}. Skipping its experiments.")
+                    # Build failed, skip all experiments for this cell
+                    logger.error(f"Build failed for {compiler_name} ({build_flags_id}). Skipping its experiments.")
                     num_exps_affected = len(target_experiments)
-                    run_summary['fail_build'] += num_exps_affected
+                    cell_summary['fail_build'] += num_exps_affected
                     tasks_processed += num_exps_affected # Count these as processed (failed)
-                    continue # Skip to next compiler
+                    continue # Skip to next cell
 
                 # Run each experiment using the successful build
                 for j, experiment_name in enumerate(target_experiments):
                     task_num = i * len(target_experiments) + j + 1
-                    logger.info(f"\n--- Task {task_num}/{total_tasks_planned}: Running {experiment_name} with {compiler_name} ({args.build_flags}) ---")
+                    logger.info(f"\n--- Task {task_num}/{total_tasks_planned}: Running {experiment_name} with {compiler_name} ({build_flags_id}) ---")
                     tasks_processed += 1 # Increment tasks processed counter
                     results_dir = None
                     status = "FAILED" # Default status
@@ -127,18 +219,18 @@ def main():
                         results_dir, status = runner.run_experiment(
                             experiment_name,
                             compiler_name,
-                            args.build_flags,
+                            build_flags_id,
                             build_dir,
                             args.force
                         )
 
                         # Update summary based on the returned status
                         if status == "RAN":
-                            run_summary['success'] += 1
+                            cell_summary['success'] += 1
                         elif status == "SKIPPED":
-                            run_summary['skipped'] += 1
+                            cell_summary['skipped'] += 1
                         else: # status == "FAILED" or results_dir is None
-                            run_summary['fail_run'] += 1
+                            cell_summary['fail_run'] += 1
                             # Log warning if not already logged by run_experiment
                             if results_dir is None:
                                  logger.warning(f"Experiment run failed pre-check for {experiment_name}")
@@ -146,27 +238,39 @@ def main():
 
                     except BenchmarkExecutionError as run_err:
                          logger.error(f"Benchmark execution failed for {experiment_name}: {run_err}")
-                         run_summary['fail_run'] += 1
+                         cell_summary['fail_run'] += 1
                     except Exception as exp_err:
                          logger.error(f"Unexpected error running experiment {experiment_name}: {exp_err}", exc_info=True)
-                         run_summary['fail_run'] += 1
+                         cell_summary['fail_run'] += 1
 
-
-            except BuildError as build_err:
-                logger.error(f"Build error encountered for compiler {compiler_name}: {build_err}")
-                num_exps_affected = len(target_experiments)
-                run_summary['fail_build'] += num_exps_affected # Count experiments affected
-                tasks_processed += num_exps_affected # Count as processed
             except Exception as comp_err:
-                logger.error(f"Unexpected error processing compiler {compiler_name}: {comp_err}", exc_info=True)
-                # Assume build failed and mark all experiments for this compiler as failed
-                num_exps_affected = len(target_experiments)
-                run_summary['fail_build'] += num_exps_affected
+                logger.error(f"Unexpected error processing {compiler_name} ({build_flags_id}): {comp_err}", exc_info=True)
+                # Mark the experiments not yet accounted for in this cell as failed builds
+                num_exps_affected = len(target_experiments) - sum(cell_summary.values())
+                cell_summary['fail_build'] += num_exps_affected
                 tasks_processed += num_exps_affected
 
+        # --- Drain Background Post-processing ---
+        postprocess_failures = runner.wait_for_postprocessing()
+        if postprocess_failures:
+            logger.error(f"Post-processing failed for {len(postprocess_failures)} experiment(s); "
+                         f"their results are incomplete and will be re-run next time.")
+        for experiment_name, compiler_name, build_flags_id in postprocess_failures:
+            # Counted as RAN when the measurement finished; the run is incomplete without its metadata
+            cell_summary = cell_summaries[(compiler_name, build_flags_id)]
+            cell_summary['success'] -= 1
+            cell_summary['fail_run'] += 1
+
+        for cell_summary in cell_summaries.values():
+            for key, count in cell_summary.items():
+                run_summary[key] += count
 
         # --- Final Summary ---
         logger.info("\n--- Benchmark Run Summary ---")
+        for (compiler_name, build_flags_id), cell_summary in cell_summaries.items():
+            logger.info(f"{compiler_name} / {build_flags_id}: "
+                        f"{cell_summary['success']} ran, {cell_summary['skipped']} skipped, "
+                        f"{cell_summary['fail_run']} failed, {cell_summary['fail_build']} build-failed")
         logger.info(f"Total Tasks Processed: {tasks_processed}") # Use actual processed count
         logger.info(f"Successful Runs:     {run_summary['success']}")
         logger.info(f"Skipped (exist):     {run_summary['skipped']}")
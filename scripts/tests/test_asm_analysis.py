@@ -0,0 +1,38 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from lib.asm_analysis import analyze_assembly
+
+# A [clone .cold] fragment at lower addresses than the hot part, which jumps back into it
+HOT_COLD_SNIPPET = """\
+0000000000001000 <BM_Foo(benchmark::State&) [clone .cold]>:
+    1000:\tmov    %rbx,%rdi
+    1003:\tcall   1200 <_Unwind_Resume@plt>
+
+0000000000002000 <BM_Foo(benchmark::State&)>:
+    2000:\tpush   %rbx
+    2001:\tpxor   %xmm0,%xmm0
+    2005:\tpaddd  (%rdi),%xmm0
+    2009:\tadd    $0x10,%rdi
+    200d:\tcmp    %rsi,%rdi
+    2010:\tjne    2005 <BM_Foo(benchmark::State&)+0x5>
+    2012:\ttest   %rax,%rax
+    2015:\tje     1000 <BM_Foo(benchmark::State&) [clone .cold]>
+    2017:\tpop    %rbx
+    2018:\tret
+""".splitlines()
+
+
+class FindLoopsTest(unittest.TestCase):
+    def test_branch_into_cold_fragment_is_not_a_loop(self):
+        metrics = analyze_assembly(HOT_COLD_SNIPPET)
+        self.assertEqual([(loop["start"], loop["end"]) for loop in metrics["loops"]], [("0x2005", "0x2010")])
+        self.assertEqual(metrics["loops"][0]["mix"]["instructions"], 4)
+        self.assertEqual(metrics["vectorized_loops"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from lib.data_loader import find_all_result_dirs
+from lib.results_index import ResultsIndex, append_journal
+
+
+class DeletedRunDirTest(unittest.TestCase):
+    def setUp(self):
+        self.project_root = Path(tempfile.mkdtemp())
+        self.results_root = self.project_root / "results"
+
+    def tearDown(self):
+        shutil.rmtree(self.project_root)
+
+    def make_run(self, metadata_hash: str, experiment: str) -> Path:
+        results_dir = self.results_root / "linux-x86_64" / "gcc-12" / "Release" / metadata_hash / experiment
+        results_dir.mkdir(parents=True)
+        (results_dir / "metadata.json").write_text(json.dumps({"experiment_name": experiment}))
+        (results_dir / "benchmark_output.json").write_text(json.dumps(
+            {"context": {}, "benchmarks": [{"name": "BM_Test", "run_type": "iteration", "real_time": 1.5}]}))
+        append_journal(self.results_root, results_dir)
+        return results_dir
+
+    def count_rows(self, table: str) -> int:
+        with sqlite3.connect(self.project_root / ".cache" / "results_index.sqlite") as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_deleted_run_dir_is_dropped_on_refresh(self):
+        kept = self.make_run("0123abcd", "exp_a")
+        deleted = self.make_run("4567cdef", "exp_b")
+        self.assertEqual(find_all_result_dirs(self.project_root), [kept, deleted])
+
+        # The second lookup refreshes from the journals only, without walking results/
+        shutil.rmtree(deleted.parent)
+        self.assertEqual(find_all_result_dirs(self.project_root), [kept])
+        self.assertEqual(self.count_rows("runs"), 1)
+        self.assertEqual(self.count_rows("benchmarks"), 1)
+        self.assertEqual(self.count_rows("metrics"), 1)
+
+    def test_explicit_refresh_keeps_other_runs(self):
+        kept = self.make_run("0123abcd", "exp_a")
+        deleted = self.make_run("4567cdef", "exp_b")
+        with ResultsIndex(self.project_root) as index:
+            index.refresh()
+            shutil.rmtree(deleted)
+            counts = index.refresh(result_dirs=[kept])
+            self.assertEqual(counts["removed"], 0)
+            self.assertEqual(index.refresh()["removed"], 1)
+            self.assertEqual(index.find_result_dirs(), [kept])
+
+
+if __name__ == "__main__":
+    unittest.main()